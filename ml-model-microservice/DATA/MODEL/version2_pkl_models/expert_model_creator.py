@@ -8,6 +8,7 @@ Kişisel ağırlık parametresi dahil gelişmiş makine öğrenmesi yaklaşımı
 
 import pandas as pd
 import numpy as np
+import os
 import pickle
 import json
 from datetime import datetime
@@ -24,6 +25,8 @@ from sklearn.decomposition import PCA
 import warnings
 warnings.filterwarnings('ignore')
 
+from model_artifact import export_model_artifact
+
 class ExpertAllermindModelCreator:
     """Expert-level istatistiksel model creator"""
     
@@ -417,6 +420,14 @@ class ExpertAllermindModelCreator:
             pickle.dump(model_package, f)
         
         print(f"✅ Model kaydedildi: {filename}")
+        
+        # Serviste unpickle yerine eşlenen memory-mappable artifact
+        try:
+            manifest_path = export_model_artifact(model_package, os.path.dirname(filepath), group_id, filepath)
+            print(f"✅ Artifact kaydedildi: {os.path.basename(manifest_path)}")
+        except Exception as e:
+            print(f"⚠️ Artifact oluşturulamadı ({e}), servis pickle'ı yükleyecek")
+        
         return filepath
     
     def create_all_models(self):
@@ -8,26 +8,94 @@ Kişisel ağırlık parametreli gelişmiş tahmin sistemi
 import os
 import pickle
 import json
+import threading
+import time
 import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+from feature_layout import (
+    CompiledFeatureLayout, FEATURE_DEFAULTS, REQUIRED_FEATURES,
+    DEFAULT_HOUR, DEFAULT_DAY_OF_WEEK, DEFAULT_LAT, DEFAULT_LON
+)
+from tree_compiler import CompiledTreeEnsemble, TREE_ALGORITHMS, verify_parity as verify_tree_parity
+from native_inference import DENSE_ALGORITHMS, compile_dense_model, verify_parity as verify_dense_parity
+from model_artifact import is_artifact_current, load_model_artifact, read_manifest
+
+GROUP_IDS = (1, 2, 3, 4, 5)
+
+_model_modules_lock = threading.Lock()
+_model_modules_imported = False
+
+def import_model_modules():
+    """Pickle'ların ihtiyaç duyduğu sklearn modüllerini tek seferde içe aktar
+    
+    Eşzamanlı pickle.load çağrıları aynı modülleri farklı iş parçacıklarında
+    içe aktarmaya çalışınca import kilidi 'deadlock detected' hatası verebilir.
+    """
+    global _model_modules_imported
+    
+    with _model_modules_lock:
+        if not _model_modules_imported:
+            import sklearn.dummy, sklearn.ensemble, sklearn.neural_network, sklearn.preprocessing, sklearn.svm  # noqa: F401
+            _model_modules_imported = True
+
+def risk_level_label(risk_score):
+    """Risk skorundan (0-1) seviye etiketi - grup ve ensemble sonuçlarıyla aynı eşikler"""
+    if risk_score < 0.3:
+        return 'Düşük'
+    elif risk_score < 0.6:
+        return 'Orta'
+    return 'Yüksek'
+
 class ExpertAllermindPredictor:
     """Expert-level Allermind prediction system with personal weighting"""
     
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, compile_models=True, use_artifacts=True, lazy_loading=False,
+                 load_workers=None, n_jobs=None):
         # Eğer model_path belirtilmemişse, bu dosyanın bulunduğu dizini kullan
         if model_path is None:
             model_path = os.path.dirname(os.path.abspath(__file__))
         self.model_path = model_path
         self.models = {}
+        # Modeller yüklemede NumPy değerlendiricilerine derlenir (parity doğrulamalı)
+        self.compile_models = compile_models
+        self.compiled_models = {}
+        # Güncel memory-mappable artifact varsa pickle yerine o eşlenir (compile_models gerektirir)
+        self.use_artifacts = use_artifacts
+        # Eşzamanlı yükleme iş parçacığı sayısı; lazy modda gruplar ilk kullanımda yüklenir
+        self.lazy_loading = lazy_loading
+        self.load_workers = max(1, load_workers if load_workers is not None else len(GROUP_IDS))
+        # Yüklenen estimator'lara atanan n_jobs (None: pickle'daki değer, eğitimde -1)
+        self.n_jobs = n_jobs
+        self.load_status = {
+            group_id: {'state': 'pending', 'source': None, 'durationMs': None, 'error': None}
+            for group_id in GROUP_IDS
+        }
+        self.load_duration_ms = None
+        self._group_locks = {group_id: threading.Lock() for group_id in GROUP_IDS}
         self.ensemble_config = None
+        # Opsiyonel request coalescer (servis tarafından atanır)
+        self.micro_batcher = None
+        # Opsiyonel base tahmin önbelleği (servis tarafından atanır)
+        self.prediction_cache = None
+        # Opsiyonel profil imzası → grup multiplier'ları önbelleği (servis tarafından atanır)
+        self.multiplier_cache = None
+        # Opsiyonel aşama / grup modeli gecikme histogramları (servis tarafından atanır)
+        self.metrics = None
+        # Model feature listelerinden derlenen vektör düzeni (gruplar yüklendikçe eklenir)
+        self.feature_layout = CompiledFeatureLayout({})
         self.load_models()
     
     def load_models(self):
-        """Tüm grup modellerini yükle"""
+        """Ensemble config'i ve grup modellerini yükle
+        
+        Gruplar thread pool'da eşzamanlı yüklenir. Lazy modda yalnızca config
+        okunur; her grup ilk kullanıldığında yüklenir (bkz. ensure_groups_loaded).
+        """
         
         print("🚀 ALLERMIND V2.0 EXPERT PREDICTION SYSTEM")
         print("=" * 60)
@@ -43,54 +111,248 @@ class ExpertAllermindPredictor:
             print(f"❌ Ensemble config yüklenemedi: {e}")
             return False
         
-        # Her grup modelini yükle
-        success_count = 0
-        for group_id in range(1, 6):
+        if self.lazy_loading:
+            print("💤 Lazy yükleme: gruplar ilk kullanımda yüklenecek")
+            return True
+        
+        started = time.perf_counter()
+        success_count = self.load_groups(GROUP_IDS)
+        self.load_duration_ms = (time.perf_counter() - started) * 1000
+        
+        print(f"\n🎉 {success_count}/5 model başarıyla yüklendi! ({self.load_duration_ms:.0f} ms, {self.load_workers} iş parçacığı)")
+        return success_count == 5
+    
+    def load_groups(self, group_ids):
+        """Grupları thread pool'da eşzamanlı yükle, yüklü grup sayısını döndür"""
+        
+        group_ids = [group_id for group_id in group_ids if self.load_status[group_id]['state'] != 'loaded']
+        if len(group_ids) > 1 and self.load_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(self.load_workers, len(group_ids)),
+                                    thread_name_prefix='model-loader') as executor:
+                list(executor.map(self.load_group, group_ids))
+        else:
+            for group_id in group_ids:
+                self.load_group(group_id)
+        
+        return len(self.loaded_groups())
+    
+    def load_group(self, group_id):
+        """Tek grup modelini yükle (idempotent, grup başına kilitli); başarılıysa True
+        
+        Grup, feature düzenine eklenip durumu 'loaded' olduktan sonra tahminlerde
+        kullanılır; başarısız yüklemeler tekrar denenmez.
+        """
+        
+        status = self.load_status[group_id]
+        if status['state'] in ('loaded', 'failed'):
+            return status['state'] == 'loaded'
+        
+        with self._group_locks[group_id]:
+            if status['state'] in ('loaded', 'failed'):
+                return status['state'] == 'loaded'
+            
+            status['state'] = 'loading'
+            started = time.perf_counter()
             try:
-                model_path = f"{self.model_path}/Grup{group_id}_advanced_model_v2.pkl"
-                with open(model_path, 'rb') as f:
-                    self.models[group_id] = pickle.load(f)
-                
-                # Model info
-                model_info = self.models[group_id]
-                algorithm = model_info['algorithm_used']
-                performance = model_info['performance']
-                
-                print(f"✅ Grup {group_id}: {algorithm}")
-                print(f"   📊 Test R²: {performance['test_r2']:.4f}, MAE: {performance['test_mae']:.4f}")
-                
-                success_count += 1
-                
+                model_package, compiled, source = self.read_group_model(group_id)
+                self.install_group(group_id, model_package, compiled, source)
             except Exception as e:
                 print(f"❌ Grup {group_id} modeli yüklenemedi: {e}")
+                status['error'] = str(e)
+                status['state'] = 'failed'
+            finally:
+                status['durationMs'] = round((time.perf_counter() - started) * 1000, 2)
         
-        print(f"\n🎉 {success_count}/5 model başarıyla yüklendi!")
-        return success_count == 5
+        return status['state'] == 'loaded'
+    
+    def group_model_path(self, group_id):
+        """Grubun pickle dosyası"""
+        
+        return f"{self.model_path}/Grup{group_id}_advanced_model_v2.pkl"
+    
+    def read_group_model(self, group_id):
+        """Grup modelini diskten oku (güncel artifact veya pickle + derleme)
+        
+        Tahmin durumuna dokunmaz; yeni bir sürümü devreye almadan önce
+        doğrulamak için de kullanılır.
+        
+        Returns:
+            (model paketi, derlenmiş model veya None, 'artifact' | 'pickle')
+        """
+        
+        model_path = self.group_model_path(group_id)
+        artifact = self.load_model_artifact(group_id, model_path)
+        if artifact is not None:
+            model_package, compiled, source = artifact[0], artifact[1], 'artifact'
+        else:
+            model_package, compiled = self.load_model_pickle(group_id, model_path)
+            source = 'pickle'
+        
+        self.apply_n_jobs(model_package.get('model'))
+        return model_package, compiled, source
+    
+    def apply_n_jobs(self, model):
+        """Estimator'ın (ve iç içe estimator'ların) n_jobs'unu self.n_jobs yap
+        
+        RandomForest/ExtraTrees n_jobs=-1 ile eğitilip öyle pickle'landı; tek
+        satırlık predict'te bile joblib tüm çekirdekler için iş parçacığı açar.
+        """
+        
+        if self.n_jobs is None or model is None or not hasattr(model, 'get_params'):
+            return
+        
+        updates = {name: self.n_jobs for name in model.get_params(deep=True) if name == 'n_jobs' or name.endswith('__n_jobs')}
+        if updates:
+            model.set_params(**updates)
+    
+    def install_group(self, group_id, model_package, compiled=None, source=None):
+        """Grup modelini tahminlerde kullanıma aç (veya mevcut sürümün yerine koy)
+        
+        Feature düzeni, derlenmiş model ve paket ayrı ayrı atanır; çalışan
+        tahminler sırasında sürüm değiştirilecekse çağıran bunları durdurmalıdır
+        (servis ModelRegistry kapısını kullanır).
+        """
+        
+        self.feature_layout.add_group(group_id, model_package['features'])
+        if compiled is not None:
+            self.compiled_models[group_id] = compiled
+        else:
+            self.compiled_models.pop(group_id, None)
+        self.models[group_id] = model_package
+        
+        status = self.load_status[group_id]
+        status['source'] = source
+        status['error'] = None
+        status['state'] = 'loaded'
+    
+    def loaded_groups(self):
+        """Tahmine hazır grup id'leri (sıralı)"""
+        
+        return [group_id for group_id in GROUP_IDS if self.load_status[group_id]['state'] == 'loaded']
+    
+    def ensure_groups_loaded(self, group_ids=GROUP_IDS):
+        """Lazy modda henüz yüklenmemiş grupları şimdi yükle (veya yüklenmesini bekle); yüklü grup id'lerini döndür"""
+        
+        # Başka bir istek tarafından yüklenmekte olan gruplar için de grup kilidinde beklenir
+        if self.lazy_loading and any(self.load_status[group_id]['state'] in ('pending', 'loading') for group_id in group_ids):
+            self.load_groups(group_ids)
+        
+        return self.loaded_groups()
+    
+    def get_load_status(self):
+        """Grup bazlı yükleme durumu (readiness için)"""
+        
+        groups = {str(group_id): dict(status) for group_id, status in self.load_status.items()}
+        states = [status['state'] for status in self.load_status.values()]
+        
+        # Lazy modda bekleyen gruplar ilk istekte yüklenebilir
+        loadable = 'loaded' in states or (self.lazy_loading and ('pending' in states or 'loading' in states))
+        
+        return {
+            'ready': self.ensemble_config is not None and loadable,
+            'mode': 'lazy' if self.lazy_loading else 'eager',
+            'loadWorkers': self.load_workers,
+            'loadedGroups': self.loaded_groups(),
+            'loadDurationMs': round(self.load_duration_ms, 2) if self.load_duration_ms is not None else None,
+            'groups': groups
+        }
+    
+    def load_model_pickle(self, group_id, model_path):
+        """Grup pickle'ını oku ve derle (derleme başarısızsa derlenmiş model None, sklearn kullanılır)
+        
+        Returns:
+            (model paketi, derlenmiş model veya None)
+        """
+        
+        with open(model_path, 'rb') as f:
+            import_model_modules()
+            model_package = pickle.load(f)
+        
+        # Model info
+        algorithm = model_package['algorithm_used']
+        performance = model_package['performance']
+        
+        print(f"✅ Grup {group_id}: {algorithm}")
+        print(f"   📊 Test R²: {performance['test_r2']:.4f}, MAE: {performance['test_mae']:.4f}")
+        
+        compiled = None
+        if self.compile_models and algorithm in TREE_ALGORITHMS:
+            compiled = self.compile_tree_model(group_id, model_package)
+        elif self.compile_models and algorithm in DENSE_ALGORITHMS:
+            compiled = self.compile_dense_model(group_id, model_package)
+        
+        return model_package, compiled
+    
+    def load_model_artifact(self, group_id, model_path):
+        """Grubun güncel artifact'i varsa dizilerini salt okunur eşle; yoksa None (pickle yüklenir)
+        
+        Returns:
+            (model paketi, derlenmiş model) veya None
+        """
+        
+        if not (self.use_artifacts and self.compile_models):
+            return None
+        
+        try:
+            manifest = read_manifest(self.model_path, group_id)
+            if manifest is None:
+                return None
+            if not is_artifact_current(manifest, model_path):
+                print(f"   ⚠️ Grup {group_id}: artifact pickle ile uyuşmuyor, pickle yükleniyor")
+                return None
+            model_package, compiled = load_model_artifact(self.model_path, group_id, manifest)
+        except Exception as e:
+            print(f"   ⚠️ Grup {group_id}: artifact yüklenemedi ({e}), pickle yükleniyor")
+            return None
+        
+        performance = model_package['performance']
+        print(f"✅ Grup {group_id}: {model_package['algorithm_used']}")
+        print(f"   📊 Test R²: {performance['test_r2']:.4f}, MAE: {performance['test_mae']:.4f}")
+        print(f"   🗺️ Artifact eşlendi ({model_package['artifact']['mappedBytes'] / 1024:.1f} KB, salt okunur)")
+        return model_package, compiled
+    
+    def compile_tree_model(self, group_id, model_package):
+        """Grup ağaç modelini derle; model.predict ile bit düzeyinde aynı değilse None (sklearn'de kal)"""
+        
+        model = model_package['model']
+        try:
+            compiled = CompiledTreeEnsemble.from_estimator(model, parity=True)
+            if not verify_tree_parity(model, compiled):
+                print(f"   ⚠️ Grup {group_id}: derlenmiş ağaçlar parity doğrulamasını geçemedi, sklearn kullanılıyor")
+                return None
+        except Exception as e:
+            print(f"   ⚠️ Grup {group_id}: ağaç derleme hatası ({e}), sklearn kullanılıyor")
+            return None
+        
+        print(f"   ⚡ {compiled.n_trees} ağaç derlendi (derinlik {compiled.depth}, parity doğrulandı)")
+        return compiled
+    
+    def compile_dense_model(self, group_id, model_package):
+        """Grup MLP/SVR modelini scaler katlanmış NumPy değerlendiricisine derle (tolerans doğrulamalı); olmazsa None"""
+        
+        try:
+            compiled = compile_dense_model(model_package['model'], model_package['scaler'])
+            passed, max_error = verify_dense_parity(model_package['model'], model_package['scaler'], compiled)
+            if not passed:
+                print(f"   ⚠️ Grup {group_id}: NumPy değerlendirici tolerans dışında (max hata {max_error:.2e}), sklearn kullanılıyor")
+                return None
+        except Exception as e:
+            print(f"   ⚠️ Grup {group_id}: NumPy derleme hatası ({e}), sklearn kullanılıyor")
+            return None
+        
+        print(f"   ⚡ NumPy değerlendirici derlendi (scaler katlandı, max hata {max_error:.2e})")
+        return compiled
     
     def validate_input(self, environmental_data):
         """Input verilerini validate et"""
         
-        required_features = [
-            'temperature_2m', 'relative_humidity_2m', 'precipitation', 
-            'wind_speed_10m', 'pm10', 'pm2_5', 'ozone', 'nitrogen_dioxide', 
-            'uv_index', 'surface_pressure'
-        ]
+        required_features = REQUIRED_FEATURES
         
         missing_features = []
         validated_data = {}
         
         # Default değerler
-        defaults = {
-            'temperature_2m': 22.0, 'relative_humidity_2m': 55.0, 'precipitation': 0.0,
-            'snowfall': 0.0, 'rain': 0.0, 'cloud_cover': 30.0, 'surface_pressure': 1013.0,
-            'wind_speed_10m': 5.0, 'wind_direction_10m': 180.0, 'sunshine_duration': 8.0,
-            'pm10': 20.0, 'pm2_5': 12.0, 'carbon_dioxide': 400.0, 'carbon_monoxide': 1.0,
-            'nitrogen_dioxide': 20.0, 'sulphur_dioxide': 10.0, 'ozone': 100.0,
-            'aerosol_optical_depth': 0.2, 'methane': 1900.0, 'uv_index': 5.0,
-            'uv_index_clear_sky': 6.0, 'dust': 50.0, 'pollen_code': 0,
-            'in_season': 0, 'upi_value': 0, 'plant_code': 0,
-            'plant_in_season': 0, 'plant_upi_value': 0
-        }
+        defaults = FEATURE_DEFAULTS
         
         # Feature validation ve default assignment
         for feature in required_features:
@@ -107,16 +369,16 @@ class ExpertAllermindPredictor:
         
         return validated_data, missing_features
     
-    def create_engineered_features(self, data):
-        """Engineered features oluştur"""
+    def create_engineered_features(self, data, hour=DEFAULT_HOUR, day_of_week=DEFAULT_DAY_OF_WEEK):
+        """Engineered features oluştur (hour: 0-23, day_of_week: pazartesi=0)"""
         
         engineered = data.copy()
         
-        # Time-based features (şu an için sabit değerler)
-        engineered['hour'] = 12  # Varsayılan öğle saati
-        engineered['day_of_week'] = 2  # Varsayılan çarşamba
-        engineered['lat'] = 39.9334  # Varsayılan Ankara koordinatı
-        engineered['lon'] = 32.8597
+        # Time-based features (verilmezse öğle saati / çarşamba)
+        engineered['hour'] = hour
+        engineered['day_of_week'] = day_of_week
+        engineered['lat'] = DEFAULT_LAT  # Varsayılan Ankara koordinatı
+        engineered['lon'] = DEFAULT_LON
         
         # AQI Combined
         try:
@@ -172,39 +434,144 @@ class ExpertAllermindPredictor:
         
         return engineered
     
+    def prepare_features(self, environmental_data):
+        """Input validation ve engineered features - tüm gruplar için tek sefer
+        
+        validate_input + create_engineered_features ile aynı değerleri derlenmiş
+        feature düzenindeki ortak vektöre doğrudan yazar.
+        """
+        
+        feature_vector = self.feature_layout.new_vector()
+        missing_features = self.feature_layout.fill(environmental_data, feature_vector)
+        
+        return feature_vector, missing_features
+    
+    def prepare_feature_matrix(self, environmental_data_list, time_features=None):
+        """Çoklu istek için ortak feature matrisi ve istek başına eksik özellikler
+        
+        time_features verilirse satır başına (hour, day_of_week) çiftidir;
+        verilmezse varsayılan öğle saati / çarşamba kullanılır.
+        """
+        
+        feature_matrix = self.feature_layout.new_matrix(len(environmental_data_list))
+        if time_features is None:
+            missing_features_list = [
+                self.feature_layout.fill(environmental_data, feature_matrix[row_index])
+                for row_index, environmental_data in enumerate(environmental_data_list)
+            ]
+        else:
+            missing_features_list = [
+                self.feature_layout.fill(environmental_data, feature_matrix[row_index], hour, day_of_week)
+                for row_index, (environmental_data, (hour, day_of_week)) in enumerate(zip(environmental_data_list, time_features))
+            ]
+        
+        return feature_matrix, missing_features_list
+    
     def predict_group(self, environmental_data, group_id, personal_params=None):
         """Belirli bir grup için tahmin yap"""
         
-        if group_id not in self.models:
+        if group_id not in GROUP_IDS or group_id not in self.ensure_groups_loaded((group_id,)):
             return None
         
+        # Veriyi validate et ve engineered features oluştur
+        feature_vector, missing_features = self.prepare_features(environmental_data)
+        
+        feature_arrays = {group_id: self.build_feature_array(feature_vector, group_id)}
+        base_prediction = self._predict_base_values(feature_arrays)[group_id]
+        
+        return self._finalize_group_prediction(group_id, base_prediction, missing_features, personal_params)
+    
+    def build_feature_array(self, feature_vector, group_id):
+        """Grup modelinin feature sırasına göre (1, n_features) dizisi oluştur"""
+        
+        return self.feature_layout.group_row(feature_vector, group_id)
+    
+    def build_feature_matrix(self, feature_matrix, group_id):
+        """Ortak feature matrisinden grubun (n_rows, n_features) matrisi"""
+        
+        return self.feature_layout.group_matrix(feature_matrix, group_id)
+    
+    def predict_base_batch(self, group_id, feature_matrix):
+        """Ham feature matrisi için grup modelinin base tahminleri (satır başına bir değer)"""
+        
+        started = time.perf_counter()
         model_package = self.models[group_id]
-        model = model_package['model']
-        scaler = model_package['scaler']
-        features = model_package['features']
         algorithm = model_package['algorithm_used']
+        predictions = self.evaluate_model_package(model_package, self.compiled_models.get(group_id), feature_matrix)
         
-        # Veriyi validate et ve engineered features oluştur
-        validated_data, missing_features = self.validate_input(environmental_data)
-        engineered_data = self.create_engineered_features(validated_data)
+        if self.metrics is not None:
+            self.metrics.observe_model(group_id, algorithm, time.perf_counter() - started, len(predictions))
         
-        # Feature vector oluştur
-        feature_vector = []
-        for feature in features:
-            feature_vector.append(engineered_data.get(feature, 0.0))
+        return predictions
+    
+    @staticmethod
+    def evaluate_model_package(model_package, compiled, feature_matrix):
+        """Paket (ve varsa derlenmiş değerlendiricisi) ile ham feature matrisinin tahminleri"""
         
-        feature_array = np.array(feature_vector).reshape(1, -1)
+        # Derlenmiş değerlendirici (scaler içine katlanmış veya gerektirmiyor)
+        if compiled is not None:
+            return compiled.predict(feature_matrix)
         
         # Scaling (SVR ve Neural Network için)
+        algorithm = model_package['algorithm_used']
         if 'SVR' in algorithm or 'Neural' in algorithm:
-            feature_array = scaler.transform(feature_array)
+            feature_matrix = model_package['scaler'].transform(feature_matrix)
+        return model_package['model'].predict(feature_matrix)
+    
+    def _predict_base_values(self, feature_arrays):
+        """{group_id: feature_array} için base tahminler
+        
+        Önbellek varsa önce oradan okunur; kalan gruplar micro-batcher varsa
+        onun üzerinden, yoksa doğrudan modelle hesaplanıp önbelleğe yazılır.
+        """
+        
+        cache = self.prediction_cache
+        base_predictions = {}
+        pending_arrays = feature_arrays
+        
+        if cache is not None:
+            group_continuous = self.feature_layout.group_continuous
+            cache_keys = {
+                group_id: cache.make_key(group_id, feature_array, group_continuous.get(group_id))
+                for group_id, feature_array in feature_arrays.items()
+            }
+            pending_arrays = {}
+            for group_id, feature_array in feature_arrays.items():
+                cached_prediction = cache.get(cache_keys[group_id])
+                if cached_prediction is None:
+                    pending_arrays[group_id] = feature_array
+                else:
+                    base_predictions[group_id] = cached_prediction
+        
+        if pending_arrays:
+            if self.micro_batcher is not None:
+                computed = self.micro_batcher.predict(pending_arrays)
+            else:
+                computed = {
+                    group_id: self.predict_base_batch(group_id, feature_array)[0]
+                    for group_id, feature_array in pending_arrays.items()
+                }
+            
+            if cache is not None:
+                for group_id, prediction in computed.items():
+                    cache.put(cache_keys[group_id], prediction)
+            
+            base_predictions.update(computed)
         
-        # Base prediction
-        base_prediction = model.predict(feature_array)[0]
+        return base_predictions
+    
+    def _finalize_group_prediction(self, group_id, base_prediction, missing_features, personal_params=None,
+                                   personal_multipliers=None):
+        """Base tahmine kişisel ağırlık uygula ve grup sonucunu oluştur"""
+        
+        model_package = self.models[group_id]
+        algorithm = model_package['algorithm_used']
         
         # Kişisel ağırlık uygula
         if personal_params:
-            personal_multiplier = self.calculate_personal_multiplier(group_id, personal_params)
+            if personal_multipliers is None or group_id not in personal_multipliers:
+                personal_multipliers = self.calculate_personal_multipliers(personal_params)
+            personal_multiplier = personal_multipliers[group_id]
             adjusted_prediction = base_prediction / personal_multiplier
             adjusted_prediction = max(0.5, min(8.5, adjusted_prediction))
         else:
@@ -240,6 +607,75 @@ class ExpertAllermindPredictor:
             'prediction_timestamp': datetime.now().isoformat()
         }
     
+    def profile_signature(self, personal_params):
+        """Multiplier hesabının okuduğu alanlardan kararlı profil imzası
+        
+        determine_user_risk_group, calculate_allergy_relevance ve
+        calculate_lifestyle_factors yalnızca bu alanlara bakar; aynı imzaya sahip
+        profiller tüm gruplar için aynı multiplier'ları üretir.
+        """
+        
+        profile = personal_params.get('profile', {})
+        reactions = profile.get('previous_reactions', {})
+        tree_pollen = profile.get('tree_pollen', {})
+        grass_pollen = profile.get('grass_pollen', {})
+        weed_pollen = profile.get('weed_pollen', {})
+        env_triggers = profile.get('environmental_triggers', {})
+        
+        signature = (
+            profile.get('clinical_diagnosis', 'none'),
+            profile.get('age', 25),
+            bool(profile.get('family_allergy_history', False)),
+            any(reactions.values()),
+            bool(reactions.get('anaphylaxis', False)),
+            bool(reactions.get('severe_asthma', False)),
+            bool(reactions.get('hospitalization', False)),
+            bool(tree_pollen.get('birch', False)),
+            bool(tree_pollen.get('pine', False)),
+            bool(tree_pollen.get('olive', False)),
+            bool(grass_pollen.get('graminales', False)),
+            bool(weed_pollen.get('mugwort', False)),
+            bool(weed_pollen.get('ragweed', False)),
+            bool(env_triggers.get('air_pollution', False)),
+            bool(env_triggers.get('smoke', False)),
+            sum(1 for trigger in env_triggers.values() if trigger),
+            personal_params.get('kisisel_hassasiyet', 3),
+            personal_params.get('dis_aktivite_suresi', 120),
+            personal_params.get('ilaç_kullanimi', 0),
+            personal_params.get('stres_seviyesi', 3),
+            personal_params.get('uyku_kalitesi', 3),
+            personal_params.get('beslenme_kalitesi', 3)
+        )
+        
+        try:
+            hash(signature)
+        except TypeError:
+            return None
+        return signature
+    
+    def calculate_personal_multipliers(self, personal_params):
+        """Tüm yüklü gruplar için kişisel multiplier'lar - profil imzasına göre önbellekli"""
+        
+        cache = self.multiplier_cache
+        signature = self.profile_signature(personal_params) if cache is not None else None
+        
+        loaded_groups = self.loaded_groups()
+        if signature is not None:
+            cached_multipliers = cache.get(signature)
+            # Lazy modda sonradan yüklenen gruplar için yeniden hesapla
+            if cached_multipliers is not None and len(cached_multipliers) == len(loaded_groups):
+                return cached_multipliers
+        
+        multipliers = {
+            group_id: self.calculate_personal_multiplier(group_id, personal_params)
+            for group_id in loaded_groups
+        }
+        
+        if signature is not None:
+            cache.put(signature, multipliers)
+        
+        return multipliers
+    
     def calculate_personal_multiplier(self, group_id, personal_params):
         """Risk seviyesi temelli kişisel ağırlık multiplier'ı hesapla
         
@@ -461,23 +897,341 @@ class ExpertAllermindPredictor:
         
         print(f"🔮 Ensemble tahmin başlatılıyor...")
         
-        # Her grup için tahmin yap
+        group_predictions = self._predict_all_groups(environmental_data, personal_params)
+        
+        return self._combine_ensemble(group_predictions, environmental_data, personal_params)
+    
+    def predict_fused(self, environmental_data, group_id, personal_params=None, prepared_features=None,
+                      include_ensemble=True):
+        """Kullanıcı grubu + ensemble tahmini tek geçişte
+        
+        Validation ve feature engineering bir kez yapılır, her yüklü grup modeli
+        tam olarak bir kez çalıştırılır. Kullanıcı grubunun sonucu ve ensemble
+        aynı tahmin setinden türetilir. prepared_features verilirse
+        (prepare_features çıktısı, ör. çevresel snapshot kaydından) feature
+        engineering atlanır. include_ensemble=False ise yalnızca kullanıcı
+        grubunun modeli çalışır ve ensemble None döner.
+        """
+        
+        group_predictions = self._predict_all_groups(
+            environmental_data, personal_params, prepared_features,
+            group_ids=None if include_ensemble else (group_id,)
+        )
+        
+        # Servis yolunda grup başına print yok (stdout yazımı istek iş parçacığında kalırdı)
+        ensemble = None
+        if include_ensemble:
+            started = time.perf_counter()
+            ensemble = self._combine_ensemble(group_predictions, environmental_data, personal_params, verbose=False)
+            if self.metrics is not None:
+                self.metrics.observe_stage('ensemble', time.perf_counter() - started)
+        
+        return {
+            'group_prediction': group_predictions.get(group_id),
+            'ensemble': ensemble
+        }
+    
+    def predict_fused_batch(self, environmental_data_list, group_ids, personal_params_list=None):
+        """Çoklu istek için fused tahmin
+        
+        Her grup modeli tüm istekler için tek bir feature matrisi üzerinde bir kez
+        çalıştırılır. Sonuçlar predict_fused ile aynı formatta, istek sırasıyla döner.
+        """
+        
+        if personal_params_list is None:
+            personal_params_list = [None] * len(environmental_data_list)
+        
+        base_predictions, missing_features_list = self.predict_base_grid(environmental_data_list)
+        loaded_groups = list(base_predictions)
+        
+        started = time.perf_counter()
+        results = []
+        for row_index, environmental_data in enumerate(environmental_data_list):
+            missing_features = missing_features_list[row_index]
+            personal_params = personal_params_list[row_index]
+            personal_multipliers = self.calculate_personal_multipliers(personal_params) if personal_params else None
+            
+            group_predictions = {
+                group_id: self._finalize_group_prediction(
+                    group_id, base_predictions[group_id][row_index], missing_features, personal_params,
+                    personal_multipliers
+                )
+                for group_id in loaded_groups
+            }
+            
+            results.append({
+                'group_prediction': group_predictions.get(group_ids[row_index]),
+                'ensemble': self._combine_ensemble(group_predictions, environmental_data, personal_params, verbose=False)
+            })
+        if self.metrics is not None:
+            self.metrics.observe_stage('batch_personalize_ensemble', time.perf_counter() - started)
+        
+        return results
+    
+    def predict_base_grid(self, environmental_data_list, time_features=None):
+        """Çoklu çevresel veri için tüm yüklü grupların base tahminleri
+        
+        Ortak feature matrisi bir kez oluşturulur, her grup modeli tüm satırlar
+        için tek vektörize çağrıyla çalışır. ({group_id: base dizisi}, satır
+        başına eksik özellikler) döner; liste boşsa base sözlüğü de boştur.
+        time_features: satır başına (hour, day_of_week), bkz. prepare_feature_matrix.
+        """
+        
+        started = time.perf_counter()
+        shared_matrix, missing_features_list = self.prepare_feature_matrix(environmental_data_list, time_features)
+        if self.metrics is not None:
+            self.metrics.observe_stage('batch_features', time.perf_counter() - started)
+        
+        # Grup başına tek vektörize model çağrısı
+        base_predictions = {}
+        if environmental_data_list:
+            for group_id in self.ensure_groups_loaded():
+                feature_matrix = self.build_feature_matrix(shared_matrix, group_id)
+                base_predictions[group_id] = self.predict_base_batch(group_id, feature_matrix)
+        
+        return base_predictions, missing_features_list
+    
+    def predict_fused_from_base(self, environmental_data, group_id, base_predictions, missing_features,
+                                personal_params=None, include_ensemble=True):
+        """Önceden hesaplanmış base tahminlerden predict_fused ile aynı sonuç
+        
+        Model çalıştırılmaz; yalnızca kişisel multiplier ve ensemble uygulanır
+        (risk grid isabetleri için).
+        """
+        
+        if not include_ensemble:
+            base_predictions = {gid: value for gid, value in base_predictions.items() if gid == group_id}
+        group_predictions = self._personalize_groups(base_predictions, missing_features, personal_params)
+        
+        ensemble = None
+        if include_ensemble:
+            started = time.perf_counter()
+            ensemble = self._combine_ensemble(group_predictions, environmental_data, personal_params, verbose=False)
+            if self.metrics is not None:
+                self.metrics.observe_stage('ensemble', time.perf_counter() - started)
+        
+        return {
+            'group_prediction': group_predictions.get(group_id),
+            'ensemble': ensemble
+        }
+    
+    def predict_fanout(self, environmental_data, group_ids, personal_params_list, base_predictions=None,
+                       missing_features=None):
+        """Tek çevresel veri, çok kullanıcı - kompakt kullanıcı başına risk
+        
+        Base tahminler grup başına bir kez hesaplanır (veya risk grid'den
+        verilir). Multiplier'lar aynı profil imzasına sahip kullanıcılar için bir
+        kez hesaplanır; kişisel ağırlık, risk skoru, risk seviyesi ve ensemble
+        (kullanıcı x grup) dizileri üzerinde uygulanır. Değerler
+        _finalize_group_prediction / _combine_ensemble ile aynıdır.
+        
+        Grubu yüklü olmayan kullanıcının sonucu None'dır.
+        """
+        
+        if base_predictions is None:
+            loaded_groups = self.ensure_groups_loaded()
+            feature_vector, missing_features = self.prepare_features(environmental_data)
+            feature_arrays = {
+                group_id: self.build_feature_array(feature_vector, group_id)
+                for group_id in loaded_groups
+            }
+            base_predictions = self._predict_base_values(feature_arrays)
+        
+        columns = [group_id for group_id in GROUP_IDS if group_id in base_predictions]
+        base_row = np.array([base_predictions[group_id] for group_id in columns], dtype=np.float64)
+        
+        # Profil imzası başına tek multiplier hesabı
+        started = time.perf_counter()
+        multiplier_rows = {}
+        multipliers = np.ones((len(personal_params_list), len(columns)), dtype=np.float64)
+        for user_index, personal_params in enumerate(personal_params_list):
+            if not personal_params:
+                continue
+            signature = self.profile_signature(personal_params)
+            row = multiplier_rows.get(signature) if signature is not None else None
+            if row is None:
+                personal_multipliers = self.calculate_personal_multipliers(personal_params)
+                row = [personal_multipliers[group_id] for group_id in columns]
+                if signature is not None:
+                    multiplier_rows[signature] = row
+            multipliers[user_index] = row
+        
+        has_profile = np.array([bool(personal_params) for personal_params in personal_params_list], dtype=bool)
+        adjusted, risk_scores, ensemble_hours, ensemble_risks, models_used = self._personalize_matrix(
+            columns, base_row[None, :], multipliers, has_profile
+        )
+        if self.metrics is not None:
+            self.metrics.observe_stage('fanout_personalize', time.perf_counter() - started)
+        
+        column_index = {group_id: column for column, group_id in enumerate(columns)}
+        users = []
+        for user_index, group_id in enumerate(group_ids):
+            column = column_index.get(group_id)
+            if column is None:
+                users.append(None)
+                continue
+            
+            risk_score = float(risk_scores[user_index, column])
+            user = {
+                'group_id': group_id,
+                'base_safe_hours': float(base_row[column]),
+                'personal_multiplier': float(multipliers[user_index, column]) if has_profile[user_index] else 1.0,
+                'personal_safe_hours': float(adjusted[user_index, column]),
+                'risk_score': risk_score,
+                'risk_level': risk_level_label(risk_score)
+            }
+            if models_used:
+                ensemble_risk = float(ensemble_risks[user_index])
+                user['ensemble'] = {
+                    'safe_outdoor_hours': float(ensemble_hours[user_index]),
+                    'risk_score': ensemble_risk,
+                    'risk_level': risk_level_label(ensemble_risk),
+                    'confidence': len(models_used) / 5.0
+                }
+            else:
+                user['ensemble'] = None
+            users.append(user)
+        
+        return {
+            'groups': columns,
+            'base_safe_hours': {group_id: float(base_row[column]) for column, group_id in enumerate(columns)},
+            'models_used': models_used,
+            'missing_features': list(missing_features or []),
+            'unique_profiles': len(multiplier_rows),
+            'users': users
+        }
+    
+    def predict_forecast(self, environmental_data_list, time_features, group_id, personal_params=None):
+        """Tek kullanıcı için saatlik risk eğrisi
+        
+        Her saat kendi (hour, day_of_week) zaman özellikleriyle değerlendirilir;
+        her grup modeli tüm saatler için tek vektörize çağrıyla çalışır.
+        Multiplier'lar bir kez hesaplanır ve (saat x grup) dizisine uygulanır.
+        Kullanıcı grubu yüklü değilse None döner.
+        """
+        
+        base_predictions, missing_features_list = self.predict_base_grid(environmental_data_list, time_features)
+        columns = [loaded_group_id for loaded_group_id in GROUP_IDS if loaded_group_id in base_predictions]
+        if group_id not in columns:
+            return None
+        
+        started = time.perf_counter()
+        base = np.column_stack([base_predictions[loaded_group_id] for loaded_group_id in columns]).astype(np.float64)
+        if personal_params:
+            personal_multipliers = self.calculate_personal_multipliers(personal_params)
+            multipliers = np.array([[personal_multipliers[loaded_group_id] for loaded_group_id in columns]], dtype=np.float64)
+        else:
+            multipliers = np.ones((1, len(columns)), dtype=np.float64)
+        
+        adjusted, risk_scores, ensemble_hours, ensemble_risks, models_used = self._personalize_matrix(
+            columns, base, multipliers, np.array([bool(personal_params)])
+        )
+        if self.metrics is not None:
+            self.metrics.observe_stage('forecast_personalize', time.perf_counter() - started)
+        
+        column = columns.index(group_id)
+        return {
+            'group_id': group_id,
+            'personal_multiplier': float(multipliers[0, column]),
+            'base_safe_hours': base[:, column],
+            'personal_safe_hours': adjusted[:, column],
+            'risk_scores': risk_scores[:, column],
+            'ensemble_safe_hours': ensemble_hours,
+            'ensemble_risk_scores': ensemble_risks,
+            'models_used': models_used,
+            'missing_features': missing_features_list
+        }
+    
+    def _personalize_matrix(self, columns, base, multipliers, has_profile):
+        """(satır x grup) base ve multiplier dizilerine _finalize_group_prediction / _combine_ensemble işlemleri
+        
+        base ve multipliers satır boyutunda yayınlanabilir (1 veya n satır).
+        (kişisel saatler, risk skorları, ensemble saatleri, ensemble riskleri,
+        kullanılan modeller) döner; güvenilir model yoksa ensemble dizileri None.
+        """
+        
+        adjusted = np.where(has_profile[:, None], np.clip(base / multipliers, 0.5, 8.5), base)
+        risk_scores = np.clip((8.5 - adjusted) / 8.0, 0, 1)
+        
+        # _combine_ensemble: test_r2 > 0.95 olan gruplar, grup sırasıyla birikimli ağırlıklı ortalama
+        weighted_hours = np.zeros(adjusted.shape[0], dtype=np.float64)
+        total_weight = 0
+        models_used = []
+        for column, group_id in enumerate(columns):
+            weight = self.models[group_id]['performance']['test_r2']
+            if weight > 0.95:
+                weighted_hours = weighted_hours + weight * adjusted[:, column]
+                total_weight += weight
+                models_used.append(group_id)
+        
+        if not models_used:
+            return adjusted, risk_scores, None, None, models_used
+        
+        ensemble_hours = weighted_hours / total_weight if total_weight > 0 else np.full(adjusted.shape[0], 4.0)
+        ensemble_risks = np.clip((8.5 - ensemble_hours) / 8.0, 0, 1)
+        return adjusted, risk_scores, ensemble_hours, ensemble_risks, models_used
+    
+    def _predict_all_groups(self, environmental_data, personal_params=None, prepared_features=None, group_ids=None):
+        """Yüklü tüm grup modellerini (group_ids verilirse yalnızca onları) ortak feature seti ile çalıştır"""
+        
+        metrics = self.metrics
+        loaded_groups = self.ensure_groups_loaded()
+        if group_ids is not None:
+            loaded_groups = [group_id for group_id in loaded_groups if group_id in group_ids]
+        
+        started = time.perf_counter()
+        if prepared_features is None:
+            prepared_features = self.prepare_features(environmental_data)
+        feature_vector, missing_features = prepared_features
+        feature_arrays = {
+            group_id: self.build_feature_array(feature_vector, group_id)
+            for group_id in loaded_groups
+        }
+        if metrics is not None:
+            metrics.observe_stage('features', time.perf_counter() - started)
+        
+        # Grup modelleri predict_base_batch içinde ayrıca ölçülür (önbellek/micro-batch beklemesi dahil değil)
+        started = time.perf_counter()
+        base_predictions = self._predict_base_values(feature_arrays)
+        if metrics is not None:
+            metrics.observe_stage('base_predictions', time.perf_counter() - started)
+        
+        # Önbellek isabetleri sözlük sırasını değiştirebilir; grup sırası korunur
+        ordered_predictions = {group_id: base_predictions[group_id] for group_id in feature_arrays}
+        return self._personalize_groups(ordered_predictions, missing_features, personal_params)
+    
+    def _personalize_groups(self, base_predictions, missing_features, personal_params=None):
+        """{group_id: base tahmin} → kişisel ağırlıklı grup sonuçları"""
+        
+        started = time.perf_counter()
+        personal_multipliers = self.calculate_personal_multipliers(personal_params) if personal_params else None
+        
         group_predictions = {}
+        for group_id, base_prediction in base_predictions.items():
+            group_predictions[group_id] = self._finalize_group_prediction(
+                group_id, base_prediction, missing_features, personal_params, personal_multipliers
+            )
+        if self.metrics is not None:
+            self.metrics.observe_stage('personalize', time.perf_counter() - started)
+        
+        return group_predictions
+    
+    def _combine_ensemble(self, group_predictions, environmental_data, personal_params=None, verbose=True):
+        """Grup tahminlerinden ensemble sonucunu oluştur"""
+        
         valid_predictions = []
         
-        for group_id in range(1, 6):
-            prediction = self.predict_group(environmental_data, group_id, personal_params)
-            if prediction:
-                group_predictions[group_id] = prediction
-                
-                # Sadece yüksek performanslı modelleri ensemble'da kullan
-                if prediction['performance']['test_r2'] > 0.95:
-                    valid_predictions.append(prediction)
-                
+        for group_id, prediction in group_predictions.items():
+            # Sadece yüksek performanslı modelleri ensemble'da kullan
+            if prediction['performance']['test_r2'] > 0.95:
+                valid_predictions.append(prediction)
+            
+            if verbose:
                 print(f"  Grup {group_id}: {prediction['personal_safe_hours']:.1f} saat (Risk: {prediction['risk_level']})")
         
         if not valid_predictions:
-            print("  ⚠️ Güvenilir tahmin bulunamadı")
+            if verbose:
+                print("  ⚠️ Güvenilir tahmin bulunamadı")
             return None
         
         # Ağırlıklı ortalama (performance-based)
@@ -516,7 +1270,7 @@ class ExpertAllermindPredictor:
             'individual_predictions': group_predictions,
             'personal_parameters': personal_params or {},
             'input_validation': {
-                'missing_features': group_predictions[1]['missing_features'] if group_predictions else [],
+                'missing_features': next(iter(group_predictions.values()))['missing_features'] if group_predictions else [],
                 'total_features': len(environmental_data)
             },
             'ensemble_info': {
@@ -531,14 +1285,17 @@ class ExpertAllermindPredictor:
         
         model_info = {}
         
-        for group_id, model_package in self.models.items():
+        for group_id in self.loaded_groups():
+            model_package = self.models[group_id]
             model_info[group_id] = {
                 'group_name': model_package['group_info']['name'],
                 'algorithm': model_package['algorithm_used'],
                 'performance': model_package['performance'],
                 'features_count': len(model_package['features']),
                 'target_type': model_package['target_info']['target_type'],
-                'created_at': model_package['created_at']
+                'created_at': model_package['created_at'],
+                'compiled': group_id in self.compiled_models,
+                'source': 'artifact' if 'artifact' in model_package else 'pickle'
             }
         
         return model_info
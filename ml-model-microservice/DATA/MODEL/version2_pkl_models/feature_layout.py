@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ALLERMIND V2.0 - COMPILED FEATURE LAYOUT
+Model feature listelerinden derlenen, dict'siz feature vektörü oluşturma
+"""
+
+import numpy as np
+
+# validate_input ile zorunlu tutulan özellikler
+REQUIRED_FEATURES = (
+    'temperature_2m', 'relative_humidity_2m', 'precipitation',
+    'wind_speed_10m', 'pm10', 'pm2_5', 'ozone', 'nitrogen_dioxide',
+    'uv_index', 'surface_pressure'
+)
+
+# Eksik çevresel veriler için varsayılan değerler
+FEATURE_DEFAULTS = {
+    'temperature_2m': 22.0, 'relative_humidity_2m': 55.0, 'precipitation': 0.0,
+    'snowfall': 0.0, 'rain': 0.0, 'cloud_cover': 30.0, 'surface_pressure': 1013.0,
+    'wind_speed_10m': 5.0, 'wind_direction_10m': 180.0, 'sunshine_duration': 8.0,
+    'pm10': 20.0, 'pm2_5': 12.0, 'carbon_dioxide': 400.0, 'carbon_monoxide': 1.0,
+    'nitrogen_dioxide': 20.0, 'sulphur_dioxide': 10.0, 'ozone': 100.0,
+    'aerosol_optical_depth': 0.2, 'methane': 1900.0, 'uv_index': 5.0,
+    'uv_index_clear_sky': 6.0, 'dust': 50.0, 'pollen_code': 0,
+    'in_season': 0, 'upi_value': 0, 'plant_code': 0,
+    'plant_in_season': 0, 'plant_upi_value': 0
+}
+
+# Sabit zaman/konum özellikleri (create_engineered_features ile aynı)
+DEFAULT_HOUR = 12  # Varsayılan öğle saati
+DEFAULT_DAY_OF_WEEK = 2  # Varsayılan çarşamba
+DEFAULT_LAT = 39.9334  # Varsayılan Ankara koordinatı
+DEFAULT_LON = 32.8597
+
+ENGINEERED_FEATURES = (
+    'hour', 'day_of_week', 'lat', 'lon', 'aqi_combined', 'pollen_risk_index',
+    'comfort_index', 'uv_danger_level', 'is_peak_pollen_hour', 'is_weekend'
+)
+
+# Kod, bayrak ve sayaç özellikleri (ayrık değerler; önbellek anahtarında yuvarlanmaz)
+DISCRETE_FEATURES = (
+    'pollen_code', 'in_season', 'plant_code', 'plant_in_season',
+    'hour', 'day_of_week', 'uv_danger_level', 'is_peak_pollen_hour', 'is_weekend'
+)
+
+
+def uv_danger_level(uv):
+    """UV indeksinden 0-4 arası tehlike seviyesi"""
+    if uv <= 2:
+        return 0
+    elif uv <= 5:
+        return 1
+    elif uv <= 7:
+        return 2
+    elif uv <= 10:
+        return 3
+    return 4
+
+
+class CompiledFeatureLayout:
+    """Grup modellerinin feature listelerinden derlenmiş vektör düzeni
+
+    Tüm modellerin görebileceği her özellik ortak bir float vektörde sabit bir
+    slota sahiptir. İstek başına bu vektör bir kez doldurulur; her grubun
+    satırı derleme sırasında hesaplanan index dizisiyle tek adımda seçilir.
+    Bilinmeyen özellikler her zaman 0.0 olan son slota eşlenir.
+    """
+
+    def __init__(self, group_features, dtype=np.float64):
+        self.dtype = dtype
+        self.slot_names = list(FEATURE_DEFAULTS) + [name for name in ENGINEERED_FEATURES if name not in FEATURE_DEFAULTS]
+        self.slot_index = {name: index for index, name in enumerate(self.slot_names)}
+        self.zero_slot = len(self.slot_names)
+        self.width = self.zero_slot + 1
+
+        self._required_slots = tuple(
+            (self.slot_index[name], name, float(FEATURE_DEFAULTS[name])) for name in REQUIRED_FEATURES
+        )
+        self._optional_slots = tuple(
+            (self.slot_index[name], name, default)
+            for name, default in FEATURE_DEFAULTS.items() if name not in REQUIRED_FEATURES
+        )
+        self._engineered_slots = tuple(self.slot_index[name] for name in ENGINEERED_FEATURES)
+
+        self.group_indices = {}
+        self.group_continuous = {}
+        for group_id, features in group_features.items():
+            self.add_group(group_id, features)
+
+    def add_group(self, group_id, features):
+        """Grup için feature → slot index dizisini ve sürekli sütun maskesini derle"""
+        self.group_indices[group_id] = np.array(
+            [self.slot_index.get(feature, self.zero_slot) for feature in features], dtype=np.intp
+        )
+        self.group_continuous[group_id] = np.array(
+            [feature not in DISCRETE_FEATURES for feature in features], dtype=bool
+        )
+
+    def fill(self, environmental_data, out, hour=DEFAULT_HOUR, day_of_week=DEFAULT_DAY_OF_WEEK):
+        """Çevresel veriden ortak vektörü doldur, eksik zorunlu özellikleri döndür
+
+        validate_input + create_engineered_features ile aynı değerleri üretir.
+        hour (0-23) ve day_of_week (pazartesi=0) zaman özelliklerini belirler.
+        """
+        missing_features = []
+        values = {}
+
+        for slot, name, default in self._required_slots:
+            if name in environmental_data:
+                value = float(environmental_data[name])
+            else:
+                missing_features.append(name)
+                value = default
+            out[slot] = value
+            values[name] = value
+
+        for slot, name, default in self._optional_slots:
+            out[slot] = environmental_data.get(name, default)
+
+        upi_value = out[self.slot_index['upi_value']]
+        plant_upi_value = out[self.slot_index['plant_upi_value']]
+        temp = values['temperature_2m']
+        humidity = values['relative_humidity_2m']
+        wind = values['wind_speed_10m']
+
+        hour_slot, dow_slot, lat_slot, lon_slot, aqi_slot, pollen_slot, comfort_slot, uv_slot, peak_slot, weekend_slot = self._engineered_slots
+        out[hour_slot] = hour
+        out[dow_slot] = day_of_week
+        out[lat_slot] = DEFAULT_LAT
+        out[lon_slot] = DEFAULT_LON
+        out[aqi_slot] = (
+            values['pm10'] * 0.3 +
+            values['pm2_5'] * 0.4 +
+            values['ozone'] * 0.2 +
+            values['nitrogen_dioxide'] * 0.1
+        )
+        out[pollen_slot] = float(upi_value) * 0.5 + float(plant_upi_value) * 0.3 + (wind / 20) * 0.2
+        out[comfort_slot] = temp - (0.55 - 0.0055 * humidity) * (temp - 14.5) - wind * 0.16
+        out[uv_slot] = uv_danger_level(values['uv_index'])
+        out[peak_slot] = 1 if 6 <= hour <= 10 else 0
+        out[weekend_slot] = 1 if day_of_week >= 5 else 0
+        out[self.zero_slot] = 0.0
+
+        return missing_features
+
+    def new_vector(self):
+        """Tek istek için ortak vektör"""
+        return np.empty(self.width, dtype=self.dtype)
+
+    def new_matrix(self, n_rows):
+        """Çoklu istek için (n_rows, width) ortak matris"""
+        return np.empty((n_rows, self.width), dtype=self.dtype)
+
+    def group_row(self, vector, group_id):
+        """Ortak vektörden grubun (1, n_features) satırı"""
+        return vector.take(self.group_indices[group_id]).reshape(1, -1)
+
+    def group_matrix(self, matrix, group_id):
+        """Ortak matristen grubun (n_rows, n_features) matrisi"""
+        return matrix.take(self.group_indices[group_id], axis=1)
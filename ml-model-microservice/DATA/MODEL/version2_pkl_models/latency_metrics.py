@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ALLERMIND V2.0 - LATENCY METRICS
+Sabit bucket'lı gecikme histogramları, sonuç sayaçları ve Prometheus text çıktısı
+"""
+
+import os
+import threading
+from bisect import bisect_left
+
+# Saniye cinsinden üst sınırlar (Prometheus 'le' etiketi); son bucket +Inf
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+
+class LatencyHistogram:
+    """Kümülatif olmayan sayaçlarla sabit bucket'lı histogram
+
+    observe() yalnızca bir bisect ve kilit altında üç tamsayı/float güncellemesi
+    yapar; istek başına yeni nesne ayrılmaz.
+    """
+
+    __slots__ = ('buckets', 'counts', 'total', 'count', '_lock')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += seconds
+            self.count += 1
+
+    def snapshot(self):
+        """(bucket sayaçları, toplam süre, gözlem sayısı)"""
+        with self._lock:
+            return list(self.counts), self.total, self.count
+
+
+class ServiceMetrics:
+    """Aşama / grup modeli gecikmeleri ve route bazlı istek sonuçları
+
+    Histogramlar ilk gözlemde oluşturulur ve (aile, etiketler) anahtarıyla
+    saklanır; sonraki gözlemler yalnızca sözlük okuması yapar.
+    """
+
+    STAGE_METRIC = 'allermind_stage_duration_seconds'
+    MODEL_METRIC = 'allermind_model_predict_duration_seconds'
+    MODEL_ROWS_METRIC = 'allermind_model_predict_rows_total'
+    REQUEST_METRIC = 'allermind_request_duration_seconds'
+    REQUEST_COUNT_METRIC = 'allermind_requests_total'
+    SINGLEFLIGHT_METRIC = 'allermind_singleflight_requests_total'
+    SINGLEFLIGHT_WAIT_METRIC = 'allermind_singleflight_wait_seconds'
+
+    HELP = {
+        STAGE_METRIC: 'Latency of request pipeline stages',
+        MODEL_METRIC: 'Latency of one group model predict call (any batch size)',
+        MODEL_ROWS_METRIC: 'Rows scored by each group model',
+        REQUEST_METRIC: 'End-to-end request latency by route',
+        REQUEST_COUNT_METRIC: 'Requests by route and outcome',
+        SINGLEFLIGHT_METRIC: 'Predict requests by singleflight role (leader, coalesced, timeout)',
+        SINGLEFLIGHT_WAIT_METRIC: 'Time duplicate requests waited for the leader',
+    }
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """METRICS_ENABLED=false ise None"""
+        if os.environ.get('METRICS_ENABLED', 'true').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls()
+
+    def _histogram(self, name, labels):
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram(self.buckets))
+        return histogram
+
+    def _increment(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe_stage(self, stage, seconds):
+        """İstek hattı aşaması (parse_json, convert_environment, features, ensemble, jsonify, ...)"""
+        self._histogram(self.STAGE_METRIC, (('stage', stage),)).observe(seconds)
+
+    def observe_model(self, group_id, algorithm, seconds, rows=1):
+        """Tek grup modeli çağrısı (micro-batch veya batch endpoint'inde birden çok satır)"""
+        labels = (('group', str(group_id)), ('algorithm', algorithm))
+        self._histogram(self.MODEL_METRIC, labels).observe(seconds)
+        self._increment(self.MODEL_ROWS_METRIC, labels, rows)
+
+    def observe_request(self, route, outcome, seconds):
+        """Route bazlı uçtan uca süre ve sonuç (success, client_error, unavailable, error)"""
+        self._histogram(self.REQUEST_METRIC, (('route', route),)).observe(seconds)
+        self._increment(self.REQUEST_COUNT_METRIC, (('route', route), ('outcome', outcome)))
+
+    def observe_singleflight(self, role, wait_seconds=None):
+        """Tekilleştirme rolü (leader, coalesced, timeout); bekleyen kopyaların bekleme süresi"""
+        self._increment(self.SINGLEFLIGHT_METRIC, (('role', role),))
+        if wait_seconds is not None:
+            self._histogram(self.SINGLEFLIGHT_WAIT_METRIC, (('role', role),)).observe(wait_seconds)
+
+    def render_prometheus(self):
+        """Prometheus text exposition formatı (0.0.4)"""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        lines = []
+        described = set()
+
+        for (name, labels), histogram in histograms:
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {self.HELP[name]}")
+                lines.append(f"# TYPE {name} histogram")
+
+            counts, total, count = histogram.snapshot()
+            label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+            prefix = f"{label_text}," if label_text else ''
+
+            cumulative = 0
+            for upper_bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{prefix}le="{upper_bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f"{name}_sum{{{label_text}}} {total:.9g}")
+            lines.append(f"{name}_count{{{label_text}}} {count}")
+
+        for (name, labels), value in counters:
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {self.HELP[name]}")
+                lines.append(f"# TYPE {name} counter")
+
+            label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+            lines.append(f"{name}{{{label_text}}} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
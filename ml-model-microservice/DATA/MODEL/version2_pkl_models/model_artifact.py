@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ALLERMIND V2.0 - MEMORY-MAPPABLE MODEL ARTIFACTS
+Derlenmiş grup modellerini tek bir hizalı dizi dosyası + JSON manifest olarak saklar
+
+    Grup{N}_advanced_model_v2.arrays          ham dizi baytları (64 bayt hizalı)
+    Grup{N}_advanced_model_v2.manifest.json   metadata, scaler parametreleri, dizi tablosu
+
+Yükleme sırasında dizi dosyası salt okunur `np.memmap` ile eşlenir: unpickle
+yapılmaz, sayfalar işletim sisteminin sayfa önbelleğinden okunur ve aynı
+dosyayı eşleyen tüm worker süreçleri bu sayfaları paylaşır.
+
+Kullanım (bu dizindeki pickle'ları dönüştür):
+    python model_artifact.py [model_dizini]
+"""
+
+import json
+import os
+import pickle
+import sys
+
+import numpy as np
+
+from tree_compiler import CompiledTreeEnsemble, TREE_ALGORITHMS, verify_parity as verify_tree_parity
+from native_inference import (
+    CompiledMLP, CompiledSVR, DENSE_ALGORITHMS, compile_dense_model, verify_parity as verify_dense_parity
+)
+
+# 2: tree değerlendiricileri allow_nan parametresini taşır
+ARTIFACT_VERSION = 2
+ARTIFACT_ALIGNMENT = 64
+
+# Manifest'teki 'evaluator' → derlenmiş değerlendirici sınıfı
+EVALUATOR_TYPES = {
+    'tree_ensemble': CompiledTreeEnsemble,
+    'mlp': CompiledMLP,
+    'svr': CompiledSVR,
+}
+
+# Manifest'e aynen kopyalanan model paketi alanları
+METADATA_KEYS = (
+    'features', 'group_info', 'performance', 'target_info', 'feature_importance',
+    'created_at', 'algorithm_used', 'scaling_method', 'personal_weight_system'
+)
+
+
+def artifact_paths(model_dir, group_id):
+    """(manifest yolu, dizi dosyası yolu)"""
+    base = os.path.join(model_dir, f"Grup{group_id}_advanced_model_v2")
+    return f"{base}.manifest.json", f"{base}.arrays"
+
+
+def _to_json(value):
+    """NumPy skaler/dizilerini JSON'a yazılabilir Python tiplerine çevir"""
+    if isinstance(value, dict):
+        return {str(key): _to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def scaler_params(scaler):
+    """Scaler'ın merkez/ölçek parametreleri (manifest için)"""
+    if scaler is None:
+        return None
+
+    center = getattr(scaler, 'center_', None)
+    if center is None:
+        center = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+
+    return {
+        'type': type(scaler).__name__,
+        'center': _to_json(center),
+        'scale': _to_json(scale),
+    }
+
+
+def compile_model_package(model_package):
+    """Model paketini derle ve doğrula
+
+    Returns:
+        (evaluator_type, derlenmiş model, max hata)
+
+    Raises:
+        ValueError: Desteklenmeyen algoritma veya parity doğrulaması başarısız
+    """
+    algorithm = model_package['algorithm_used']
+    model = model_package['model']
+
+    if algorithm in TREE_ALGORITHMS:
+        compiled = CompiledTreeEnsemble.from_estimator(model, parity=True)
+        if not verify_tree_parity(model, compiled):
+            raise ValueError("derlenmiş ağaçlar parity doğrulamasını geçemedi")
+        return 'tree_ensemble', compiled, 0.0
+
+    if algorithm in DENSE_ALGORITHMS:
+        compiled = compile_dense_model(model, model_package['scaler'])
+        passed, max_error = verify_dense_parity(model, model_package['scaler'], compiled)
+        if not passed:
+            raise ValueError(f"NumPy değerlendirici tolerans dışında (max hata {max_error:.2e})")
+        evaluator_type = 'mlp' if isinstance(compiled, CompiledMLP) else 'svr'
+        return evaluator_type, compiled, max_error
+
+    raise ValueError(f"Desteklenmeyen algoritma: {algorithm}")
+
+
+def export_model_artifact(model_package, model_dir, group_id, source_path=None):
+    """Model paketini memory-mappable artifact olarak yaz
+
+    Önce dizi dosyası, en son manifest yazılır (ikisi de geçici dosya +
+    os.replace ile); manifest olmadan dizi dosyası hiçbir zaman kullanılmaz.
+
+    Args:
+        source_path: Kaynak pickle; boyutu manifest'e yazılır ve yüklemede
+            artifact'in güncel olup olmadığını anlamak için kullanılır
+
+    Returns:
+        Manifest dosyasının yolu
+    """
+    evaluator_type, compiled, max_error = compile_model_package(model_package)
+    arrays, params = compiled.get_state()
+    manifest_path, arrays_path = artifact_paths(model_dir, group_id)
+
+    array_table = {}
+    offset = 0
+    temp_arrays_path = f"{arrays_path}.tmp"
+    with open(temp_arrays_path, 'wb') as f:
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            padding = -offset % ARTIFACT_ALIGNMENT
+            f.write(b'\0' * padding)
+            offset += padding
+
+            array_table[name] = {
+                'dtype': array.dtype.str,
+                'shape': list(array.shape),
+                'offset': offset,
+            }
+            f.write(array.tobytes())
+            offset += array.nbytes
+    os.replace(temp_arrays_path, arrays_path)
+
+    manifest = {key: _to_json(model_package.get(key)) for key in METADATA_KEYS}
+    manifest.update({
+        'artifact_version': ARTIFACT_VERSION,
+        'group_id': group_id,
+        'evaluator': evaluator_type,
+        'params': _to_json(params),
+        'arrays_file': os.path.basename(arrays_path),
+        'arrays_size': offset,
+        'arrays': array_table,
+        'scaler': scaler_params(model_package.get('scaler')),
+        'parity_max_error': max_error,
+        'source': {
+            'file': os.path.basename(source_path),
+            'size': os.path.getsize(source_path),
+            'mtime_ns': os.stat(source_path).st_mtime_ns,
+        } if source_path else None,
+    })
+
+    temp_manifest_path = f"{manifest_path}.tmp"
+    with open(temp_manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(temp_manifest_path, manifest_path)
+
+    return manifest_path
+
+
+def read_manifest(model_dir, group_id):
+    """Grubun manifest'ini oku; artifact yoksa None"""
+    manifest_path, _ = artifact_paths(model_dir, group_id)
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def is_artifact_current(manifest, source_path):
+    """Artifact kaynak pickle ile uyumlu mu (pickle yoksa artifact tek kaynaktır)
+
+    Boyut ve (kayıtlıysa) değiştirilme zamanı karşılaştırılır; aynı boyutta
+    yeniden eğitilmiş bir pickle eski artifact'i geçersiz kılar.
+    """
+    if not os.path.exists(source_path):
+        return True
+
+    source = manifest.get('source')
+    if source is None:
+        return False
+    stat = os.stat(source_path)
+    return source['size'] == stat.st_size and source.get('mtime_ns', stat.st_mtime_ns) == stat.st_mtime_ns
+
+
+def load_model_artifact(model_dir, group_id, manifest=None):
+    """Artifact'i salt okunur eşle
+
+    Returns:
+        (model paketi, derlenmiş model). Paket pickle ile aynı metadata
+        anahtarlarını taşır; 'model' ve 'scaler' None'dır (scaler derlenmiş
+        modele katlanmıştır, parametreleri 'scaler_params' altında durur).
+
+    Raises:
+        FileNotFoundError: Manifest veya dizi dosyası yok
+        ValueError: Desteklenmeyen sürüm/değerlendirici ya da bozuk dizi dosyası
+    """
+    if manifest is None:
+        manifest = read_manifest(model_dir, group_id)
+        if manifest is None:
+            raise FileNotFoundError(artifact_paths(model_dir, group_id)[0])
+
+    if manifest.get('artifact_version') != ARTIFACT_VERSION:
+        raise ValueError(f"Desteklenmeyen artifact sürümü: {manifest.get('artifact_version')}")
+    evaluator_class = EVALUATOR_TYPES.get(manifest['evaluator'])
+    if evaluator_class is None:
+        raise ValueError(f"Desteklenmeyen değerlendirici: {manifest['evaluator']}")
+
+    arrays_path = os.path.join(model_dir, manifest['arrays_file'])
+    if os.path.getsize(arrays_path) != manifest['arrays_size']:
+        raise ValueError(f"{manifest['arrays_file']} boyutu manifest ile uyuşmuyor")
+
+    buffer = np.memmap(arrays_path, dtype=np.uint8, mode='r')
+    arrays = {
+        name: np.ndarray(shape=tuple(entry['shape']), dtype=np.dtype(entry['dtype']),
+                         buffer=buffer, offset=entry['offset'])
+        for name, entry in manifest['arrays'].items()
+    }
+    compiled = evaluator_class.from_state(arrays, manifest['params'])
+
+    model_package = {key: manifest.get(key) for key in METADATA_KEYS}
+    model_package.update({
+        'model': None,
+        'scaler': None,
+        'scaler_params': manifest.get('scaler'),
+        'artifact': {
+            'manifest': os.path.basename(artifact_paths(model_dir, group_id)[0]),
+            'evaluator': manifest['evaluator'],
+            'mappedBytes': manifest['arrays_size'],
+        },
+    })
+
+    return model_package, compiled
+
+
+def main(argv=None):
+    """Dizindeki Grup{N} pickle'larını artifact'e dönüştür"""
+    argv = sys.argv[1:] if argv is None else argv
+    model_dir = argv[0] if argv else os.path.dirname(os.path.abspath(__file__))
+    all_passed = True
+
+    for group_id in range(1, 6):
+        source_path = os.path.join(model_dir, f"Grup{group_id}_advanced_model_v2.pkl")
+        if not os.path.exists(source_path):
+            continue
+
+        try:
+            with open(source_path, 'rb') as f:
+                model_package = pickle.load(f)
+            manifest_path = export_model_artifact(model_package, model_dir, group_id, source_path)
+            manifest = read_manifest(model_dir, group_id)
+            print(f"✅ Grup {group_id} ({model_package['algorithm_used']}): {os.path.basename(manifest_path)}, "
+                  f"{manifest['arrays_size'] / 1024:.1f} KB dizi")
+        except Exception as e:
+            all_passed = False
+            print(f"❌ Grup {group_id} dönüştürülemedi: {e}")
+
+    return 0 if all_passed else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
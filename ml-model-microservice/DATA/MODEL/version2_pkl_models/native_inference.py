@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ALLERMIND V2.0 - NUMPY-NATIVE INFERENCE
+MLPRegressor ve SVR modelleri için scaler'ı içine katlanmış hafif değerlendiriciler
+"""
+
+import os
+import pickle
+
+import numpy as np
+
+# Derlenebilen algoritmalar (model paketindeki 'algorithm_used' değerleri)
+DENSE_ALGORITHMS = ('SVR', 'NeuralNetwork')
+
+# Parity toleransı (katlanmış scaler işlem sırasını değiştirir)
+PARITY_RTOL = 1e-7
+PARITY_ATOL = 1e-9
+
+ACTIVATIONS = {
+    'identity': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0.0, out=x),
+    'tanh': lambda x: np.tanh(x, out=x),
+    'logistic': lambda x: np.divide(1.0, 1.0 + np.exp(-x), out=x),
+}
+
+
+def check_finite(X, allow_nan=False):
+    """sklearn'ün girdi kontrolü ile aynı: NaN / ±inf içeren matris için ValueError"""
+    if np.isfinite(X).all():
+        return
+    if not allow_nan and np.isnan(X).any():
+        raise ValueError("Input X contains NaN.")
+    if np.isinf(X).any():
+        raise ValueError(f"Input X contains infinity or a value too large for {X.dtype!r}.")
+
+
+def scaler_affine(scaler, n_features):
+    """Scaler'ı x * multiplier + offset biçimine çevir (scaler yoksa birim dönüşüm)"""
+    multiplier = np.ones(n_features)
+    offset = np.zeros(n_features)
+
+    if scaler is None:
+        return multiplier, offset
+
+    center = getattr(scaler, 'center_', None)
+    if center is None:
+        center = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+
+    if scale is not None:
+        multiplier = 1.0 / np.asarray(scale, dtype=np.float64)
+    if center is not None:
+        offset = -np.asarray(center, dtype=np.float64) * multiplier
+
+    return multiplier, offset
+
+
+class CompiledMLP:
+    """RobustScaler'ı ilk katmana katlanmış MLPRegressor değerlendiricisi
+
+    (x - c) / s @ W1 + b1  =  x @ (W1 / s) + (b1 - (c / s) @ W1)
+    """
+
+    def __init__(self, weights, biases, activation, out_activation):
+        self.weights = weights
+        self.biases = biases
+        self.activation_name = activation
+        self.out_activation_name = out_activation
+        self.activation = ACTIVATIONS[activation]
+        self.out_activation = ACTIVATIONS[out_activation]
+        self.n_features = weights[0].shape[0]
+
+    @classmethod
+    def from_estimator(cls, model, scaler=None):
+        from sklearn.neural_network import MLPRegressor
+
+        if not isinstance(model, MLPRegressor):
+            raise ValueError(f"Desteklenmeyen model: {type(model).__name__}")
+        if model.activation not in ACTIVATIONS or model.out_activation_ not in ACTIVATIONS:
+            raise ValueError(f"Desteklenmeyen aktivasyon: {model.activation}")
+        if model.n_outputs_ != 1:
+            raise ValueError("Çok çıktılı MLP desteklenmiyor")
+
+        weights = [np.ascontiguousarray(w, dtype=np.float64) for w in model.coefs_]
+        biases = [np.asarray(b, dtype=np.float64) for b in model.intercepts_]
+
+        multiplier, offset = scaler_affine(scaler, weights[0].shape[0])
+        first_weight = weights[0] * multiplier[:, None]
+        biases[0] = biases[0] + offset @ weights[0]
+        weights[0] = np.ascontiguousarray(first_weight)
+
+        return cls(weights, biases, model.activation, model.out_activation_)
+
+    def get_state(self):
+        """(diziler, skaler parametreler) — model_artifact ile diske yazılır"""
+        arrays = {}
+        for layer, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            arrays[f'weight_{layer}'] = weight
+            arrays[f'bias_{layer}'] = bias
+        params = {
+            'n_layers': len(self.weights),
+            'activation': self.activation_name,
+            'out_activation': self.out_activation_name,
+        }
+        return arrays, params
+
+    @classmethod
+    def from_state(cls, arrays, params):
+        """get_state çıktısından (ör. salt okunur memmap dizilerinden) yeniden kur"""
+        n_layers = params['n_layers']
+        return cls(
+            [arrays[f'weight_{layer}'] for layer in range(n_layers)],
+            [arrays[f'bias_{layer}'] for layer in range(n_layers)],
+            params['activation'],
+            params['out_activation']
+        )
+
+    def predict(self, X):
+        activations = np.asarray(X, dtype=np.float64)
+        check_finite(activations)
+        last_layer = len(self.weights) - 1
+
+        for layer, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            activations = activations @ weight
+            activations += bias
+            if layer < last_layer:
+                activations = self.activation(activations)
+
+        return self.out_activation(activations).ravel()
+
+
+class CompiledSVR:
+    """RobustScaler'ı girdi dönüşümüne katlanmış RBF/linear SVR değerlendiricisi
+
+    libsvm ile aynı açılım: ||x - sv||² = x·x + sv·sv - 2 x·sv
+    """
+
+    def __init__(self, kernel, support_vectors, dual_coef, intercept, gamma, multiplier, offset, support_norms=None):
+        self.kernel = kernel
+        self.support_vectors = support_vectors
+        if support_norms is None:
+            support_norms = np.einsum('ij,ij->i', support_vectors, support_vectors)
+        self.support_norms = support_norms
+        self.dual_coef = dual_coef
+        self.intercept = intercept
+        self.gamma = gamma
+        self.multiplier = multiplier
+        self.offset = offset
+        self.n_features = support_vectors.shape[1]
+
+    @classmethod
+    def from_estimator(cls, model, scaler=None):
+        from sklearn.svm import SVR
+
+        if not isinstance(model, SVR):
+            raise ValueError(f"Desteklenmeyen model: {type(model).__name__}")
+        if model.kernel not in ('rbf', 'linear'):
+            raise ValueError(f"Desteklenmeyen kernel: {model.kernel}")
+
+        support_vectors = np.ascontiguousarray(model.support_vectors_, dtype=np.float64)
+        multiplier, offset = scaler_affine(scaler, support_vectors.shape[1])
+
+        return cls(
+            kernel=model.kernel,
+            support_vectors=support_vectors,
+            dual_coef=np.asarray(model.dual_coef_[0], dtype=np.float64),
+            intercept=float(model.intercept_[0]),
+            gamma=float(model._gamma),
+            multiplier=multiplier,
+            offset=offset
+        )
+
+    def get_state(self):
+        """(diziler, skaler parametreler) — model_artifact ile diske yazılır"""
+        arrays = {
+            'support_vectors': self.support_vectors,
+            'support_norms': self.support_norms,
+            'dual_coef': self.dual_coef,
+            'multiplier': self.multiplier,
+            'offset': self.offset,
+        }
+        params = {
+            'kernel': self.kernel,
+            'intercept': self.intercept,
+            'gamma': self.gamma,
+        }
+        return arrays, params
+
+    @classmethod
+    def from_state(cls, arrays, params):
+        """get_state çıktısından (ör. salt okunur memmap dizilerinden) yeniden kur"""
+        return cls(**arrays, **params)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        check_finite(X)
+        scaled = X * self.multiplier
+        scaled += self.offset
+
+        dot_products = scaled @ self.support_vectors.T
+        if self.kernel == 'linear':
+            kernel_values = dot_products
+        else:
+            squared_distances = np.einsum('ij,ij->i', scaled, scaled)[:, None] + self.support_norms - 2.0 * dot_products
+            np.maximum(squared_distances, 0.0, out=squared_distances)
+            kernel_values = np.exp(-self.gamma * squared_distances)
+
+        return kernel_values @ self.dual_coef + self.intercept
+
+
+def compile_dense_model(model, scaler=None):
+    """MLPRegressor veya SVR için uygun NumPy değerlendiricisini oluştur"""
+    from sklearn.neural_network import MLPRegressor
+
+    if isinstance(model, MLPRegressor):
+        return CompiledMLP.from_estimator(model, scaler)
+    return CompiledSVR.from_estimator(model, scaler)
+
+
+def parity_sample(scaler, n_features, n_rows=64, seed=0):
+    """Scaler merkez/ölçeğine göre deterministik doğrulama matrisi"""
+    rng = np.random.default_rng(seed)
+    multiplier, offset = scaler_affine(scaler, n_features)
+    # Ölçeklenmiş uzayda N(0, 2) → ham uzaya geri dönüş
+    scaled = rng.normal(scale=2.0, size=(n_rows, n_features))
+    return (scaled - offset) / multiplier
+
+
+def rejects_input(predict, X):
+    """predict(X) ValueError ile reddediyor mu"""
+    try:
+        predict(X)
+    except ValueError:
+        return True
+    return False
+
+
+def verify_parity(model, scaler, compiled, X=None):
+    """scaler.transform + model.predict ile tolerans içinde aynı sonucu doğrula
+
+    NaN ve inf içeren satırların da iki yolda ValueError ile reddedildiği kontrol edilir.
+    """
+    if X is None:
+        X = parity_sample(scaler, compiled.n_features)
+
+    expected = model.predict(scaler.transform(X) if scaler is not None else X)
+    actual = compiled.predict(X)
+    passed = bool(np.allclose(expected, actual, rtol=PARITY_RTOL, atol=PARITY_ATOL))
+
+    def reference(rows):
+        return model.predict(scaler.transform(rows) if scaler is not None else rows)
+
+    for bad_value in (np.nan, np.inf, -np.inf):
+        bad_rows = np.array(X[:1], dtype=np.float64)
+        bad_rows[0, 0] = bad_value
+        passed = passed and rejects_input(reference, bad_rows) and rejects_input(compiled.predict, bad_rows)
+
+    return passed, float(np.max(np.abs(expected - actual)))
+
+
+def main():
+    """Bu dizindeki MLP/SVR pickle'larına karşı parity kontrolü"""
+    model_dir = os.path.dirname(os.path.abspath(__file__))
+    all_passed = True
+
+    for group_id in range(1, 6):
+        model_path = os.path.join(model_dir, f"Grup{group_id}_advanced_model_v2.pkl")
+        if not os.path.exists(model_path):
+            continue
+
+        with open(model_path, 'rb') as f:
+            model_package = pickle.load(f)
+        if model_package['algorithm_used'] not in DENSE_ALGORITHMS:
+            continue
+
+        compiled = compile_dense_model(model_package['model'], model_package['scaler'])
+        for n_rows in (1, 256):
+            passed, max_error = verify_parity(
+                model_package['model'], model_package['scaler'], compiled,
+                parity_sample(model_package['scaler'], compiled.n_features, n_rows=n_rows, seed=group_id)
+            )
+            all_passed = all_passed and passed
+            print(f"{'✅' if passed else '❌'} Grup {group_id} ({model_package['algorithm_used']}), {n_rows} satır: max hata {max_error:.2e}")
+
+    return 0 if all_passed else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ALLERMIND V2.0 - PREDICTION CACHE
+Thread-safe TTL + LRU önbellek ve grup bazlı base tahmin önbelleği
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class TTLLRUCache:
+    """Boyut sınırlı, LRU tahliyeli, opsiyonel TTL'li thread-safe önbellek"""
+
+    def __init__(self, max_size=4096, ttl_seconds=None):
+        self.max_size = max(1, int(max_size))
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """Anahtarın değerini döndür; yoksa veya süresi dolmuşsa default"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Değeri kaydet, gerekirse en eski kaydı tahliye et"""
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        """Kaydı sil ve değerini döndür"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        """Tüm kayıtları sil"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get_stats(self):
+        """Hit/miss sayaçları ve doluluk"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': True,
+                'size': len(self._entries),
+                'maxSize': self.max_size,
+                'ttlSeconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+
+class BasePredictionCache(TTLLRUCache):
+    """Grup modeli base tahminleri için önbellek
+
+    Anahtar, grubun feature satırının kanonik byte gösterimidir.
+    `significant_digits` verilirse satırın sürekli sütunları kendi
+    büyüklüklerine göre bu kadar anlamlı basamağa yuvarlanır (methane 1900 ile
+    aerosol 0.2 aynı göreli hassasiyeti korur); kod/bayrak sütunları her zaman
+    tam değeriyle anahtara girer. Böylece çok yakın çevresel değerler aynı base
+    tahmini paylaşır. Kişisel multiplier önbellekten sonra uygulandığı için
+    sonuçlar kullanıcıya özel kalır.
+    """
+
+    def __init__(self, max_size=4096, ttl_seconds=900.0, significant_digits=None):
+        super().__init__(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.significant_digits = significant_digits if significant_digits and significant_digits > 0 else None
+
+    @classmethod
+    def from_env(cls):
+        """PREDICTION_CACHE_SIZE > 0 ise önbelleği oluştur, değilse None"""
+        max_size = int(os.environ.get('PREDICTION_CACHE_SIZE', 4096))
+        if max_size <= 0:
+            return None
+        return cls(
+            max_size=max_size,
+            ttl_seconds=float(os.environ.get('PREDICTION_CACHE_TTL', 900)),
+            significant_digits=int(os.environ.get('PREDICTION_CACHE_SIG_DIGITS', 0))
+        )
+
+    def make_key(self, group_id, feature_array, continuous=None):
+        """Grup + feature satırından anahtar
+
+        continuous, grubun sürekli sütun maskesidir (CompiledFeatureLayout.group_continuous);
+        verilmezse satır yuvarlanmadan kullanılır.
+        """
+        # + 0.0: -0.0 ve 0.0 aynı anahtarı üretsin (ve girdi dizisi kopyalansın)
+        canonical = np.asarray(feature_array, dtype=np.float64) + 0.0
+        if self.significant_digits and continuous is not None:
+            canonical[..., continuous] = round_significant(canonical[..., continuous], self.significant_digits)
+        return group_id, canonical.tobytes()
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats['significantDigits'] = self.significant_digits
+        return stats
+
+
+def round_significant(values, digits):
+    """Her değeri kendi büyüklüğüne göre `digits` anlamlı basamağa yuvarla (0 ve NaN/inf olduğu gibi kalır)"""
+    rounded = values.copy()
+    scalable = np.isfinite(values) & (values != 0)
+    magnitude = np.floor(np.log10(np.abs(values[scalable])))
+    step = 10.0 ** (magnitude - (digits - 1))
+    rounded[scalable] = np.rint(values[scalable] / step) * step
+    return rounded
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ALLERMIND V2.0 - BASE RISK GRID
+İl (plaka) x saat bazında önceden hesaplanmış grup base tahminleri
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+PROVINCE_COUNT = 81
+SNAPSHOT_PREFIX = 'risk-grid-'
+SNAPSHOT_SUFFIX = '.json'
+
+
+def hour_slot(value=None):
+    """datetime / ISO metin / None (şimdi) → saat başına yuvarlanmış yerel (naive) datetime"""
+    if value is None:
+        value = datetime.now()
+    elif isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError(f"Geçersiz saat değeri: {value} (ISO 8601 bekleniyor)")
+    elif not isinstance(value, datetime):
+        raise ValueError(f"Geçersiz saat değeri: {value!r}")
+
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def validate_plaka(plaka):
+    """Plaka 1-81 arası tamsayı olmalı"""
+    if isinstance(plaka, bool) or not isinstance(plaka, int) or plaka < 1 or plaka > PROVINCE_COUNT:
+        raise ValueError(f"plaka 1-{PROVINCE_COUNT} arasında bir sayı olmalı: {plaka!r}")
+    return plaka
+
+
+class BaseRiskGrid:
+    """Saatlik il snapshot'larından hesaplanan base güvenli saat ızgarası
+
+    ingest() bir saatin tüm il çevresel verilerini alır ve her grup modelini
+    tüm iller için tek vektörize çağrıyla çalıştırır. lookup() (plaka, saat)
+    için base tahminleri döndürür; kişisel multiplier istekte uygulanır.
+
+    Girdi `max_age_seconds` süresinden eski ise bayat sayılır ve isabet
+    vermez; çağıran canlı tahmine düşer. En fazla `max_hours` saat tutulur,
+    en eski saat önce silinir.
+
+    `snapshot_dir` verilirse alınan snapshot'lar (çevresel veri, tahmin değil)
+    oraya yazılır. Aynı dizini paylaşan diğer süreçler (gunicorn worker'ları)
+    lookup sırasında daha yeni dosyayı görünce kendi ızgaralarını yeniden
+    hesaplar; böylece ingest isteğinin tek bir worker'a gitmesi yeterlidir.
+    """
+
+    def __init__(self, predictor, max_age_seconds=5400.0, max_hours=48, snapshot_dir=None):
+        self.predictor = predictor
+        self.max_age_seconds = float(max_age_seconds)
+        self.max_hours = max(1, int(max_hours))
+        self.snapshot_dir = snapshot_dir
+        # saat → {'rows': {plaka: satır}, 'base': {grup: dizi}, ...}
+        self._slots = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.ingests = 0
+
+        if self.snapshot_dir:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, predictor):
+        """RISK_GRID_ENABLED=false ise None"""
+        if os.environ.get('RISK_GRID_ENABLED', 'true').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(
+            predictor,
+            max_age_seconds=float(os.environ.get('RISK_GRID_MAX_AGE_SECONDS', 5400)),
+            max_hours=int(os.environ.get('RISK_GRID_MAX_HOURS', 48)),
+            snapshot_dir=os.environ.get('RISK_GRID_DIR') or None
+        )
+
+    def ingest(self, hour, city_environments, ingested_at=None, publish=True):
+        """{plaka: expert çevresel veri} snapshot'ını `hour` saatine yükle
+
+        Aynı saatin önceki snapshot'ı tamamen değiştirilir. Özet döner.
+        """
+        if not city_environments:
+            raise ValueError("Snapshot en az bir il içermeli")
+
+        slot = hour_slot(hour)
+        plakas = sorted(validate_plaka(plaka) for plaka in city_environments)
+        environments = [city_environments[plaka] for plaka in plakas]
+
+        started = time.perf_counter()
+        base_predictions, missing_features_list = self.predictor.predict_base_grid(environments)
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        ingested_at = time.time() if ingested_at is None else ingested_at
+        entry = {
+            'rows': {plaka: row_index for row_index, plaka in enumerate(plakas)},
+            'base': base_predictions,
+            'missing': missing_features_list,
+            'environments': environments,
+            'ingested_at': ingested_at,
+            'snapshot_mtime': None,
+            'duration_ms': duration_ms
+        }
+
+        if publish and self.snapshot_dir:
+            entry['snapshot_mtime'] = self._write_snapshot(slot, city_environments, ingested_at)
+
+        with self._lock:
+            self._slots[slot] = entry
+            self.ingests += 1
+            for old_slot in sorted(self._slots)[:-self.max_hours]:
+                del self._slots[old_slot]
+
+        return {
+            'hour': slot.isoformat(),
+            'cities': len(plakas),
+            'groups': sorted(base_predictions),
+            'durationMs': round(duration_ms, 3),
+            'ingestedAt': datetime.fromtimestamp(ingested_at).isoformat()
+        }
+
+    def lookup(self, plaka, hour=None):
+        """(plaka, saat) için güncel grid kaydı; yoksa veya bayatsa None
+
+        Dönen sözlük: plaka, hour, environmental_data, base_predictions,
+        missing_features, age_seconds
+        """
+        slot = hour_slot(hour)
+        if self.snapshot_dir:
+            self._sync_snapshot(slot)
+
+        with self._lock:
+            entry = self._slots.get(slot)
+            row_index = entry['rows'].get(plaka) if entry is not None else None
+            if row_index is None:
+                self.misses += 1
+                return None
+
+            age_seconds = time.time() - entry['ingested_at']
+            if age_seconds > self.max_age_seconds:
+                self.stale += 1
+                return None
+
+            self.hits += 1
+
+        return {
+            'plaka': plaka,
+            'hour': slot,
+            'environmental_data': entry['environments'][row_index],
+            'base_predictions': {group_id: float(values[row_index]) for group_id, values in entry['base'].items()},
+            'missing_features': list(entry['missing'][row_index]),
+            'age_seconds': age_seconds
+        }
+
+    def clear(self):
+        """Tüm saatleri sil (model değişince base tahminler geçersizdir)"""
+        with self._lock:
+            self._slots.clear()
+
+    def get_stats(self):
+        """Saat bazlı doluluk, yaş ve isabet sayaçları"""
+        now = time.time()
+        with self._lock:
+            hours = [
+                {
+                    'hour': slot.isoformat(),
+                    'cities': len(entry['rows']),
+                    'groups': sorted(entry['base']),
+                    'ageSeconds': round(now - entry['ingested_at'], 1),
+                    'stale': now - entry['ingested_at'] > self.max_age_seconds,
+                    'computeMs': round(entry['duration_ms'], 3)
+                }
+                for slot, entry in sorted(self._slots.items())
+            ]
+            lookups = self.hits + self.misses + self.stale
+            return {
+                'enabled': True,
+                'maxAgeSeconds': self.max_age_seconds,
+                'maxHours': self.max_hours,
+                'snapshotDir': self.snapshot_dir,
+                'hours': hours,
+                'ingests': self.ingests,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'hitRate': self.hits / lookups if lookups else 0.0
+            }
+
+    def _snapshot_path(self, slot):
+        return os.path.join(self.snapshot_dir, f"{SNAPSHOT_PREFIX}{slot.strftime('%Y%m%dT%H')}{SNAPSHOT_SUFFIX}")
+
+    def _write_snapshot(self, slot, city_environments, ingested_at):
+        """Snapshot'ı atomik olarak yaz, `max_hours` dışında kalan eski dosyaları sil; mtime döner"""
+        path = self._snapshot_path(slot)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'hour': slot.isoformat(),
+                'ingestedAt': ingested_at,
+                'cities': {str(plaka): environment for plaka, environment in city_environments.items()}
+            }, f)
+        os.replace(temp_path, path)
+
+        # Saat damgalı isimler kronolojik sıralanır
+        snapshots = sorted(
+            name for name in os.listdir(self.snapshot_dir)
+            if name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)
+        )
+        for name in snapshots[:-self.max_hours]:
+            try:
+                os.remove(os.path.join(self.snapshot_dir, name))
+            except OSError:
+                pass
+
+        return os.stat(path).st_mtime_ns
+
+    def _sync_snapshot(self, slot):
+        """Paylaşılan dizinde bu saat için daha yeni snapshot varsa yerel ızgarayı yeniden hesapla"""
+        path = self._snapshot_path(slot)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return
+
+        with self._lock:
+            entry = self._slots.get(slot)
+            if entry is not None and entry['snapshot_mtime'] is not None and entry['snapshot_mtime'] >= mtime:
+                return
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        # Aynı snapshot'ı yerelde zaten almış olabiliriz (ingest eden süreç)
+        if entry is not None and entry['ingested_at'] >= snapshot['ingestedAt']:
+            entry['snapshot_mtime'] = mtime
+            return
+
+        self.ingest(
+            slot, {int(plaka): environment for plaka, environment in snapshot['cities'].items()},
+            ingested_at=snapshot['ingestedAt'], publish=False
+        )
+        with self._lock:
+            synced = self._slots.get(slot)
+            if synced is not None:
+                synced['snapshot_mtime'] = mtime
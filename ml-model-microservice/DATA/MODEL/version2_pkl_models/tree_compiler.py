@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ALLERMIND V2.0 - ARRAY-COMPILED TREE ENSEMBLES
+RandomForest / ExtraTrees / GradientBoosting modellerini düz NumPy dizilerine derler
+"""
+
+import numpy as np
+
+from native_inference import check_finite
+
+# Derlenebilen algoritmalar (model paketindeki 'algorithm_used' değerleri)
+TREE_ALGORITHMS = ('RandomForest', 'ExtraTrees', 'GradientBoosting')
+
+
+class CompiledTreeEnsemble:
+    """Tüm ağaçları tek seferde gezen vektörize tree ensemble değerlendiricisi
+
+    Her ağacın düğümleri ortak dizilere (feature index, threshold, sol/sağ çocuk,
+    yaprak değeri) art arda yazılır. Yapraklar kendilerine döngü yapar; böylece
+    en derin ağaç kadar adımda tüm satırlar ve tüm ağaçlar birlikte ilerler.
+
+    parity=True iken ağaç değerleri sklearn'deki sırayla (soldan sağa, ardışık)
+    toplanır ve sonuç n_jobs=1 ile çalışan model.predict ile bit düzeyinde aynıdır.
+    parity=False iken NumPy'nin ikili toplamı kullanılır (son basamakta fark olabilir).
+
+    allow_nan, estimator'ın NaN kabul edip etmediğidir (RandomForest/ExtraTrees
+    kabul eder, GradientBoosting etmez); kabul etmeyen modelde NaN içeren girdi
+    sklearn gibi ValueError ile reddedilir. inf her zaman reddedilir.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, depth,
+                 n_features, baseline=0.0, divisor=1.0, parity=True, allow_nan=False):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.n_features = n_features
+        self.n_trees = len(roots)
+        self.baseline = baseline
+        self.divisor = divisor
+        self.parity = parity
+        self.allow_nan = allow_nan
+
+    @classmethod
+    def from_estimator(cls, model, parity=True):
+        """Eğitilmiş sklearn tree ensemble'ını derle
+
+        Raises:
+            ValueError: Desteklenmeyen model veya çok çıktılı ağaçlar
+        """
+        from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor, ExtraTreesRegressor
+        from sklearn.dummy import DummyRegressor
+
+        scale = 1.0
+        baseline = 0.0
+        divisor = 1.0
+
+        if isinstance(model, (RandomForestRegressor, ExtraTreesRegressor)):
+            trees = list(model.estimators_)
+            divisor = float(len(trees))
+        elif isinstance(model, GradientBoostingRegressor):
+            if model.estimators_.shape[1] != 1:
+                raise ValueError("Çok çıktılı GradientBoosting desteklenmiyor")
+            trees = list(model.estimators_[:, 0])
+            scale = model.learning_rate
+            if isinstance(model.init_, str) and model.init_ == 'zero':
+                baseline = 0.0
+            elif isinstance(model.init_, DummyRegressor):
+                baseline = float(np.ravel(model.init_.constant_)[0])
+            else:
+                raise ValueError(f"Desteklenmeyen GradientBoosting init: {type(model.init_).__name__}")
+        else:
+            raise ValueError(f"Desteklenmeyen model: {type(model).__name__}")
+
+        features, thresholds, lefts, rights, missing_lefts, values, roots = [], [], [], [], [], [], []
+        depth = 0
+        offset = 0
+
+        for tree in trees:
+            tree_ = tree.tree_
+            if tree_.n_outputs != 1:
+                raise ValueError("Çok çıktılı ağaçlar desteklenmiyor")
+
+            node_count = tree_.node_count
+            node_ids = np.arange(node_count, dtype=np.intp)
+            is_leaf = tree_.children_left < 0
+
+            feature = np.where(is_leaf, 0, tree_.feature).astype(np.intp)
+            left = np.where(is_leaf, node_ids, tree_.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree_.children_right) + offset
+
+            nodes = tree_.__getstate__()['nodes']
+            if 'missing_go_to_left' in nodes.dtype.names:
+                missing_left = nodes['missing_go_to_left'].astype(bool)
+            else:
+                missing_left = np.zeros(node_count, dtype=bool)
+
+            value = tree_.value[:, 0, 0].astype(np.float64)
+            if scale != 1.0:
+                # predict_stages ile aynı çarpım: learning_rate * leaf value
+                value = scale * value
+
+            features.append(feature)
+            thresholds.append(tree_.threshold.astype(np.float64))
+            lefts.append(left.astype(np.intp))
+            rights.append(right.astype(np.intp))
+            missing_lefts.append(missing_left)
+            values.append(value)
+            roots.append(offset)
+
+            depth = max(depth, int(tree_.max_depth))
+            offset += node_count
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            missing_left=np.concatenate(missing_lefts),
+            value=np.concatenate(values),
+            roots=np.array(roots, dtype=np.intp),
+            depth=depth,
+            n_features=int(model.n_features_in_),
+            baseline=baseline,
+            divisor=divisor,
+            parity=parity,
+            allow_nan=estimator_allows_nan(model)
+        )
+
+    def get_state(self):
+        """(diziler, skaler parametreler) — model_artifact ile diske yazılır"""
+        arrays = {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'left': self.left,
+            'right': self.right,
+            'missing_left': self.missing_left,
+            'value': self.value,
+            'roots': self.roots,
+        }
+        params = {
+            'depth': self.depth,
+            'n_features': self.n_features,
+            'baseline': self.baseline,
+            'divisor': self.divisor,
+            'parity': self.parity,
+            'allow_nan': self.allow_nan,
+        }
+        return arrays, params
+
+    @classmethod
+    def from_state(cls, arrays, params):
+        """get_state çıktısından (ör. salt okunur memmap dizilerinden) yeniden kur"""
+        return cls(**arrays, **params)
+
+    def apply(self, X):
+        """(n_rows, n_trees) yaprak düğüm index'leri"""
+        # sklearn ağaçları girdiyi float32'ye çevirip threshold ile karşılaştırır
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        check_finite(X, allow_nan=self.allow_nan)
+        X = X.astype(np.float64)
+        n_rows = X.shape[0]
+
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * X.shape[1])[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+
+        for _ in range(self.depth):
+            x_values = flat_X[row_offsets + self.feature[nodes]]
+            go_left = x_values <= self.threshold[nodes]
+            is_missing = np.isnan(x_values)
+            if is_missing.any():
+                go_left = np.where(is_missing, self.missing_left[nodes], go_left)
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return nodes
+
+    def predict(self, X):
+        """Satır başına tahmin (model.predict ile aynı şekil)"""
+        leaf_values = self.value[self.apply(X)]
+
+        if self.parity:
+            # sklearn sırası: baseline'a ağaçlar tek tek eklenir
+            if self.baseline != 0.0:
+                baseline_column = np.full((leaf_values.shape[0], 1), self.baseline)
+                leaf_values = np.concatenate([baseline_column, leaf_values], axis=1)
+            total = np.cumsum(leaf_values, axis=1)[:, -1]
+        else:
+            total = self.baseline + leaf_values.sum(axis=1)
+
+        if self.divisor != 1.0:
+            total = total / self.divisor
+
+        return total
+
+
+def estimator_allows_nan(model):
+    """sklearn tag'lerinden modelin NaN girdi kabul edip etmediği"""
+    if hasattr(model, '__sklearn_tags__'):
+        return bool(model.__sklearn_tags__().input_tags.allow_nan)
+    return bool(model._get_tags().get('allow_nan', False))
+
+
+def predict_or_none(predict, X):
+    """predict(X); girdi ValueError ile reddedilirse None"""
+    try:
+        return predict(X)
+    except ValueError:
+        return None
+
+
+def non_finite_rows(X):
+    """X'in ilk satırından türetilmiş NaN ve inf içeren tek satırlık matrisler"""
+    rows = []
+    for bad_value in (np.nan, np.inf):
+        row = np.array(X[:1], dtype=np.float64)
+        row[0, 0] = bad_value
+        rows.append(row)
+    return rows
+
+
+def parity_sample(compiled, n_rows=64, seed=0):
+    """Threshold aralıklarını kapsayan deterministik doğrulama matrisi"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, compiled.n_features))
+
+    # NaN ile eğitilmiş ağaçlarda yalnız eksik değerleri ayıran düğümlerin threshold'u inf'tir
+    is_split = (compiled.left != np.arange(len(compiled.left))) & np.isfinite(compiled.threshold)
+    for feature_index in range(compiled.n_features):
+        thresholds = compiled.threshold[is_split & (compiled.feature == feature_index)]
+        if len(thresholds):
+            low, high = thresholds.min(), thresholds.max()
+            margin = max(1.0, (high - low) * 0.1)
+            X[:, feature_index] = rng.uniform(low - margin, high + margin, size=n_rows)
+
+    return X
+
+
+def verify_parity(model, compiled, X=None):
+    """Derlenmiş modelin model.predict ile bit düzeyinde aynı olduğunu doğrula
+
+    RandomForest/ExtraTrees n_jobs>1 ile ağaç toplamlarını iş parçacığı bitiş
+    sırasıyla biriktirir; referans tahmin bu yüzden n_jobs=1 ile alınır.
+    NaN ve inf içeren satırlarda da iki yolun aynı davrandığı (aynı değer ya da
+    ikisinde de ValueError) kontrol edilir.
+    """
+    if X is None:
+        X = parity_sample(compiled)
+
+    original_n_jobs = getattr(model, 'n_jobs', None)
+    try:
+        if original_n_jobs is not None:
+            model.n_jobs = 1
+        expected = model.predict(X)
+        non_finite_expected = [predict_or_none(model.predict, row) for row in non_finite_rows(X)]
+    finally:
+        if original_n_jobs is not None:
+            model.n_jobs = original_n_jobs
+
+    actual = compiled.predict(X)
+    if compiled.parity:
+        passed = bool(np.array_equal(expected, actual))
+    else:
+        passed = bool(np.allclose(expected, actual, rtol=1e-12, atol=1e-12))
+
+    for row, row_expected in zip(non_finite_rows(X), non_finite_expected):
+        row_actual = predict_or_none(compiled.predict, row)
+        if row_expected is None or row_actual is None:
+            passed = passed and row_expected is None and row_actual is None
+        else:
+            passed = passed and bool(np.allclose(row_expected, row_actual, rtol=1e-12, atol=1e-12))
+
+    return passed
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AllerMind HTTP Load Test
+Drives /api/v1/predict at a fixed concurrency and reports throughput, latency
+percentiles and error rate as JSON
+
+Usage (from ml-model-microservice/):
+    python benchmarks/load_test.py --mode inprocess --concurrency 8 --requests 2000
+    python benchmarks/load_test.py --mode subprocess --server-cmd "gunicorn -c gunicorn.conf.py wsgi:app"
+    python benchmarks/load_test.py --url http://localhost:8585 --duration 30
+    python benchmarks/load_test.py --output new.json --baseline old.json --max-regression 10
+
+Modes:
+    inprocess   import real_model_test and serve it with werkzeug on a free port in
+                this process (client and server share the GIL - use for quick checks)
+    subprocess  start the server as a child process (default: python real_model_test.py)
+    url         benchmark an already running server (--url)
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import shlex
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from payloads import generate_payloads
+
+# Compared against the baseline; True when a larger value is better
+COMPARED_METRICS = {
+    'throughputRps': True,
+    'latencyMs.p50': False,
+    'latencyMs.p95': False,
+    'latencyMs.p99': False,
+    'errorRate': False,
+}
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(base_url: str, timeout: float) -> None:
+    """Poll /ready (falling back to /health) until the service answers 200"""
+    parsed = urlparse(base_url)
+    deadline = time.monotonic() + timeout
+    last_error = None
+
+    while time.monotonic() < deadline:
+        for path in ('/ready', '/health'):
+            try:
+                connection = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=5)
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                connection.close()
+                if response.status == 200:
+                    return
+                if response.status != 404:
+                    break
+            except OSError as e:
+                last_error = e
+                break
+        time.sleep(0.25)
+
+    raise RuntimeError(f"Servis {timeout:.0f} sn içinde hazır olmadı ({last_error})")
+
+
+def start_inprocess_server() -> Tuple[str, Any]:
+    """Serve real_model_test.app with a threaded werkzeug server in a background thread"""
+    from werkzeug.serving import make_server
+
+    sys.path.insert(0, SERVICE_DIR)
+    import real_model_test
+
+    if real_model_test.risk_predictor is None and not real_model_test.initialize_predictor():
+        raise RuntimeError("Predictor başlatılamadı")
+
+    server = make_server('127.0.0.1', free_port(), real_model_test.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name='load-test-server', daemon=True)
+    thread.start()
+    return f"http://127.0.0.1:{server.server_port}", server.shutdown
+
+
+def start_subprocess_server(server_cmd: Optional[str], startup_timeout: float) -> Tuple[str, Any]:
+    """Start the service as a child process on a free port"""
+    port = free_port()
+    command = shlex.split(server_cmd) if server_cmd else [sys.executable, 'real_model_test.py']
+    environment = dict(os.environ, PORT=str(port))
+
+    process = subprocess.Popen(command, cwd=SERVICE_DIR, env=environment,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def stop():
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(base_url, startup_timeout)
+    except Exception:
+        stop()
+        raise
+    return base_url, stop
+
+
+class LoadGenerator:
+    """
+    Closed-loop load: `concurrency` worker threads, each with its own keep-alive
+    connection, send requests back to back until the request budget or the
+    duration is used up
+    """
+
+    def __init__(self, base_url: str, path: str, bodies: List[bytes], concurrency: int,
+                 total_requests: Optional[int], duration: Optional[float], timeout: float = 30.0):
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.path = path
+        self.bodies = bodies
+        self.concurrency = concurrency
+        self.total_requests = total_requests
+        self.duration = duration
+        self.timeout = timeout
+
+        self._next_index = 0
+        self._lock = threading.Lock()
+        self._deadline = None
+
+    def _claim(self) -> Optional[int]:
+        with self._lock:
+            if self.total_requests is not None and self._next_index >= self.total_requests:
+                return None
+            if self._deadline is not None and time.monotonic() >= self._deadline:
+                return None
+            index = self._next_index
+            self._next_index += 1
+            return index
+
+    def _worker(self, latencies: List[float], errors: Dict[str, int]) -> None:
+        connection = None
+        headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+
+        while True:
+            index = self._claim()
+            if index is None:
+                break
+
+            body = self.bodies[index % len(self.bodies)]
+            started = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                connection.request('POST', self.path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                elapsed = time.perf_counter() - started
+                if response.status == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors[f"http_{response.status}"] = errors.get(f"http_{response.status}", 0) + 1
+                if response.getheader('Connection', '').lower() == 'close':
+                    connection.close()
+                    connection = None
+            except (OSError, http.client.HTTPException) as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                if connection is not None:
+                    connection.close()
+                connection = None
+
+        if connection is not None:
+            connection.close()
+
+    def run(self) -> Dict[str, Any]:
+        per_worker_latencies = [[] for _ in range(self.concurrency)]
+        per_worker_errors = [{} for _ in range(self.concurrency)]
+        threads = [
+            threading.Thread(target=self._worker, args=(per_worker_latencies[index], per_worker_errors[index]),
+                             name=f'load-worker-{index}', daemon=True)
+            for index in range(self.concurrency)
+        ]
+
+        started = time.perf_counter()
+        if self.duration is not None:
+            self._deadline = time.monotonic() + self.duration
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_time = time.perf_counter() - started
+
+        latencies = np.array([value for values in per_worker_latencies for value in values]) * 1000
+        errors: Dict[str, int] = {}
+        for worker_errors in per_worker_errors:
+            for kind, count in worker_errors.items():
+                errors[kind] = errors.get(kind, 0) + count
+
+        successful = len(latencies)
+        failed = sum(errors.values())
+        total = successful + failed
+
+        return {
+            'requests': total,
+            'successful': successful,
+            'failed': failed,
+            'errors': errors,
+            'errorRate': failed / total if total else 0.0,
+            'wallTimeSeconds': wall_time,
+            'throughputRps': successful / wall_time if wall_time > 0 else 0.0,
+            'latencyMs': {
+                'mean': float(latencies.mean()) if successful else None,
+                'min': float(latencies.min()) if successful else None,
+                'p50': float(np.percentile(latencies, 50)) if successful else None,
+                'p95': float(np.percentile(latencies, 95)) if successful else None,
+                'p99': float(np.percentile(latencies, 99)) if successful else None,
+                'max': float(latencies.max()) if successful else None,
+            }
+        }
+
+
+def metric_value(results: Dict[str, Any], dotted_name: str) -> Optional[float]:
+    value: Any = results
+    for part in dotted_name.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def compare_with_baseline(results: Dict[str, Any], baseline: Dict[str, Any], max_regression_pct: float) -> Dict[str, Any]:
+    """Relative change of the compared metrics; a metric regresses if it worsens by more than max_regression_pct"""
+    baseline_results = baseline.get('results', baseline)
+    metrics = {}
+    regressions = []
+
+    for name, higher_is_better in COMPARED_METRICS.items():
+        current = metric_value(results, name)
+        previous = metric_value(baseline_results, name)
+        if current is None or previous is None:
+            continue
+
+        change_pct = (current - previous) / previous * 100 if previous else (0.0 if current == previous else None)
+        worse_pct = None if change_pct is None else (-change_pct if higher_is_better else change_pct)
+        if name == 'errorRate':
+            regressed = current > previous and current - previous > max_regression_pct / 100
+        else:
+            regressed = worse_pct is not None and worse_pct > max_regression_pct
+
+        metrics[name] = {'baseline': previous, 'current': current, 'changePct': change_pct, 'regressed': regressed}
+        if regressed:
+            regressions.append(name)
+
+    return {'maxRegressionPct': max_regression_pct, 'metrics': metrics, 'regressions': regressions}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVICE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='AllerMind /api/v1/predict load test')
+    parser.add_argument('--mode', choices=('inprocess', 'subprocess', 'url'), default='inprocess')
+    parser.add_argument('--url', help='Base URL of a running service (implies --mode url)')
+    parser.add_argument('--server-cmd', help='Server command for --mode subprocess (PORT is set in its environment)')
+    parser.add_argument('--path', default='/api/v1/predict')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=1000, help='Measured requests (ignored with --duration)')
+    parser.add_argument('--duration', type=float, help='Measure for this many seconds instead of a request count')
+    parser.add_argument('--warmup', type=int, default=50, help='Unmeasured requests sent first')
+    parser.add_argument('--payloads', type=int, default=256, help='Distinct payloads cycled through')
+    parser.add_argument('--jitter', type=float, default=0.3, help='Relative jitter of environmental values')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--startup-timeout', type=float, default=120.0)
+    parser.add_argument('--output', help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', help='Earlier JSON report to compare against')
+    parser.add_argument('--max-regression', type=float, default=10.0,
+                        help='Allowed worsening in percent before the run fails (errorRate: percentage points)')
+    args = parser.parse_args(argv)
+    if args.url:
+        args.mode = 'url'
+    elif args.mode == 'url':
+        parser.error('--mode url requires --url')
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    payloads = generate_payloads(args.payloads, seed=args.seed, jitter=args.jitter)
+    bodies = [json.dumps(payload).encode('utf-8') for payload in payloads]
+
+    if args.mode == 'inprocess':
+        base_url, stop = start_inprocess_server()
+    elif args.mode == 'subprocess':
+        base_url, stop = start_subprocess_server(args.server_cmd, args.startup_timeout)
+    else:
+        base_url, stop = args.url.rstrip('/'), None
+        wait_until_ready(base_url, args.startup_timeout)
+
+    try:
+        if args.warmup > 0:
+            LoadGenerator(base_url, args.path, bodies, args.concurrency, args.warmup, None).run()
+
+        results = LoadGenerator(
+            base_url, args.path, bodies, args.concurrency,
+            None if args.duration else args.requests, args.duration
+        ).run()
+    finally:
+        if stop is not None:
+            stop()
+
+    report: Dict[str, Any] = {
+        'benchmark': 'http_load',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'config': {
+            'mode': args.mode,
+            'path': args.path,
+            'serverCmd': args.server_cmd,
+            'concurrency': args.concurrency,
+            'requests': None if args.duration else args.requests,
+            'durationSeconds': args.duration,
+            'warmup': args.warmup,
+            'payloads': args.payloads,
+            'jitter': args.jitter,
+            'seed': args.seed
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpuCount': os.cpu_count()
+        },
+        'results': results
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            report['comparison'] = compare_with_baseline(results, json.load(f), args.max_regression)
+        if report['comparison']['regressions']:
+            exit_code = 1
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    latency = results['latencyMs']
+    summary = (f"{results['successful']}/{results['requests']} ok, {results['throughputRps']:.1f} req/s, "
+               f"p50 {latency['p50'] or 0:.2f} ms, p95 {latency['p95'] or 0:.2f} ms, p99 {latency['p99'] or 0:.2f} ms, "
+               f"hata oranı {results['errorRate']:.2%}")
+    print(summary, file=sys.stderr)
+    if exit_code:
+        print(f"❌ Baseline'a göre gerileme: {', '.join(report['comparison']['regressions'])}", file=sys.stderr)
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AllerMind Predictor Micro-Benchmarks
+Repeatable timings of ExpertAllermindPredictor internals and the request
+conversion helpers of real_model_test.py, stored as JSON
+
+Usage (from ml-model-microservice/):
+    python benchmarks/micro_benchmarks.py --output bench.json
+    python benchmarks/micro_benchmarks.py --cpu 2 --filter predict_group
+    python benchmarks/micro_benchmarks.py --output new.json --baseline bench.json --max-regression 15
+
+For stable numbers pin the process to one idle core (--cpu, or `taskset -c 2`)
+and keep BLAS single-threaded (OMP_NUM_THREADS=1 OPENBLAS_NUM_THREADS=1).
+Inputs are fixed (seeded payloads), every benchmark is warmed up, timed with
+the GC disabled over `--repeat` rounds, and reported per call and per row.
+The prediction and multiplier caches are disabled so model work is measured.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from contextlib import redirect_stdout
+from typing import Any, Callable, Dict, List, Optional
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+sys.path.insert(0, SERVICE_DIR)
+
+# Measure the model path, not cache hits
+os.environ.setdefault('PREDICTION_CACHE_SIZE', '0')
+os.environ.setdefault('MULTIPLIER_CACHE_SIZE', '0')
+os.environ.setdefault('MICROBATCH_ENABLED', 'false')
+
+import numpy as np
+
+from payloads import generate_payloads
+
+BATCH_SIZES = (1, 16, 256)
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+
+def time_callable(fn: Callable[[], Any], repeat: int, min_time: float, warmup: int) -> Dict[str, float]:
+    """Per-call seconds over `repeat` rounds; each round runs long enough to last ~min_time"""
+    for _ in range(warmup):
+        fn()
+
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time or number >= 1_000_000:
+            break
+        number *= 2
+
+    per_call = [elapsed / number for elapsed in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'number': number,
+        'min': min(per_call),
+        'median': statistics.median(per_call),
+        'mean': statistics.fmean(per_call),
+        'stdev': statistics.stdev(per_call) if len(per_call) > 1 else 0.0
+    }
+
+
+class MicroBenchmarks:
+    """Builds the fixed inputs once and registers one callable per benchmark"""
+
+    def __init__(self, seed: int):
+        import real_model_test
+
+        self.service = real_model_test.AllerMindRiskPredictor()
+        self.predictor = self.service.predictor
+
+        payloads = generate_payloads(max(BATCH_SIZES), seed=seed)
+        self.payload = payloads[0]
+        self.environmental_data = self.payload['environmentalData']
+        self.user_classification = self.payload['userClassification']
+        self.expert_env = self.service._convert_to_expert_environmental_data(self.environmental_data)
+        self.personal_params = self.service._convert_to_personal_params(self.user_classification)
+        self.validated_env, _ = self.predictor.validate_input(self.expert_env)
+
+        self.expert_envs = [self.service._convert_to_expert_environmental_data(p['environmentalData']) for p in payloads]
+        self.personal_params_list = [self.service._convert_to_personal_params(p['userClassification']) for p in payloads]
+        self.group_ids = [p['userClassification']['groupId'] for p in payloads]
+        self.loaded_groups = self.predictor.loaded_groups()
+        self.feature_matrix, _ = self.predictor.prepare_feature_matrix(self.expert_envs)
+
+    def cases(self) -> List[Dict[str, Any]]:
+        """[{name, labels, rows, fn}]"""
+        service, predictor = self.service, self.predictor
+        cases = [
+            self._case('convert_environmental_data', lambda: service._convert_to_expert_environmental_data(self.environmental_data)),
+            self._case('convert_personal_params', lambda: service._convert_to_personal_params(self.user_classification)),
+            self._case('validate_input', lambda: predictor.validate_input(self.expert_env)),
+            self._case('create_engineered_features', lambda: predictor.create_engineered_features(self.validated_env)),
+            self._case('prepare_features', lambda: predictor.prepare_features(self.expert_env)),
+            self._case('predict_ensemble', lambda: predictor.predict_ensemble(self.expert_env, self.personal_params)),
+            self._case('predict_fused', lambda: predictor.predict_fused(self.expert_env, self.group_ids[0], self.personal_params)),
+        ]
+
+        for group_id in self.loaded_groups:
+            labels = {'group': group_id, 'algorithm': predictor.models[group_id]['algorithm_used']}
+            cases.append(self._case(
+                'predict_group', lambda group_id=group_id: predictor.predict_group(self.expert_env, group_id, self.personal_params), **labels
+            ))
+            cases.append(self._case(
+                'calculate_personal_multiplier',
+                lambda group_id=group_id: predictor.calculate_personal_multiplier(group_id, self.personal_params), **labels
+            ))
+            for rows in BATCH_SIZES:
+                group_matrix = predictor.build_feature_matrix(self.feature_matrix[:rows], group_id)
+                cases.append(self._case(
+                    'predict_base_batch', lambda group_id=group_id, group_matrix=group_matrix: predictor.predict_base_batch(group_id, group_matrix),
+                    rows=rows, **labels
+                ))
+
+        for rows in BATCH_SIZES[1:]:
+            cases.append(self._case(
+                'predict_fused_batch',
+                lambda rows=rows: predictor.predict_fused_batch(self.expert_envs[:rows], self.group_ids[:rows], self.personal_params_list[:rows]),
+                rows=rows
+            ))
+
+        return cases
+
+    @staticmethod
+    def _case(name: str, fn: Callable[[], Any], rows: int = 1, **labels: Any) -> Dict[str, Any]:
+        key = '/'.join([name] + [f"{label}={value}" for label, value in labels.items()] + ([f"rows={rows}"] if rows != 1 else []))
+        return {'key': key, 'name': name, 'labels': labels, 'rows': rows, 'fn': fn}
+
+
+def pin_cpu(cpu: Optional[int]) -> Optional[List[int]]:
+    """Pin to `cpu` where supported; return the affinity in effect"""
+    if not hasattr(os, 'sched_getaffinity'):
+        return None
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+    return sorted(os.sched_getaffinity(0))
+
+
+def library_versions() -> Dict[str, Optional[str]]:
+    versions = {'numpy': np.__version__}
+    try:
+        import sklearn
+        versions['sklearn'] = sklearn.__version__
+    except ImportError:
+        versions['sklearn'] = None
+    return versions
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVICE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_with_baseline(results: List[Dict[str, Any]], baseline: Dict[str, Any], max_regression_pct: float) -> Dict[str, Any]:
+    """Median per-call time against the baseline run, matched by benchmark key"""
+    previous = {entry['key']: entry for entry in baseline.get('benchmarks', [])}
+    comparisons = {}
+    regressions = []
+
+    for entry in results:
+        baseline_entry = previous.get(entry['key'])
+        if baseline_entry is None:
+            continue
+        ratio = entry['perCallUs']['median'] / baseline_entry['perCallUs']['median']
+        regressed = (ratio - 1.0) * 100 > max_regression_pct
+        comparisons[entry['key']] = {
+            'baselineMedianUs': baseline_entry['perCallUs']['median'],
+            'currentMedianUs': entry['perCallUs']['median'],
+            'ratio': ratio,
+            'regressed': regressed
+        }
+        if regressed:
+            regressions.append(entry['key'])
+
+    return {'maxRegressionPct': max_regression_pct, 'benchmarks': comparisons, 'regressions': regressions}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='AllerMind predictor micro-benchmarks')
+    parser.add_argument('--repeat', type=int, default=7, help='Timed rounds per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per round')
+    parser.add_argument('--warmup', type=int, default=20, help='Untimed calls before measuring')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cpu', type=int, help='Pin the process to this CPU (Linux)')
+    parser.add_argument('--filter', help='Only run benchmarks whose key contains this text')
+    parser.add_argument('--keep-logging', action='store_true', help='Keep INFO logging of the service helpers')
+    parser.add_argument('--output', help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', help='Earlier JSON report to compare against')
+    parser.add_argument('--max-regression', type=float, default=15.0, help='Allowed median slowdown in percent')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    affinity = pin_cpu(args.cpu)
+
+    # Model loading and the ensemble print progress to stdout; keep the report clean
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        if not args.keep_logging:
+            logging.disable(logging.INFO)
+        benchmarks = MicroBenchmarks(args.seed)
+        cases = [case for case in benchmarks.cases() if not args.filter or args.filter in case['key']]
+
+        results = []
+        for case in cases:
+            timing = time_callable(case['fn'], args.repeat, args.min_time, args.warmup)
+            results.append({
+                'key': case['key'],
+                'name': case['name'],
+                'labels': case['labels'],
+                'rows': case['rows'],
+                'number': timing['number'],
+                'perCallUs': {stat: timing[stat] * 1e6 for stat in ('min', 'median', 'mean', 'stdev')},
+                'perRowUs': timing['median'] * 1e6 / case['rows']
+            })
+            print(f"{case['key']:<70} {timing['median'] * 1e6:>12.2f} µs", file=sys.stderr)
+
+    report: Dict[str, Any] = {
+        'benchmark': 'predictor_micro',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'config': {
+            'repeat': args.repeat,
+            'minTimeSeconds': args.min_time,
+            'warmup': args.warmup,
+            'seed': args.seed,
+            'filter': args.filter,
+            'logging': 'enabled' if args.keep_logging else 'disabled',
+            'predictionCache': os.environ.get('PREDICTION_CACHE_SIZE'),
+            'multiplierCache': os.environ.get('MULTIPLIER_CACHE_SIZE'),
+            'compiledGroups': sorted(benchmarks.predictor.compiled_models)
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'cpuCount': os.cpu_count(),
+            'cpuAffinity': affinity,
+            'threadEnv': {name: os.environ.get(name) for name in THREAD_ENV_VARS},
+            'libraries': library_versions()
+        },
+        'benchmarks': results
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            report['comparison'] = compare_with_baseline(results, json.load(f), args.max_regression)
+        if report['comparison']['regressions']:
+            exit_code = 1
+            print(f"❌ Baseline'a göre yavaşlayan: {', '.join(report['comparison']['regressions'])}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AllerMind Benchmark Payloads
+Deterministic /api/v1/predict bodies modeled on the endpoint docstring example
+and the demo users of DATA/WORK-MODEL/demo_system.py
+"""
+
+import copy
+import random
+from typing import Any, Dict, List, Optional
+
+# One userClassification per group, following the demo_system profiles
+DEMO_USERS: Dict[str, Dict[str, Any]] = {
+    'severe_patient': {
+        'groupId': 1,
+        'groupName': 'Şiddetli Alerjik Grup',
+        'groupDescription': 'IgE > 1000 IU/mL, anafilaksi öyküsü',
+        'assignmentReason': 'Klinik tanı temelinde',
+        'age': 28,
+        'gender': 'female',
+        'latitude': 41.0082,
+        'longitude': 28.9784,
+        'clinicalDiagnosis': 'severe_allergy',
+        'familyAllergyHistory': True,
+        'currentMedications': ['antihistamine', 'bronchodilator', 'epinephrine', 'immunotherapy'],
+        'previousAllergicReactions': {'anaphylaxis': True, 'severe_asthma': True, 'hospitalization': True},
+        'treePollenAllergies': {'birch': True, 'olive': True, 'pine': True},
+        'grassPollenAllergies': {'graminales': True},
+        'weedPollenAllergies': {'ragweed': True, 'mugwort': True},
+        'foodAllergies': {'apple': True, 'nuts': True, 'shellfish': True},
+        'environmentalTriggers': {'dust_mites': True, 'pet_dander': True, 'mold': True, 'air_pollution': True, 'smoke': True},
+        'modelWeight': 0.3
+    },
+    'moderate_patient': {
+        'groupId': 2,
+        'groupName': 'Hafif-Orta Alerjik Grup',
+        'groupDescription': 'IgE 200-1000 IU/mL, Kontrol edilebilir belirtiler',
+        'assignmentReason': 'Klinik tanı temelinde',
+        'age': 35,
+        'gender': 'male',
+        'latitude': 39.9334,
+        'longitude': 32.8597,
+        'clinicalDiagnosis': 'mild_moderate_allergy',
+        'familyAllergyHistory': True,
+        'currentMedications': ['antihistamine', 'nasal_spray'],
+        'previousAllergicReactions': {'anaphylaxis': False, 'severe_asthma': False, 'hospitalization': False},
+        'treePollenAllergies': {'birch': True, 'olive': False, 'pine': False},
+        'grassPollenAllergies': {'graminales': True},
+        'weedPollenAllergies': {'ragweed': False, 'mugwort': False},
+        'foodAllergies': {'apple': True, 'nuts': False, 'shellfish': False},
+        'environmentalTriggers': {'dust_mites': True, 'pet_dander': False, 'mold': False, 'air_pollution': True, 'smoke': False},
+        'modelWeight': 0.22
+    },
+    'genetic_risk': {
+        'groupId': 3,
+        'groupName': 'Genetik Yatkınlık Grubu',
+        'groupDescription': 'Aile öyküsü pozitif, tanı yok',
+        'assignmentReason': 'Aile geçmişi',
+        'age': 22,
+        'gender': 'female',
+        'latitude': 38.4192,
+        'longitude': 27.1287,
+        'clinicalDiagnosis': 'none',
+        'familyAllergyHistory': True,
+        'currentMedications': [],
+        'previousAllergicReactions': {'anaphylaxis': False, 'severe_asthma': False, 'hospitalization': False},
+        'treePollenAllergies': {'birch': False, 'olive': True, 'pine': False},
+        'grassPollenAllergies': {'graminales': False},
+        'weedPollenAllergies': {'ragweed': False, 'mugwort': False},
+        'foodAllergies': {'apple': False, 'nuts': False, 'shellfish': False},
+        'environmentalTriggers': {'dust_mites': False, 'pet_dander': True, 'mold': False, 'air_pollution': False, 'smoke': False},
+        'modelWeight': 0.18
+    },
+    'healthy_adult': {
+        'groupId': 4,
+        'groupName': 'Sağlıklı Birey Grubu',
+        'groupDescription': 'Bilinen alerji yok',
+        'assignmentReason': 'Risk faktörü yok',
+        'age': 30,
+        'gender': 'male',
+        'latitude': 36.8969,
+        'longitude': 30.7133,
+        'clinicalDiagnosis': 'none',
+        'familyAllergyHistory': False,
+        'currentMedications': [],
+        'previousAllergicReactions': {'anaphylaxis': False, 'severe_asthma': False, 'hospitalization': False},
+        'treePollenAllergies': {'birch': False, 'olive': False, 'pine': False},
+        'grassPollenAllergies': {'graminales': False},
+        'weedPollenAllergies': {'ragweed': False, 'mugwort': False},
+        'foodAllergies': {'apple': False, 'nuts': False, 'shellfish': False},
+        'environmentalTriggers': {'dust_mites': False, 'pet_dander': False, 'mold': False, 'air_pollution': False, 'smoke': False},
+        'modelWeight': 0.1
+    },
+    'vulnerable_elderly': {
+        'groupId': 5,
+        'groupName': 'Hassas Grup (Çocuk/Yaşlı)',
+        'groupDescription': 'Yaş veya kronik hastalık nedeniyle hassas',
+        'assignmentReason': 'Yaş faktörü',
+        'age': 72,
+        'gender': 'female',
+        'latitude': 40.1826,
+        'longitude': 29.0665,
+        'clinicalDiagnosis': 'asthma',
+        'familyAllergyHistory': False,
+        'currentMedications': ['bronchodilator'],
+        'previousAllergicReactions': {'anaphylaxis': False, 'severe_asthma': True, 'hospitalization': False},
+        'treePollenAllergies': {'birch': False, 'olive': False, 'pine': True},
+        'grassPollenAllergies': {'graminales': True},
+        'weedPollenAllergies': {'ragweed': False, 'mugwort': True},
+        'foodAllergies': {'apple': False, 'nuts': False, 'shellfish': False},
+        'environmentalTriggers': {'dust_mites': True, 'pet_dander': False, 'mold': True, 'air_pollution': True, 'smoke': True},
+        'modelWeight': 0.2
+    }
+}
+
+# environmentalData of the /api/v1/predict docstring example
+BASE_ENVIRONMENT: Dict[str, Dict[str, float]] = {
+    'airQuality': {
+        'pm25': 15.5, 'pm10': 28.3, 'o3': 125.7, 'no2': 45.2, 'so2': 8.1, 'co': 0.8, 'dust': 12,
+        'methane': 1875.5, 'uvIndex': 6.8, 'aerosolOpticalDepth': 0.35, 'co2': 415
+    },
+    'pollen': {
+        'totalUpi': 85.6, 'treePollen': 32.4, 'grassPollen': 28.7, 'weedPollen': 24.5,
+        'inSeasonCount': 7, 'diversityIndex': 0.65
+    },
+    'weather': {
+        'temperature': 22.5, 'humidity': 68.0, 'windSpeed': 12.3, 'pressure': 1013.25, 'precipitation': 0.0,
+        'windDirection': 270, 'sunshineDuration': 8.5, 'cloudCover': 45
+    }
+}
+
+# Fields kept as-is when jittering (counts / directions)
+FIXED_FIELDS = {'inSeasonCount', 'windDirection'}
+
+
+def make_environment(rng: random.Random, jitter: float = 0.3) -> Dict[str, Dict[str, float]]:
+    """BASE_ENVIRONMENT with every measurement scaled by a random factor in [1 - jitter, 1 + jitter]"""
+    environment = {}
+    for section, values in BASE_ENVIRONMENT.items():
+        environment[section] = {
+            name: value if name in FIXED_FIELDS else round(value * rng.uniform(1.0 - jitter, 1.0 + jitter), 3)
+            for name, value in values.items()
+        }
+    return environment
+
+
+def make_payload(rng: random.Random, user_key: Optional[str] = None, jitter: float = 0.3) -> Dict[str, Any]:
+    """One /api/v1/predict body for a (random or given) demo user"""
+    if user_key is None:
+        user_key = rng.choice(sorted(DEMO_USERS))
+    user_classification = copy.deepcopy(DEMO_USERS[user_key])
+    user_classification['userPreferenceId'] = f"bench-{user_key}"
+    return {
+        'userClassification': user_classification,
+        'environmentalData': make_environment(rng, jitter)
+    }
+
+
+def generate_payloads(count: int, seed: int = 0, jitter: float = 0.3) -> List[Dict[str, Any]]:
+    """`count` deterministic payloads cycling through the demo users"""
+    rng = random.Random(seed)
+    user_keys = sorted(DEMO_USERS)
+    return [make_payload(rng, user_keys[index % len(user_keys)], jitter) for index in range(count)]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+AllerMind ML Service - gunicorn prefork configuration
+
+Models are loaded once in the master (preload_app) and shared copy-on-write
+with the forked workers. Tunables:
+    PORT              - listen port (default 8585)
+    GUNICORN_WORKERS  - worker processes (default: usable cores, see thread_policy.py)
+    GUNICORN_THREADS  - request threads per worker (default: 2 * cores / workers)
+    GUNICORN_TIMEOUT  - worker timeout in seconds (default 120)
+"""
+
+import multiprocessing
+import os
+
+from thread_policy import ThreadPolicy
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8585)}"
+
+# Cores come from the CPU affinity / cgroup quota, not the host CPU count. The
+# decisions are exported so the app (and BLAS loaded with it) see the same limits.
+thread_policy = ThreadPolicy.from_env(server='gunicorn')
+if thread_policy is not None:
+    thread_policy.export_env()
+    workers = thread_policy.workers
+    threads = thread_policy.threads_per_worker
+else:
+    workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+# Load ExpertAllermindPredictor once in the master before forking
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    """Threads do not survive fork: restart per-process background helpers"""
+    import real_model_test
+
+    if real_model_test.request_log is not None:
+        real_model_test.request_log.after_fork()
+    if real_model_test.risk_predictor is not None:
+        real_model_test.risk_predictor.after_fork()
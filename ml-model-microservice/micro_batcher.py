@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AllerMind Micro-Batcher
+Coalesces concurrent per-request group predictions into one model call per group
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# Batch size histogram buckets (number of coalesced requests per dispatch)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class _PendingRequest:
+    """A single request waiting for its base predictions"""
+    __slots__ = ('feature_arrays', 'results', 'error', 'done')
+
+    def __init__(self, feature_arrays: Dict[int, np.ndarray]):
+        self.feature_arrays = feature_arrays
+        self.results: Dict[int, float] = {}
+        self.error: Optional[Exception] = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Request coalescer for group model inference
+
+    Request threads submit their {group_id: (1, n_features) array} map and block.
+    A single dispatcher thread collects submissions for up to `window_ms`
+    (or until `max_batch_size` requests are queued), stacks the rows per group,
+    calls `predict_fn(group_id, matrix)` once per group and routes each row's
+    result back to the waiting request.
+
+    A request waits at most the window plus `max_wait_ms`. If its result has
+    not arrived by then - or the dispatcher thread is no longer alive - it is
+    taken out of the queue and scored directly with `predict_fn` on the
+    request thread, so a stuck or dead dispatcher slows requests down instead
+    of blocking them until the worker is killed.
+    """
+
+    def __init__(self, predict_fn: Callable[[int, np.ndarray], np.ndarray],
+                 window_ms: float = 2.0, max_batch_size: int = 64, max_wait_ms: float = 1000.0):
+        self._predict_fn = predict_fn
+        self.window_seconds = max(0.0, window_ms) / 1000.0
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_seconds = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: deque = deque()
+        self._condition = threading.Condition()
+        self._running = True
+
+        # Stats (guarded by _condition)
+        self._batches = 0
+        self._requests = 0
+        self._rows = 0
+        self._max_batch_seen = 0
+        self._max_queue_depth = 0
+        self._batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._timeouts = 0
+        self._direct_fallbacks = 0
+
+        self._thread = threading.Thread(target=self._run, name='allermind-micro-batcher', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls, predict_fn: Callable[[int, np.ndarray], np.ndarray]) -> Optional['MicroBatcher']:
+        """Create a batcher if MICROBATCH_ENABLED is set, otherwise return None"""
+        if os.environ.get('MICROBATCH_ENABLED', 'false').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(
+            predict_fn,
+            window_ms=float(os.environ.get('MICROBATCH_WINDOW_MS', 2.0)),
+            max_batch_size=int(os.environ.get('MICROBATCH_MAX_BATCH', 64)),
+            max_wait_ms=float(os.environ.get('MICROBATCH_MAX_WAIT_MS', 1000.0))
+        )
+
+    def predict(self, feature_arrays: Dict[int, np.ndarray]) -> Dict[int, float]:
+        """Submit one request's feature rows and wait for its base predictions"""
+        pending = _PendingRequest(feature_arrays)
+
+        with self._condition:
+            if not self._running:
+                raise RuntimeError("Micro-batcher durduruldu")
+            dispatcher_alive = self._thread.is_alive()
+            if dispatcher_alive:
+                self._queue.append(pending)
+                self._max_queue_depth = max(self._max_queue_depth, len(self._queue))
+                self._condition.notify()
+            else:
+                self._direct_fallbacks += 1
+
+        if not dispatcher_alive:
+            return self._predict_direct(feature_arrays)
+
+        if not pending.done.wait(self.window_seconds + self.max_wait_seconds):
+            with self._condition:
+                try:
+                    self._queue.remove(pending)
+                except ValueError:
+                    # Already taken by the dispatcher; its late results are ignored
+                    pass
+                self._timeouts += 1
+            return self._predict_direct(feature_arrays)
+
+        if pending.error is not None:
+            raise pending.error
+        if len(pending.results) < len(feature_arrays):
+            # Dispatcher went down in the middle of this batch
+            with self._condition:
+                self._direct_fallbacks += 1
+            return self._predict_direct(feature_arrays)
+        return pending.results
+
+    def stop(self):
+        """Stop the dispatcher thread after draining queued requests"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join(timeout=5.0)
+
+    def _predict_direct(self, feature_arrays: Dict[int, np.ndarray]) -> Dict[int, float]:
+        """Score one request on the calling thread (dispatcher dead or too slow)"""
+        return {
+            group_id: self._predict_fn(group_id, feature_array)[0]
+            for group_id, feature_array in feature_arrays.items()
+        }
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and self._running:
+                    self._condition.wait()
+                if not self._queue and not self._running:
+                    return
+
+                # Collection window starts with the first queued request
+                deadline = time.monotonic() + self.window_seconds
+                while len(self._queue) < self.max_batch_size and self._running:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                batch_size = min(len(self._queue), self.max_batch_size)
+                batch = [self._queue.popleft() for _ in range(batch_size)]
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[_PendingRequest]):
+        # Group rows by model so each model runs once on a stacked matrix
+        rows_by_group: Dict[int, List[_PendingRequest]] = {}
+        for pending in batch:
+            for group_id in pending.feature_arrays:
+                rows_by_group.setdefault(group_id, []).append(pending)
+
+        total_rows = 0
+        try:
+            for group_id, members in rows_by_group.items():
+                try:
+                    matrix = np.vstack([member.feature_arrays[group_id] for member in members])
+                    predictions = self._predict_fn(group_id, matrix)
+                    for member, value in zip(members, predictions):
+                        member.results[group_id] = value
+                    total_rows += len(members)
+                except Exception as e:
+                    for member in members:
+                        member.error = e
+        finally:
+            # Waiters are released even if the thread is going down
+            for pending in batch:
+                pending.done.set()
+
+        try:
+            self._record_batch(len(batch), total_rows)
+        except Exception:
+            # Stats must not stop the dispatcher
+            pass
+
+    def _record_batch(self, batch_size: int, rows: int):
+        bucket = len(BATCH_SIZE_BUCKETS)
+        for index, upper in enumerate(BATCH_SIZE_BUCKETS):
+            if batch_size <= upper:
+                bucket = index
+                break
+
+        with self._condition:
+            self._batches += 1
+            self._requests += batch_size
+            self._rows += rows
+            self._max_batch_seen = max(self._max_batch_seen, batch_size)
+            self._batch_size_counts[bucket] += 1
+
+    def get_stats(self) -> Dict:
+        """Queue depth and batch-size statistics for tuning"""
+        with self._condition:
+            labels = [f'<={upper}' for upper in BATCH_SIZE_BUCKETS] + [f'>{BATCH_SIZE_BUCKETS[-1]}']
+            return {
+                'enabled': True,
+                'windowMs': self.window_seconds * 1000.0,
+                'maxBatchSize': self.max_batch_size,
+                'queueDepth': len(self._queue),
+                'maxQueueDepth': self._max_queue_depth,
+                'batches': self._batches,
+                'requests': self._requests,
+                'rows': self._rows,
+                'averageBatchSize': self._requests / self._batches if self._batches else 0.0,
+                'maxObservedBatchSize': self._max_batch_seen,
+                'batchSizeHistogram': dict(zip(labels, self._batch_size_counts)),
+                'maxWaitMs': self.max_wait_seconds * 1000.0,
+                'dispatcherAlive': self._thread.is_alive(),
+                'timeouts': self._timeouts,
+                'directFallbacks': self._direct_fallbacks
+            }
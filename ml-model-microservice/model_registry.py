@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AllerMind Model Registry
+Versioned hot reload of group models with validation, atomic swap and rollback
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from expert_predictor import GROUP_IDS
+from feature_layout import CompiledFeatureLayout, FEATURE_DEFAULTS
+
+logger = logging.getLogger(__name__)
+
+ADMIN_HEADER = 'X-Admin-Token'
+
+# Package keys the prediction path reads
+REQUIRED_PACKAGE_KEYS = ('features', 'algorithm_used', 'performance', 'group_info', 'target_info', 'created_at')
+
+
+class SwapGate:
+    """
+    Lets a model swap wait until in-flight predictions have finished
+
+    Predictions enter with serving() and never wait on each other. A swap
+    enters with exclusive(): new predictions pause only while the swap waits
+    for the in-flight ones and assigns the new references, then continue on
+    the new version. A prediction therefore never mixes the feature layout of
+    one version with the model of another. serving() is re-entrant per thread.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._active = 0
+        self._swapping = False
+        self._local = threading.local()
+
+    @contextmanager
+    def serving(self) -> Iterator[None]:
+        depth = getattr(self._local, 'depth', 0)
+        if depth:
+            self._local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.depth = depth
+            return
+
+        with self._condition:
+            while self._swapping:
+                self._condition.wait()
+            self._active += 1
+        self._local.depth = 1
+        try:
+            yield
+        finally:
+            self._local.depth = 0
+            with self._condition:
+                self._active -= 1
+                if self._swapping and self._active == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        with self._condition:
+            while self._swapping:
+                self._condition.wait()
+            self._swapping = True
+            while self._active:
+                self._condition.wait()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._swapping = False
+                self._condition.notify_all()
+
+
+class ModelRegistry:
+    """
+    Per-group model versions on top of ExpertAllermindPredictor
+
+    A reload reads Grup{N} from the predictor's model directory on a
+    background thread (artifact or pickle, as at startup), validates it on a
+    deterministic smoke batch and only then swaps it in under the SwapGate.
+    The replaced version stays in memory so rollback() is a reference swap.
+    Reloads are triggered by the admin API or, with a watch interval, by a
+    poller that reloads a group once its pickle has changed and stayed
+    unchanged for one poll (so half-copied files are not picked up).
+
+    Reloads only read from the configured model directory. Every process
+    keeps its own registry: under gunicorn, use the watcher so that each
+    worker picks up new files; admin calls act on the worker that serves them.
+    """
+
+    def __init__(self, predictor, watch_interval: float = 0.0, admin_token: Optional[str] = None,
+                 history_size: int = 20, smoke_rows: int = 64, max_drift: Optional[float] = None):
+        self.predictor = predictor
+        self.watch_interval = max(0.0, float(watch_interval))
+        self._admin_token = admin_token.encode('utf-8') if admin_token else None
+        self.history_size = max(1, int(history_size))
+        self.smoke_rows = max(1, int(smoke_rows))
+        self.max_drift = max_drift if max_drift and max_drift > 0 else None
+
+        self.gate = SwapGate()
+        self._lock = threading.Lock()
+        self._swap_listeners: List[Callable[[List[int]], None]] = []
+        self._history: List[Dict[str, Any]] = []
+        self._next_version = {group_id: 1 for group_id in GROUP_IDS}
+        self._versions: Dict[int, Dict[str, Optional[Dict[str, Any]]]] = {
+            group_id: {'active': None, 'previous': None} for group_id in GROUP_IDS
+        }
+
+        for group_id in predictor.loaded_groups():
+            self._adopt_loaded(group_id)
+
+        self._smoke_environments, self._smoke_times = self._build_smoke_inputs()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-reload')
+        self._watch_stop = threading.Event()
+        self._watch_thread: Optional[threading.Thread] = None
+        self._pending_changes: Dict[int, tuple] = {}
+        self._ignored_files: Dict[int, tuple] = {}
+        if self.watch_interval:
+            self._start_watcher()
+
+    @classmethod
+    def from_env(cls, predictor) -> Optional['ModelRegistry']:
+        """Create a registry if MODEL_REGISTRY_ENABLED or MODEL_WATCH_INTERVAL is set, otherwise return None"""
+        enabled = os.environ.get('MODEL_REGISTRY_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+        watch_interval = float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
+        if not enabled and watch_interval <= 0:
+            return None
+        return cls(
+            predictor,
+            watch_interval=watch_interval,
+            admin_token=os.environ.get('MODEL_ADMIN_TOKEN') or None,
+            history_size=int(os.environ.get('MODEL_REGISTRY_HISTORY', 20)),
+            smoke_rows=int(os.environ.get('MODEL_SMOKE_ROWS', 64)),
+            max_drift=float(os.environ.get('MODEL_RELOAD_MAX_DRIFT', 0))
+        )
+
+    def after_fork(self) -> None:
+        """Re-create the reload thread and watcher in a forked worker (threads are not inherited)"""
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-reload')
+        self._watch_stop = threading.Event()
+        self._watch_thread = None
+        if self.watch_interval:
+            self._start_watcher()
+
+    def serving(self):
+        """Context manager every prediction entry point runs under"""
+        return self.gate.serving()
+
+    def add_swap_listener(self, listener: Callable[[List[int]], None]) -> None:
+        """Called with the swapped group ids while predictions are still paused"""
+        self._swap_listeners.append(listener)
+
+    def is_authorized(self, headers: Mapping[str, str]) -> bool:
+        """True if no admin token is configured or the request carries it"""
+        if self._admin_token is None:
+            return True
+        supplied = headers.get(ADMIN_HEADER)
+        return bool(supplied) and hmac.compare_digest(supplied.encode('utf-8'), self._admin_token)
+
+    def request_reload(self, group_ids: Sequence[int], force: bool = False, trigger: str = 'admin') -> Future:
+        """Queue a reload on the background thread; reloads run one at a time"""
+        return self._executor.submit(self.reload, list(group_ids), force, trigger)
+
+    def reload(self, group_ids: Sequence[int], force: bool = False, trigger: str = 'admin') -> Dict[str, Any]:
+        """
+        Load, validate and swap in the current files of the given groups
+
+        Groups whose file fingerprint matches the active version are skipped
+        unless force is set. Groups that fail to load or validate keep serving
+        their active version.
+        """
+        started = time.perf_counter()
+        results: Dict[str, Dict[str, Any]] = {}
+        candidates = {}
+
+        # Lazily loaded groups first load the normal way so the new version has something to replace
+        self.predictor.ensure_groups_loaded(group_ids)
+        for group_id in group_ids:
+            self._adopt_loaded(group_id)
+
+        for group_id in group_ids:
+            file_state = self._file_state(group_id)
+            active = self._versions[group_id]['active']
+            if not force and active is not None and file_state['fingerprint'] is not None \
+                    and file_state['fingerprint'] == active['fingerprint']:
+                results[str(group_id)] = {'status': 'unchanged', 'version': active['version']}
+                continue
+
+            try:
+                model_package, compiled, source = self.predictor.read_group_model(group_id)
+            except Exception as e:
+                logger.error(f"❌ Grup {group_id} yeni sürüm yüklenemedi: {e}")
+                results[str(group_id)] = {'status': 'load_failed', 'error': str(e)}
+                continue
+
+            validation = self.validate(group_id, model_package, compiled)
+            if not validation['passed']:
+                logger.error(f"❌ Grup {group_id} yeni sürüm doğrulanamadı: {validation['error']}")
+                results[str(group_id)] = {'status': 'rejected', 'validation': validation}
+                continue
+
+            with self._lock:
+                candidates[group_id] = self._make_version(group_id, model_package, compiled, source, file_state, validation)
+
+        if candidates:
+            with self.gate.exclusive():
+                for group_id, candidate in candidates.items():
+                    self.predictor.install_group(group_id, candidate['package'], candidate['compiled'], candidate['source'])
+                    versions = self._versions[group_id]
+                    if versions['active'] is not None:
+                        versions['previous'] = versions['active']
+                    versions['active'] = candidate
+                self._notify_swap(list(candidates))
+
+            for group_id, candidate in candidates.items():
+                logger.info(f"🔄 Grup {group_id} sürüm {candidate['version']} devrede ({candidate['source']})")
+                results[str(group_id)] = {
+                    'status': 'swapped',
+                    'version': candidate['version'],
+                    'previousVersion': self._versions[group_id]['previous']['version'] if self._versions[group_id]['previous'] else None,
+                    'validation': candidate['validation']
+                }
+
+        return self._record('reload', trigger, results, started)
+
+    def rollback(self, group_ids: Sequence[int]) -> Dict[str, Any]:
+        """
+        Swap the previous version back in; rolling back twice restores the newer version
+
+        The watcher leaves the group alone until its file changes again.
+        """
+        started = time.perf_counter()
+        results: Dict[str, Dict[str, Any]] = {}
+        swapped = []
+
+        with self.gate.exclusive():
+            for group_id in group_ids:
+                versions = self._versions[group_id]
+                previous = versions['previous']
+                if previous is None:
+                    results[str(group_id)] = {'status': 'no_previous_version'}
+                    continue
+
+                self.predictor.install_group(group_id, previous['package'], previous['compiled'], previous['source'])
+                versions['previous'], versions['active'] = versions['active'], previous
+                swapped.append(group_id)
+                results[str(group_id)] = {
+                    'status': 'rolled_back',
+                    'version': previous['version'],
+                    'previousVersion': versions['previous']['version'] if versions['previous'] else None
+                }
+            if swapped:
+                self._notify_swap(swapped)
+
+        for group_id in swapped:
+            # The watcher must not re-apply the file that was just rolled back
+            self._ignore_current_file(group_id)
+            logger.info(f"⏪ Grup {group_id} sürüm {self._versions[group_id]['active']['version']} geri alındı")
+
+        return self._record('rollback', 'admin', results, started)
+
+    def validate(self, group_id: int, model_package: Dict[str, Any], compiled: Any) -> Dict[str, Any]:
+        """
+        Smoke-test a candidate before it serves traffic
+
+        Checks the package keys, scores a deterministic batch (all hours, both
+        weekday and weekend) and requires finite output. When both a compiled
+        evaluator and the sklearn model are present their outputs must agree;
+        drift against the active version is reported and, with max_drift,
+        enforced (mean absolute difference in safe hours).
+        """
+        report: Dict[str, Any] = {'passed': False, 'rows': len(self._smoke_environments), 'error': None}
+        try:
+            missing_keys = [key for key in REQUIRED_PACKAGE_KEYS if key not in model_package]
+            if missing_keys:
+                raise ValueError(f"Model paketinde eksik anahtarlar: {', '.join(missing_keys)}")
+            if compiled is None and model_package.get('model') is None:
+                raise ValueError("Model paketinde değerlendirici yok")
+
+            layout = CompiledFeatureLayout({group_id: model_package['features']})
+            unknown_features = [feature for feature in model_package['features'] if feature not in layout.slot_index]
+            report['unknownFeatures'] = unknown_features
+
+            predictions = self._score(layout, group_id, model_package, compiled)
+            if predictions.shape != (len(self._smoke_environments),) or not np.all(np.isfinite(predictions)):
+                raise ValueError("Smoke batch tahminleri sonlu değil veya boyut hatalı")
+            report['predictionRange'] = [float(predictions.min()), float(predictions.max())]
+
+            if compiled is not None and model_package.get('model') is not None:
+                reference = self.predictor.evaluate_model_package(model_package, None, layout.group_matrix(self._smoke_matrix(layout), group_id))
+                report['maxParityError'] = float(np.max(np.abs(predictions - reference)))
+                if report['maxParityError'] > 1e-6:
+                    raise ValueError(f"Derlenmiş model sklearn ile uyuşmuyor (max hata {report['maxParityError']:.2e})")
+
+            active = self._versions[group_id]['active']
+            if active is not None:
+                active_layout = CompiledFeatureLayout({group_id: active['package']['features']})
+                active_predictions = self._score(active_layout, group_id, active['package'], active['compiled'])
+                drift = np.abs(predictions - active_predictions)
+                report['meanDrift'] = float(drift.mean())
+                report['maxDrift'] = float(drift.max())
+                if self.max_drift is not None and report['meanDrift'] > self.max_drift:
+                    raise ValueError(f"Aktif sürüme göre sapma çok yüksek (ortalama {report['meanDrift']:.3f} > {self.max_drift})")
+
+            report['passed'] = True
+        except Exception as e:
+            report['error'] = str(e)
+        return report
+
+    def get_status(self) -> Dict[str, Any]:
+        """Active/previous version per group, watcher settings and recent reloads"""
+        for group_id in self.predictor.loaded_groups():
+            self._adopt_loaded(group_id)
+        with self._lock:
+            history = list(self._history)
+        return {
+            'enabled': True,
+            'pid': os.getpid(),
+            'watchIntervalSeconds': self.watch_interval or None,
+            'maxDrift': self.max_drift,
+            'adminTokenRequired': self._admin_token is not None,
+            'groups': {
+                str(group_id): {
+                    'active': self._describe(versions['active']),
+                    'previous': self._describe(versions['previous'])
+                }
+                for group_id, versions in self._versions.items()
+            },
+            'history': history
+        }
+
+    def _adopt_loaded(self, group_id: int) -> None:
+        """Record a group the predictor loaded on its own (at startup or lazily) as version 1"""
+        if self._versions[group_id]['active'] is not None or group_id not in self.predictor.models:
+            return
+        predictor = self.predictor
+        file_state = self._file_state(group_id)
+        with self._lock:
+            if self._versions[group_id]['active'] is None:
+                self._versions[group_id]['active'] = self._make_version(
+                    group_id, predictor.models[group_id], predictor.compiled_models.get(group_id),
+                    predictor.load_status[group_id]['source'], file_state, validation=None
+                )
+
+    def _score(self, layout: CompiledFeatureLayout, group_id: int, model_package: Dict[str, Any], compiled: Any) -> np.ndarray:
+        feature_matrix = layout.group_matrix(self._smoke_matrix(layout), group_id)
+        return np.asarray(self.predictor.evaluate_model_package(model_package, compiled, feature_matrix), dtype=np.float64).ravel()
+
+    def _smoke_matrix(self, layout: CompiledFeatureLayout) -> np.ndarray:
+        matrix = layout.new_matrix(len(self._smoke_environments))
+        for row_index, (environment, (hour, day_of_week)) in enumerate(zip(self._smoke_environments, self._smoke_times)):
+            layout.fill(environment, matrix[row_index], hour, day_of_week)
+        return matrix
+
+    def _build_smoke_inputs(self):
+        """Deterministic environments around FEATURE_DEFAULTS, cycling through hours and weekdays"""
+        rng = np.random.default_rng(0)
+        environments = []
+        times = []
+        for row_index in range(self.smoke_rows):
+            factors = rng.uniform(0.5, 1.5, size=len(FEATURE_DEFAULTS))
+            environments.append({
+                name: float(default) * float(factor)
+                for (name, default), factor in zip(FEATURE_DEFAULTS.items(), factors)
+            })
+            times.append((row_index % 24, (row_index // 24) % 7))
+        return environments, times
+
+    def _file_state(self, group_id: int) -> Dict[str, Any]:
+        """Size, mtime and sha256 of the group's pickle (or of its artifact manifest when there is no pickle)"""
+        path = self.predictor.group_model_path(group_id)
+        if not os.path.exists(path):
+            path = os.path.join(self.predictor.model_path, f"Grup{group_id}_advanced_model_v2.manifest.json")
+        try:
+            stat = os.stat(path)
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        except OSError:
+            return {'file': os.path.basename(path), 'size': None, 'mtimeNs': None, 'fingerprint': None}
+        return {'file': os.path.basename(path), 'size': stat.st_size, 'mtimeNs': stat.st_mtime_ns, 'fingerprint': digest.hexdigest()}
+
+    def _make_version(self, group_id, model_package, compiled, source, file_state, validation) -> Dict[str, Any]:
+        version = self._next_version[group_id]
+        self._next_version[group_id] += 1
+        return {
+            'version': version,
+            'package': model_package,
+            'compiled': compiled,
+            'source': source,
+            'file': file_state['file'],
+            'size': file_state['size'],
+            'mtimeNs': file_state['mtimeNs'],
+            'fingerprint': file_state['fingerprint'],
+            'loadedAt': datetime.now().isoformat(),
+            'validation': validation
+        }
+
+    @staticmethod
+    def _describe(version: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if version is None:
+            return None
+        return {
+            'version': version['version'],
+            'algorithm': version['package']['algorithm_used'],
+            'createdAt': version['package'].get('created_at'),
+            'source': version['source'],
+            'compiled': version['compiled'] is not None,
+            'file': version['file'],
+            'fingerprint': version['fingerprint'][:12] if version['fingerprint'] else None,
+            'loadedAt': version['loadedAt'],
+            'validation': version['validation']
+        }
+
+    def _notify_swap(self, group_ids: List[int]) -> None:
+        for listener in self._swap_listeners:
+            try:
+                listener(group_ids)
+            except Exception as e:
+                logger.error(f"❌ Model değişim dinleyicisi hatası: {e}")
+
+    def _record(self, action: str, trigger: str, results: Dict[str, Any], started: float) -> Dict[str, Any]:
+        entry = {
+            'action': action,
+            'trigger': trigger,
+            'timestamp': datetime.now().isoformat(),
+            'durationMs': round((time.perf_counter() - started) * 1000, 2),
+            'groups': results
+        }
+        with self._lock:
+            self._history.append(entry)
+            del self._history[:-self.history_size]
+        return entry
+
+    def _start_watcher(self) -> None:
+        self._watch_thread = threading.Thread(target=self._watch_loop, name='model-watcher', daemon=True)
+        self._watch_thread.start()
+
+    def _watch_loop(self) -> None:
+        while not self._watch_stop.wait(self.watch_interval):
+            try:
+                changed = self._poll_changes()
+                if changed:
+                    logger.info(f"👀 Değişen model dosyaları: {changed}")
+                    result = self.request_reload(changed, trigger='watch').result()
+                    self._remember_rejected(result)
+            except RuntimeError:
+                # Executor shut down with the interpreter
+                return
+            except Exception as e:
+                logger.error(f"❌ Model izleyici hatası: {e}")
+
+    def _remember_rejected(self, result: Dict[str, Any]) -> None:
+        """Do not retry a file that failed to load or validate until it changes again"""
+        for group_id, outcome in result['groups'].items():
+            if outcome['status'] in ('load_failed', 'rejected'):
+                self._ignore_current_file(int(group_id))
+
+    def _ignore_current_file(self, group_id: int) -> None:
+        try:
+            stat = os.stat(self.predictor.group_model_path(group_id))
+        except OSError:
+            return
+        self._ignored_files[group_id] = (stat.st_size, stat.st_mtime_ns)
+
+    def _poll_changes(self) -> List[int]:
+        """Groups whose file differs from the active version and was unchanged since the previous poll"""
+        changed = []
+        for group_id in GROUP_IDS:
+            path = self.predictor.group_model_path(group_id)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self._pending_changes.pop(group_id, None)
+                continue
+
+            # Groups still waiting for their lazy first load will read the new file anyway
+            if self.predictor.load_status[group_id]['state'] in ('pending', 'loading'):
+                continue
+
+            current = (stat.st_size, stat.st_mtime_ns)
+            self._adopt_loaded(group_id)
+            active = self._versions[group_id]['active']
+            if (active is not None and (active['size'], active['mtimeNs']) == current) \
+                    or self._ignored_files.get(group_id) == current:
+                self._pending_changes.pop(group_id, None)
+                continue
+
+            if self._pending_changes.get(group_id) == current:
+                changed.append(group_id)
+                self._pending_changes.pop(group_id, None)
+            else:
+                self._pending_changes[group_id] = current
+        return changed
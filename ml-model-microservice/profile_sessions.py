@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AllerMind Profile Sessions
+Parsed user profiles registered once and referenced by userPreferenceId
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+SESSION_FILE_SUFFIX = '.json'
+
+# Registrations between sweeps of expired session files
+PRUNE_EVERY = 1000
+
+MAX_ID_LENGTH = 128
+
+
+class ProfileSessionNotFound(LookupError):
+    """No usable session for the id; reason is 'unknown' or 'expired'"""
+
+    def __init__(self, user_preference_id: str, reason: str):
+        super().__init__(user_preference_id, reason)
+        self.user_preference_id = user_preference_id
+        self.reason = reason
+
+
+class ProfileSession:
+    """One registered userClassification with its parsed personal params"""
+    __slots__ = ('user_preference_id', 'user_classification', 'personal_params', 'registered_at', 'expires_at', 'file_mtime')
+
+    def __init__(self, user_preference_id: str, user_classification: Dict[str, Any], personal_params: Dict[str, Any],
+                 registered_at: float, expires_at: float, file_mtime: Optional[int] = None):
+        self.user_preference_id = user_preference_id
+        self.user_classification = user_classification
+        self.personal_params = personal_params
+        self.registered_at = registered_at
+        self.expires_at = expires_at
+        self.file_mtime = file_mtime
+
+
+def validate_user_preference_id(user_preference_id: Any) -> str:
+    if not isinstance(user_preference_id, str) or not user_preference_id.strip() or len(user_preference_id) > MAX_ID_LENGTH:
+        raise ValueError(f"userPreferenceId boş olmayan bir metin olmalı (en fazla {MAX_ID_LENGTH} karakter)")
+    return user_preference_id
+
+
+class ProfileSessionStore:
+    """
+    TTL + LRU store of parsed profiles keyed by userPreferenceId
+
+    register() parses the userClassification once with `parse_fn` (the service's
+    personal params conversion) and warms the profile-signature multiplier
+    cache through `multiplier_fn`. Predictions that send only the id reuse both.
+    Sessions expire `ttl_seconds` after registration; at most `max_size` are
+    kept per process, least recently used first out.
+
+    With `session_dir`, registrations are also written there (raw
+    userClassification, not parsed params). Processes sharing the directory
+    (gunicorn workers) load a session on their first miss, drop it when the
+    file is removed by invalidate() and re-parse it when it is re-registered,
+    so a registration or invalidation only has to reach one worker.
+    """
+
+    def __init__(self, parse_fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 multiplier_fn: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                 max_size: int = 50000, ttl_seconds: float = 86400.0, session_dir: Optional[str] = None):
+        self._parse_fn = parse_fn
+        self._multiplier_fn = multiplier_fn
+        self.max_size = max(1, int(max_size))
+        self.ttl_seconds = max(1.0, float(ttl_seconds))
+        self.session_dir = session_dir
+        self._sessions: 'OrderedDict[str, ProfileSession]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Stats (guarded by _lock)
+        self.registrations = 0
+        self.hits = 0
+        self.unknown = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.file_loads = 0
+
+        if self.session_dir:
+            os.makedirs(self.session_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, parse_fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 multiplier_fn: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Optional['ProfileSessionStore']:
+        """Create the store unless PROFILE_SESSIONS_ENABLED=false"""
+        if os.environ.get('PROFILE_SESSIONS_ENABLED', 'true').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(
+            parse_fn,
+            multiplier_fn=multiplier_fn,
+            max_size=int(os.environ.get('PROFILE_SESSION_MAX', 50000)),
+            ttl_seconds=float(os.environ.get('PROFILE_SESSION_TTL', 86400)),
+            session_dir=os.environ.get('PROFILE_SESSION_DIR') or None
+        )
+
+    def register(self, user_classification: Dict[str, Any]) -> ProfileSession:
+        """Parse and store the profile under its userPreferenceId (replaces an earlier registration)"""
+        user_preference_id = validate_user_preference_id(user_classification.get('userPreferenceId'))
+        registered_at = time.time()
+
+        file_mtime = None
+        if self.session_dir:
+            file_mtime = self._write_file(user_preference_id, user_classification, registered_at)
+
+        session = self._build_session(user_preference_id, user_classification, registered_at, file_mtime)
+        with self._lock:
+            self._store(session)
+            self.registrations += 1
+            prune = self.session_dir and self.registrations % PRUNE_EVERY == 0
+
+        if prune:
+            self._prune_files()
+        return session
+
+    def get(self, user_preference_id: str) -> ProfileSession:
+        """Registered session for the id; raises ProfileSessionNotFound if unknown or expired"""
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(user_preference_id)
+            if session is not None:
+                self._sessions.move_to_end(user_preference_id)
+
+        if self.session_dir:
+            session = self._sync_file(user_preference_id, session)
+
+        with self._lock:
+            if session is None:
+                self.unknown += 1
+                raise ProfileSessionNotFound(user_preference_id, 'unknown')
+            if session.expires_at <= now:
+                self._sessions.pop(user_preference_id, None)
+                self.expired += 1
+                expired = True
+            else:
+                self.hits += 1
+                expired = False
+
+        if expired:
+            if self.session_dir:
+                self._remove_file(user_preference_id)
+            raise ProfileSessionNotFound(user_preference_id, 'expired')
+        return session
+
+    def invalidate(self, user_preference_id: str) -> bool:
+        """Forget the session (and its shared file); False if it was not registered"""
+        with self._lock:
+            removed = self._sessions.pop(user_preference_id, None) is not None
+        if self.session_dir:
+            removed = self._remove_file(user_preference_id) or removed
+        if removed:
+            with self._lock:
+                self.invalidations += 1
+        return removed
+
+    def clear(self) -> None:
+        """Drop the in-process sessions (shared files stay)"""
+        with self._lock:
+            self._sessions.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.unknown + self.expired
+            return {
+                'enabled': True,
+                'sessions': len(self._sessions),
+                'maxSize': self.max_size,
+                'ttlSeconds': self.ttl_seconds,
+                'sessionDir': self.session_dir,
+                'registrations': self.registrations,
+                'hits': self.hits,
+                'unknown': self.unknown,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'fileLoads': self.file_loads,
+                'hitRate': self.hits / lookups if lookups else 0.0
+            }
+
+    def _build_session(self, user_preference_id: str, user_classification: Dict[str, Any],
+                       registered_at: float, file_mtime: Optional[int]) -> ProfileSession:
+        personal_params = self._parse_fn(user_classification)
+        if self._multiplier_fn is not None:
+            self._multiplier_fn(personal_params)
+        return ProfileSession(user_preference_id, user_classification, personal_params,
+                              registered_at, registered_at + self.ttl_seconds, file_mtime)
+
+    def _store(self, session: ProfileSession) -> None:
+        self._sessions[session.user_preference_id] = session
+        self._sessions.move_to_end(session.user_preference_id)
+        while len(self._sessions) > self.max_size:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+    def _file_path(self, user_preference_id: str) -> str:
+        digest = hashlib.sha256(user_preference_id.encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.session_dir, f"{digest}{SESSION_FILE_SUFFIX}")
+
+    def _write_file(self, user_preference_id: str, user_classification: Dict[str, Any], registered_at: float) -> int:
+        path = self._file_path(user_preference_id)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'userPreferenceId': user_preference_id,
+                'registeredAt': registered_at,
+                'userClassification': user_classification
+            }, f)
+        os.replace(temp_path, path)
+        return os.stat(path).st_mtime_ns
+
+    def _remove_file(self, user_preference_id: str) -> bool:
+        try:
+            os.remove(self._file_path(user_preference_id))
+            return True
+        except OSError:
+            return False
+
+    def _sync_file(self, user_preference_id: str, session: Optional[ProfileSession]) -> Optional[ProfileSession]:
+        """Match the local session with the shared file: removed, re-registered or not loaded yet"""
+        path = self._file_path(user_preference_id)
+        try:
+            file_mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            if session is not None:
+                # Invalidated in another process
+                with self._lock:
+                    self._sessions.pop(user_preference_id, None)
+            return None
+
+        if session is not None and session.file_mtime == file_mtime:
+            return session
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return session
+        if stored.get('userPreferenceId') != user_preference_id:
+            return None
+
+        session = self._build_session(user_preference_id, stored['userClassification'], stored['registeredAt'], file_mtime)
+        with self._lock:
+            self._store(session)
+            self.file_loads += 1
+        return session
+
+    def _prune_files(self) -> None:
+        """Remove session files whose TTL has passed"""
+        cutoff = time.time() - self.ttl_seconds
+        for name in os.listdir(self.session_dir):
+            if not name.endswith(SESSION_FILE_SUFFIX):
+                continue
+            path = os.path.join(self.session_dir, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
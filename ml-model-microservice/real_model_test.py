@@ -10,12 +10,14 @@ import os
 import sys
 import json
 import logging
+import time
 import traceback
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+import functools
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, List, Optional, Any
 from dataclasses import asdict
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import numpy as np
 
@@ -46,7 +48,7 @@ if expert_model_path not in sys.path:
     sys.path.insert(0, expert_model_path)
 
 try:
-    from expert_predictor import ExpertAllermindPredictor
+    from expert_predictor import ExpertAllermindPredictor, risk_level_label
 except ImportError as e:
     print(f"❌ Expert predictor import hatası: {e}")
     print(f"Path: {expert_model_path}")
@@ -59,11 +61,29 @@ except ImportError as e:
         print(f"Expert model klasörü bulunamadı: {expert_model_path}")
     sys.exit(1)
 
-# Logging configuration
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from micro_batcher import MicroBatcher
+from request_profiler import RequestProfiler
+from prediction_cache import BasePredictionCache, TTLLRUCache
+from latency_metrics import ServiceMetrics
+from risk_grid import BaseRiskGrid, validate_plaka
+from model_registry import ModelRegistry
+from thread_policy import ThreadPolicy
+from request_logging import RequestLogPipeline, annotate_request
+from singleflight import SingleFlight
+from profile_sessions import ProfileSessionNotFound, ProfileSessionStore
+from snapshot_registry import EnvironmentSnapshot, SnapshotNotFound, SnapshotRegistry, validate_snapshot_id
+from response_compression import GzipCompressor
+
+# Logging configuration: records are queued to a background writer with per-route
+# sampling and an optional one-line summary mode (LOG_ASYNC=false logs synchronously)
+request_log = RequestLogPipeline.from_env()
+if request_log is not None:
+    request_log.install()
+else:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
 logger = logging.getLogger(__name__)
 
 print("🚀 AllerMind REST API başlatılıyor...")
@@ -73,6 +93,29 @@ CORS(app)
 
 print("✅ Flask ve CORS başlatıldı")
 
+# Per-stage / per-model latency histograms and request outcome counters (METRICS_ENABLED=false disables).
+# Under gunicorn every worker process keeps its own counters.
+service_metrics = ServiceMetrics.from_env()
+
+# On-demand cProfile of single /api/v1/predict calls (only when PROFILE_TOKEN is set)
+request_profiler = RequestProfiler.from_env()
+
+# Identical concurrent /api/v1/predict requests share one computation (SINGLEFLIGHT_ENABLED=false disables)
+prediction_singleflight = SingleFlight.from_env(metrics=service_metrics)
+
+# Gzip for larger response bodies when the client accepts it (RESPONSE_GZIP_ENABLED=false disables)
+response_compressor = GzipCompressor.from_env()
+
+def serves_models(method):
+    """Run a prediction entry point under the model registry's swap gate (when the registry is enabled)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.model_registry is None:
+            return method(self, *args, **kwargs)
+        with self.model_registry.serving():
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class AllerMindRiskPredictor:
     """
     Production-ready allergy risk prediction service
@@ -84,8 +127,63 @@ class AllerMindRiskPredictor:
         logger.info("🤖 AllerMind Expert Risk Predictor başlatılıyor...")
         
         try:
+            # Estimator n_jobs and BLAS/OpenMP caps sized from the detected cores (THREAD_POLICY_ENABLED=false disables).
+            # The environment is exported first so libraries loaded with the models start capped.
+            self.thread_policy = ThreadPolicy.from_env()
+            if self.thread_policy:
+                self.thread_policy.export_env()
+            
             # Initialize Expert Predictor (new model system)
-            self.predictor = ExpertAllermindPredictor()
+            # MODEL_LAZY_LOADING=true loads each group on first use; MODEL_LOAD_WORKERS sizes the loader pool
+            load_workers = os.environ.get('MODEL_LOAD_WORKERS')
+            self.predictor = ExpertAllermindPredictor(
+                compile_models=os.environ.get('COMPILE_MODELS', 'true').lower() in ('1', 'true', 'yes'),
+                lazy_loading=os.environ.get('MODEL_LAZY_LOADING', 'false').lower() in ('1', 'true', 'yes'),
+                load_workers=int(load_workers) if load_workers else None,
+                n_jobs=self.thread_policy.n_jobs if self.thread_policy else None
+            )
+            
+            if self.thread_policy:
+                self.thread_policy.apply()
+                logger.info(f"🧵 Thread politikası - {self.thread_policy.cpus['effective']} çekirdek, "
+                            f"n_jobs={self.thread_policy.n_jobs}, BLAS={self.thread_policy.blas_threads}")
+            
+            # Base prediction cache (PREDICTION_CACHE_SIZE=0 disables)
+            self.prediction_cache = BasePredictionCache.from_env()
+            self.predictor.prediction_cache = self.prediction_cache
+            
+            # Profile signature -> per-group multiplier memo (MULTIPLIER_CACHE_SIZE=0 disables)
+            multiplier_cache_size = int(os.environ.get('MULTIPLIER_CACHE_SIZE', 10000))
+            self.multiplier_cache = TTLLRUCache(max_size=multiplier_cache_size) if multiplier_cache_size > 0 else None
+            self.predictor.multiplier_cache = self.multiplier_cache
+            
+            self.metrics = service_metrics
+            self.predictor.metrics = self.metrics
+            
+            # Parsed profiles registered once and referenced by userPreferenceId (PROFILE_SESSIONS_ENABLED=false disables)
+            self.profile_sessions = ProfileSessionStore.from_env(
+                self._convert_to_personal_params, self.predictor.calculate_personal_multipliers
+            )
+            
+            # Converted, feature-engineered environmentalData referenced by snapshotId (ENV_SNAPSHOTS_ENABLED=false disables)
+            self.env_snapshots = SnapshotRegistry.from_env(
+                self._convert_to_expert_environmental_data, self.predictor.prepare_features
+            )
+            
+            # Per-province, per-hour base predictions fed by /api/v1/risk-grid (RISK_GRID_ENABLED=false disables)
+            self.risk_grid = BaseRiskGrid.from_env(self.predictor)
+            
+            # Versioned hot reload / rollback of group models (MODEL_REGISTRY_ENABLED=true or MODEL_WATCH_INTERVAL>0)
+            self.model_registry = ModelRegistry.from_env(self.predictor)
+            if self.model_registry:
+                self.model_registry.add_swap_listener(self._on_models_swapped)
+                logger.info(f"🔄 Model registry aktif - izleme aralığı: {self.model_registry.watch_interval or 'kapalı'}")
+            
+            # Opt-in request coalescing (MICROBATCH_ENABLED=true)
+            self.micro_batcher = MicroBatcher.from_env(self.predictor.predict_base_batch)
+            self.predictor.micro_batcher = self.micro_batcher
+            if self.micro_batcher:
+                logger.info(f"📦 Micro-batching aktif - pencere: {self.micro_batcher.window_seconds * 1000:.1f}ms, maks batch: {self.micro_batcher.max_batch_size}")
             
             # Model grupları (Flutter uygulaması ile uyumlu)
             self.model_groups = {
@@ -105,23 +203,49 @@ class AllerMindRiskPredictor:
             logger.error(f"❌ Expert sistem başlatma hatası: {e}")
             raise
     
+    def after_fork(self):
+        """Re-create per-process helpers in a forked worker (threads are not inherited)"""
+        if self.micro_batcher is not None:
+            self.micro_batcher = MicroBatcher.from_env(self.predictor.predict_base_batch)
+            self.predictor.micro_batcher = self.micro_batcher
+        if self.model_registry is not None:
+            self.model_registry.after_fork()
+        if self.thread_policy is not None:
+            self.thread_policy.after_fork()
+        
+        logger.info(f"👷 Worker {os.getpid()} hazır")
+    
     def _validate_system(self):
         """Validate Expert Predictor is ready"""
-        # Check if models are loaded
-        if not hasattr(self.predictor, 'models') or not self.predictor.models:
+        load_status = self.predictor.get_load_status()
+        if not load_status['ready']:
             raise Exception("Expert modeller yüklenmedi")
         
-        loaded_models = list(self.predictor.models.keys())
-        logger.info(f"📊 {len(loaded_models)} expert model hazır: {loaded_models}")
+        if load_status['mode'] == 'lazy':
+            logger.info("💤 Lazy yükleme aktif - gruplar ilk istekte yüklenecek (/ready)")
+        else:
+            loaded_models = load_status['loadedGroups']
+            logger.info(f"📊 {len(loaded_models)} expert model hazır: {loaded_models} ({load_status['loadDurationMs']:.0f} ms)")
     
-
+    def _on_models_swapped(self, group_ids: List[int]) -> None:
+        """Drop results computed by the replaced model versions"""
+        for cache in (self.prediction_cache, self.multiplier_cache, self.risk_grid):
+            if cache is not None:
+                cache.clear()
+        logger.info(f"🧹 Model değişimi sonrası önbellekler temizlendi (gruplar: {group_ids})")
     
-    def predict_allergy_risk(self, request_data: Dict) -> Dict[str, Any]:
+    @serves_models
+    def predict_allergy_risk(self, request_data: Dict, personal_params: Optional[Dict[str, Any]] = None,
+                             snapshot: Optional[EnvironmentSnapshot] = None,
+                             fields: Optional[FrozenSet[str]] = None) -> Dict[str, Any]:
         """
         Main prediction method that processes API request and returns risk assessment
         
         Args:
             request_data: API request containing user classification from microservice and environmental data
+            personal_params: Already parsed personal params (profile session); parsed from userClassification if None
+            snapshot: Ingested environmental snapshot used instead of environmentalData (snapshotId)
+            fields: Response parts to build (see parse_response_fields); None builds the full response
             
         Returns:
             Dict containing risk prediction results
@@ -145,58 +269,368 @@ class AllerMindRiskPredictor:
             if not isinstance(allergy_group, int) or allergy_group < 1 or allergy_group > 5:
                 raise ValueError("groupId 1-5 arasında bir sayı olmalı")
             
-            # Environmental data is required for REST API
-            if not environmental_data:
-                raise ValueError("Çevresel veri (environmentalData) gerekli")
+            # Precomputed province/hour base predictions when the caller names its province
+            plaka = request_data.get('plaka')
+            grid_entry = self._lookup_risk_grid(plaka, request_data.get('hour')) if plaka is not None else None
+            
+            # Environmental data is required unless the risk grid already has this province/hour or a snapshot is given
+            if not environmental_data and grid_entry is None and snapshot is None:
+                raise ValueError("Çevresel veri (environmentalData) gerekli (risk grid'de bu il/saat için güncel kayıt yok)")
             
             logger.info(f"👤 Kullanıcı grubu: {allergy_group} - {user_classification.get('groupName', 'Unknown')}")
             logger.info(f"🏥 Mikroservisten gelen sınıflandırma: {user_classification.get('assignmentReason', 'No reason')}")
-            logger.info(f"🌡️ Çevresel veri alındı: {len(environmental_data)} parametre")
+            if grid_entry is not None:
+                logger.info(f"🗺️ Risk grid isabeti - il {plaka}, saat {grid_entry['hour'].isoformat()}")
+            elif snapshot is not None:
+                logger.info(f"🌡️ Çevresel snapshot kullanılıyor: {snapshot.snapshot_id}")
+            else:
+                logger.info(f"🌡️ Çevresel veri alındı: {len(environmental_data)} parametre")
             
-            # Use provided environmental data for prediction
+            # Use the grid entry or the provided environmental data for prediction
             prediction_result = self._predict_with_environmental_data(
                 user_classification=user_classification,
-                environmental_data=environmental_data
+                environmental_data=environmental_data,
+                grid_entry=grid_entry,
+                personal_params=personal_params,
+                snapshot=snapshot if grid_entry is None else None,
+                fields=fields
             )
             
             # Format response
-            response = self._format_prediction_response(prediction_result, user_classification)
+            started = time.perf_counter()
+            response = self._format_prediction_response(prediction_result, user_classification, fields)
+            if self.metrics is not None:
+                self.metrics.observe_stage('format_response', time.perf_counter() - started)
+            
+            if plaka is not None:
+                response['riskGrid'] = {
+                    'plaka': plaka,
+                    'hit': grid_entry is not None,
+                    'hour': grid_entry['hour'].isoformat() if grid_entry else None,
+                    'ageSeconds': round(grid_entry['age_seconds'], 1) if grid_entry else None
+                }
+                annotate_request(plaka=plaka, grid='hit' if grid_entry is not None else 'miss')
+            
+            if snapshot is not None:
+                response['environmentalSnapshot'] = {
+                    **snapshot.to_summary(),
+                    'used': grid_entry is None
+                }
+                annotate_request(snapshot=snapshot.snapshot_id)
             
-            logger.info(f"✅ Tahmin tamamlandı - Risk: {response['riskScore']:.3f}")
+            logger.info(f"✅ Tahmin tamamlandı - Risk: {prediction_result.risk_score:.3f}")
+            annotate_request(group=allergy_group, risk=f"{prediction_result.risk_score:.3f}")
             return response
             
         except Exception as e:
-            logger.error(f"❌ Risk tahmini hatası: {e}")
-            logger.error(traceback.format_exc())
+            logger.error(f"❌ Risk tahmini hatası: {e}", exc_info=True)
             raise
     
-    def _format_prediction_response(self, prediction_result: ExpertPredictionResult, user_classification: Dict[str, Any]) -> Dict[str, Any]:
-        """Format prediction result for API response"""
-        try:
-            return {
+    @serves_models
+    def predict_allergy_risk_batch(self, request_items: List[Dict[str, Any]],
+                                   fields: Optional[FrozenSet[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Batch prediction for many {userClassification, environmentalData} pairs
+        
+        Valid items are converted into one feature matrix per group and scored with a
+        single vectorized model call per group. Invalid items get a per-item error.
+        
+        Args:
+            request_items: List of single prediction request bodies
+            fields: Response parts to build for every item; None builds full responses
+            
+        Returns:
+            List of per-item responses in request order
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(request_items)
+        prepared = []
+        
+        for index, item in enumerate(request_items):
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError("Batch öğesi bir JSON nesnesi olmalı")
+                
+                validation_error = validate_prediction_request(item, allow_risk_grid=False, allow_snapshot=False)
+                if validation_error:
+                    raise ValueError(validation_error['error'])
+                
+                user_classification = item['userClassification']
+                expert_env = self._convert_to_expert_environmental_data(item['environmentalData'])
+                # One non-finite row would make the vectorized group call reject the whole batch
+                non_finite = [name for name, value in expert_env.items() if not np.isfinite(value)]
+                if non_finite:
+                    raise ValueError(f"Sonlu olmayan çevresel değer (NaN/inf): {', '.join(non_finite)}")
+                
+                prepared.append((
+                    index,
+                    user_classification,
+                    self._resolve_group_id(user_classification),
+                    expert_env,
+                    self._convert_to_personal_params(user_classification)
+                ))
+            except Exception as e:
+                results[index] = {
+                    'success': False,
+                    'index': index,
+                    'error': str(e)
+                }
+        
+        if prepared:
+            fused_results = self.predictor.predict_fused_batch(
+                [expert_env for _, _, _, expert_env, _ in prepared],
+                [group_id for _, _, group_id, _, _ in prepared],
+                [personal_params for _, _, _, _, personal_params in prepared]
+            )
+            
+            for (index, user_classification, group_id, expert_env, _), fused_result in zip(prepared, fused_results):
+                try:
+                    prediction_result = self._build_prediction_result(group_id, fused_result, expert_env, user_classification, fields)
+                    response = self._format_prediction_response(prediction_result, user_classification, fields)
+                    response['index'] = index
+                    results[index] = response
+                except Exception as e:
+                    results[index] = {
+                        'success': False,
+                        'index': index,
+                        'error': str(e)
+                    }
+        
+        logger.info(f"✅ Batch tahmin tamamlandı - {len(prepared)}/{len(request_items)} geçerli öğe")
+        annotate_request(items=len(request_items), valid=len(prepared))
+        return results
+    
+    @serves_models
+    def predict_allergy_risk_fanout(self, environmental_data: Optional[Dict[str, Any]],
+                                    user_classifications: List[Dict[str, Any]],
+                                    plaka: Optional[int] = None, hour: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Risk for many users under one environment (e.g. push notifications for a province)
+        
+        Base predictions are computed once per group - or taken from the risk grid when
+        "plaka" has a fresh entry - and personalized for all users with array operations.
+        Invalid users get a per-user error; results are compact and in request order.
+        
+        Args:
+            environmental_data: Shared environmentalData (optional on a risk grid hit)
+            user_classifications: userClassification objects from the user service
+            plaka/hour: Province and hour for the risk grid lookup
+            
+        Returns:
+            Dict with per-user results and environment/summary info
+        """
+        grid_entry = self._lookup_risk_grid(plaka, hour) if plaka is not None else None
+        if grid_entry is not None:
+            expert_environmental_data = grid_entry['environmental_data']
+            base_predictions = grid_entry['base_predictions']
+            missing_features = grid_entry['missing_features']
+        else:
+            if not environmental_data:
+                raise ValueError("Çevresel veri (environmentalData) gerekli (risk grid'de bu il/saat için güncel kayıt yok)")
+            missing_env_sections = [section for section in REQUIRED_ENV_SECTIONS if section not in environmental_data]
+            if missing_env_sections:
+                raise ValueError(f"environmentalData içinde eksik bölümler: {', '.join(missing_env_sections)}")
+            expert_environmental_data = self._convert_to_expert_environmental_data(environmental_data)
+            base_predictions = missing_features = None
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(user_classifications)
+        prepared = []
+        for index, user_classification in enumerate(user_classifications):
+            try:
+                validation_error = validate_user_classification(user_classification)
+                if validation_error:
+                    raise ValueError(validation_error['error'])
+                prepared.append((
+                    index,
+                    user_classification,
+                    self._resolve_group_id(user_classification),
+                    self._convert_to_personal_params(user_classification)
+                ))
+            except Exception as e:
+                results[index] = {'success': False, 'index': index, 'error': str(e)}
+        
+        fanout = self.predictor.predict_fanout(
+            expert_environmental_data,
+            [group_id for _, _, group_id, _ in prepared],
+            [personal_params for _, _, _, personal_params in prepared],
+            base_predictions=base_predictions,
+            missing_features=missing_features
+        )
+        
+        for (index, user_classification, group_id, _), user in zip(prepared, fanout['users']):
+            if user is None:
+                results[index] = {'success': False, 'index': index, 'error': f"Grup {group_id} için tahmin yapılamadı"}
+                continue
+            
+            ensemble = user['ensemble']
+            results[index] = {
                 'success': True,
-                'timestamp': datetime.now().isoformat(),
-                'riskScore': float(prediction_result.risk_score),
-                'riskLevel': prediction_result.risk_level,
-                'confidence': float(prediction_result.confidence),
-                'userGroup': {
+                'index': index,
+                'userPreferenceId': user_classification.get('userPreferenceId'),
+                'groupId': group_id,
+                'riskScore': user['risk_score'],
+                'riskLevel': user['risk_level'],
+                'safeHours': user['personal_safe_hours'],
+                'baseSafeHours': user['base_safe_hours'],
+                'personalMultiplier': user['personal_multiplier'],
+                'confidence': ensemble['confidence'] if ensemble else 0.0,
+                'ensemble': {
+                    'riskScore': ensemble['risk_score'],
+                    'riskLevel': ensemble['risk_level'],
+                    'safeHours': ensemble['safe_outdoor_hours']
+                } if ensemble else None
+            }
+        
+        successful = sum(1 for result in results if result['success'])
+        logger.info(f"✅ Fan-out tahmin tamamlandı - {successful}/{len(user_classifications)} kullanıcı, {fanout['unique_profiles']} farklı profil")
+        annotate_request(users=len(user_classifications), ok=successful, profiles=fanout['unique_profiles'])
+        
+        return {
+            'environment': {
+                'source': 'riskGrid' if grid_entry is not None else 'request',
+                'plaka': plaka,
+                'hour': grid_entry['hour'].isoformat() if grid_entry else None,
+                'ageSeconds': round(grid_entry['age_seconds'], 1) if grid_entry else None,
+                'baseSafeHours': {str(group_id): hours for group_id, hours in fanout['base_safe_hours'].items()},
+                'modelsUsed': fanout['models_used'],
+                'missingFeatures': fanout['missing_features']
+            },
+            'summary': {
+                'total': len(results),
+                'successful': successful,
+                'failed': len(results) - successful,
+                'uniqueProfiles': fanout['unique_profiles']
+            },
+            'results': results
+        }
+    
+    @serves_models
+    def predict_allergy_risk_forecast(self, user_classification: Dict[str, Any], forecast: List[Dict[str, Any]],
+                                      window_hours: int = 2, max_windows: int = 3) -> Dict[str, Any]:
+        """
+        Hourly risk curve for one user from hourly environmental data
+        
+        Each hour is scored with its own hour / day_of_week features (is_peak_pollen_hour,
+        is_weekend); every group model runs once over all hours.
+        
+        Args:
+            user_classification: userClassification from the user service
+            forecast: [{"time": ISO 8601, "environmentalData": {...}}, ...] in ascending time order
+            window_hours: Length of the outdoor windows to search for
+            max_windows: Number of non-overlapping best windows to return
+            
+        Returns:
+            Dict with the per-hour curve, best windows and a summary
+        """
+        validation_error = validate_user_classification(user_classification)
+        if validation_error:
+            raise ValueError(validation_error['error'])
+        if not isinstance(window_hours, int) or not 1 <= window_hours <= len(forecast):
+            raise ValueError(f"windowHours 1-{len(forecast)} arasında bir tamsayı olmalı")
+        if not isinstance(max_windows, int) or max_windows < 1:
+            raise ValueError("maxWindows pozitif bir tamsayı olmalı")
+        
+        times = []
+        environments = []
+        for index, item in enumerate(forecast):
+            if not isinstance(item, dict):
+                raise ValueError(f"forecast[{index}] bir JSON nesnesi olmalı")
+            times.append(parse_forecast_time(item.get('time'), index))
+            
+            environmental_data = item.get('environmentalData') or {}
+            missing_env_sections = [section for section in REQUIRED_ENV_SECTIONS if section not in environmental_data]
+            if missing_env_sections:
+                raise ValueError(f"forecast[{index}].environmentalData içinde eksik bölümler: {', '.join(missing_env_sections)}")
+            environments.append(self._convert_to_expert_environmental_data(environmental_data))
+        
+        try:
+            if any(later <= earlier for earlier, later in zip(times, times[1:])):
+                raise ValueError("forecast zamanları artan sırada ve tekil olmalı")
+        except TypeError:
+            raise ValueError("forecast zamanlarının tümü aynı biçimde olmalı (hepsi saat dilimli veya hiçbiri)")
+        
+        group_id = self._resolve_group_id(user_classification)
+        personal_params = self._convert_to_personal_params(user_classification)
+        
+        # Zaman özellikleri zaman damgasının kendi (yerel) saatinden
+        time_features = [(moment.hour, moment.weekday()) for moment in times]
+        curve = self.predictor.predict_forecast(environments, time_features, group_id, personal_params)
+        if curve is None:
+            raise Exception(f"Grup {group_id} için tahmin yapılamadı")
+        
+        risk_scores = curve['risk_scores']
+        ensemble_risks = curve['ensemble_risk_scores']
+        hours = []
+        for index, moment in enumerate(times):
+            risk_score = float(risk_scores[index])
+            hour_result = {
+                'time': moment.isoformat(),
+                'hour': moment.hour,
+                'dayOfWeek': moment.weekday(),
+                'isPeakPollenHour': 6 <= moment.hour <= 10,
+                'isWeekend': moment.weekday() >= 5,
+                'riskScore': risk_score,
+                'riskLevel': risk_level_label(risk_score),
+                'safeHours': float(curve['personal_safe_hours'][index]),
+                'baseSafeHours': float(curve['base_safe_hours'][index]),
+                'ensembleRiskScore': float(ensemble_risks[index]) if ensemble_risks is not None else None
+            }
+            if curve['missing_features'][index]:
+                hour_result['missingFeatures'] = curve['missing_features'][index]
+            hours.append(hour_result)
+        
+        logger.info(f"✅ Saatlik tahmin tamamlandı - {len(hours)} saat, grup {group_id}")
+        annotate_request(group=group_id, hours=len(hours))
+        
+        return {
+            'userGroup': {
+                'groupId': group_id,
+                'groupName': self.predictor.models[group_id]['group_info']['name']
+            },
+            'personalMultiplier': curve['personal_multiplier'],
+            'modelsUsed': curve['models_used'],
+            'hours': hours,
+            'bestWindows': find_best_windows(times, risk_scores, window_hours, max_windows),
+            'summary': {
+                'hours': len(hours),
+                'minRiskScore': float(risk_scores.min()),
+                'maxRiskScore': float(risk_scores.max()),
+                'meanRiskScore': float(risk_scores.mean()),
+                'lowRiskHours': int((risk_scores < 0.3).sum())
+            }
+        }
+    
+    def _format_prediction_response(self, prediction_result: ExpertPredictionResult, user_classification: Dict[str, Any],
+                                    fields: Optional[FrozenSet[str]] = None) -> Dict[str, Any]:
+        """Format prediction result for API response (only the selected parts when fields is given)"""
+        try:
+            # Parts are built only when selected (all of them without fields), in RESPONSE_FIELDS order
+            part_builders = {
+                'riskScore': lambda: float(prediction_result.risk_score),
+                'riskLevel': lambda: prediction_result.risk_level,
+                'confidence': lambda: float(prediction_result.confidence),
+                'userGroup': lambda: {
                     'groupId': prediction_result.group_id,
                     'groupName': prediction_result.group_name,
                     'description': user_classification.get('groupDescription', f'Group {prediction_result.group_id} characteristics'),
                     'assignmentReason': user_classification.get('assignmentReason', 'Microservice classification'),
                     'modelWeight': user_classification.get('modelWeight', 1.0)
                 },
-                'contributingFactors': prediction_result.contributing_factors,
-                'recommendations': prediction_result.recommendations,
-                'environmentalRisks': prediction_result.environmental_risks,
-                'personalModifiers': prediction_result.personal_modifiers_applied,
-                'immunologicProfile': user_classification.get('immunologicProfile', {}),
-                'environmentalSensitivityFactors': user_classification.get('environmentalSensitivityFactors', {}),
-                'pollenSpecificRisks': user_classification.get('pollenSpecificRisks', {}),
-                'dataQualityScore': float(prediction_result.data_quality_score),
-                'modelVersion': prediction_result.model_version,
-                'predictionTimestamp': prediction_result.prediction_timestamp.isoformat()
+                'contributingFactors': lambda: prediction_result.contributing_factors,
+                'recommendations': lambda: prediction_result.recommendations,
+                'environmentalRisks': lambda: prediction_result.environmental_risks,
+                'personalModifiers': lambda: prediction_result.personal_modifiers_applied,
+                'immunologicProfile': lambda: user_classification.get('immunologicProfile', {}),
+                'environmentalSensitivityFactors': lambda: user_classification.get('environmentalSensitivityFactors', {}),
+                'pollenSpecificRisks': lambda: user_classification.get('pollenSpecificRisks', {}),
+                'dataQualityScore': lambda: float(prediction_result.data_quality_score),
+                'modelVersion': lambda: prediction_result.model_version,
+                'predictionTimestamp': lambda: prediction_result.prediction_timestamp.isoformat()
             }
+            response = {'success': True, 'timestamp': datetime.now().isoformat()}
+            for part in RESPONSE_FIELDS:
+                if fields is None or part in fields:
+                    response[part] = part_builders[part]()
+            return response
         except Exception as e:
             logger.error(f"❌ Response formatlanma hatası: {e}")
             return {
@@ -206,82 +640,261 @@ class AllerMindRiskPredictor:
             }
     
     def _predict_with_environmental_data(self, user_classification: Dict[str, Any], 
-                                       environmental_data: Dict[str, Any]) -> ExpertPredictionResult:
+                                       environmental_data: Dict[str, Any],
+                                       grid_entry: Optional[Dict[str, Any]] = None,
+                                       personal_params: Optional[Dict[str, Any]] = None,
+                                       snapshot: Optional[EnvironmentSnapshot] = None,
+                                       fields: Optional[FrozenSet[str]] = None) -> ExpertPredictionResult:
         """
         REST API için özel tahmin metodu - mikroservisten gelen kullanıcı sınıflandırması ve çevresel veri kullanır
         
         Args:
             user_classification: Mikroservisten gelen AllergyClassificationResponse
             environmental_data: REST request'ten gelen çevresel veri
+            grid_entry: Risk grid kaydı; verilirse modeller çalıştırılmaz, yalnızca kişisel multiplier uygulanır
+            personal_params: Profil oturumundan gelen hazır personal parameters; None ise yeniden hesaplanır
+            snapshot: Çevresel snapshot; verilirse dönüşüm ve feature engineering atlanır
+            fields: İstenen response bölümleri; seçilmeyenler hesaplanmaz (None = hepsi)
             
         Returns:
             PredictionResult: Tahmin sonucu
         """
         try:
             # 1. Grup bilgisini user classification'dan al
-            group_id = user_classification.get('groupId')
-            
-            logger.info(f"👤 Kullanıcı Grup {group_id} - Mikroservisten alındı")
+            logger.info(f"👤 Kullanıcı Grup {user_classification.get('groupId')} - Mikroservisten alındı")
             
             # 2. Model kontrolü
-            if group_id not in self.predictor.models:
-                logger.warning(f"⚠️ Grup {group_id} için model bulunamadı, fallback kullanılıyor")
-                group_id = 4  # Varsayılan grup
+            group_id = self._resolve_group_id(user_classification)
             
-            # 3. Environmental data'yı Expert Predictor formatına dönüştür
-            expert_environmental_data = self._convert_to_expert_environmental_data(environmental_data)
+            # 3. Environmental data'yı Expert Predictor formatına dönüştür (grid kaydı ve snapshot zaten dönüştürülmüş)
+            if grid_entry is not None:
+                expert_environmental_data = grid_entry['environmental_data']
+            elif snapshot is not None:
+                expert_environmental_data = snapshot.environmental_data
+            else:
+                started = time.perf_counter()
+                expert_environmental_data = self._convert_to_expert_environmental_data(environmental_data)
+                if self.metrics is not None:
+                    self.metrics.observe_stage('convert_environment', time.perf_counter() - started)
             
-            # 4. User classification'dan personal parameters oluştur
-            personal_params = self._convert_to_personal_params(user_classification)
+            # 4. User classification'dan personal parameters oluştur (profil oturumunda zaten hazır)
+            if personal_params is None:
+                started = time.perf_counter()
+                personal_params = self._convert_to_personal_params(user_classification)
+                if self.metrics is not None:
+                    self.metrics.observe_stage('convert_personal_params', time.perf_counter() - started)
+                logger.info(f"🔧 Personal parameters hazırlandı")
+            else:
+                logger.info(f"🔧 Personal parameters profil oturumundan alındı")
             
             logger.info(f"📋 Expert model için grup {group_id} kullanılıyor")
-            logger.info(f"🔧 Personal parameters hazırlandı")
-            
-            # 5. Expert Predictor ile tahmin yap
-            group_result = self.predictor.predict_group(
-                expert_environmental_data, 
-                group_id, 
-                personal_params
-            )
-            
-            if not group_result:
-                raise Exception(f"Grup {group_id} için tahmin yapılamadı")
             
-            # 6. Ensemble tahmin de yap (güven için)
-            ensemble_result = self.predictor.predict_ensemble(
-                expert_environmental_data,
-                personal_params
-            )
+            # 5. Expert Predictor ile tek geçişte grup + ensemble tahmini yap
+            # (ensemble yalnızca confidence için gerekli; istenmezse diğer grup modelleri çalışmaz)
+            include_ensemble = fields is None or 'confidence' in fields
+            if grid_entry is not None:
+                fused_result = self.predictor.predict_fused_from_base(
+                    expert_environmental_data,
+                    group_id,
+                    grid_entry['base_predictions'],
+                    grid_entry['missing_features'],
+                    personal_params,
+                    include_ensemble=include_ensemble
+                )
+            else:
+                fused_result = self.predictor.predict_fused(
+                    expert_environmental_data,
+                    group_id,
+                    personal_params,
+                    prepared_features=snapshot.prepared_features if snapshot is not None else None,
+                    include_ensemble=include_ensemble
+                )
             
-            # 7. Risk faktörlerini çıkar
-            contributing_factors = self._extract_contributing_factors(expert_environmental_data, user_classification)
-            environmental_risks = self._extract_environmental_risks(expert_environmental_data)
-            recommendations = self._generate_recommendations(group_result, user_classification)
+            started = time.perf_counter()
+            prediction_result = self._build_prediction_result(group_id, fused_result, expert_environmental_data, user_classification, fields)
+            if self.metrics is not None:
+                self.metrics.observe_stage('build_result', time.perf_counter() - started)
             
-            # 8. Expert sonucunu ExpertPredictionResult formatına dönüştür
-            return ExpertPredictionResult(
-                risk_score=float(group_result['risk_score']),
-                confidence=float(ensemble_result['ensemble_prediction']['confidence']),
-                risk_level=group_result['risk_level'],
-                group_id=group_id,
-                group_name=group_result['group_name'],
-                contributing_factors=contributing_factors,
-                recommendations=recommendations,
-                environmental_risks=environmental_risks,
-                personal_modifiers_applied={
-                    'personal_multiplier': group_result['personal_multiplier'],
-                    'base_safe_hours': group_result['base_safe_hours'],
-                    'personal_safe_hours': group_result['personal_safe_hours']
-                },
-                prediction_timestamp=datetime.now(),
-                data_quality_score=1.0,
-                model_version="Expert-v2.0"
-            )
+            return prediction_result
             
         except Exception as e:
             logger.error(f"❌ Expert predictor ile tahmin hatası: {e}")
             raise
     
+    def _lookup_risk_grid(self, plaka: int, hour: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Fresh risk grid entry for the province/hour, or None (grid disabled, miss or stale)"""
+        validate_plaka(plaka)
+        if self.risk_grid is None:
+            return None
+        
+        grid_entry = self.risk_grid.lookup(plaka, hour)
+        if grid_entry is None:
+            logger.info(f"🗺️ Risk grid'de il {plaka} için güncel kayıt yok - canlı tahmin")
+        return grid_entry
+    
+    @serves_models
+    def ingest_risk_grid(self, hour: Optional[str], cities: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Load one hourly environmental snapshot for many provinces into the risk grid
+        
+        Args:
+            hour: ISO 8601 hour the snapshot describes (None = current hour)
+            cities: [{"plaka": 34, "environmentalData": {...}}, ...]
+            
+        Returns:
+            Ingest summary (hour, city count, groups, compute duration)
+        """
+        if self.risk_grid is None:
+            raise ValueError("Risk grid devre dışı (RISK_GRID_ENABLED=false)")
+        
+        city_environments = {}
+        for city in cities:
+            if not isinstance(city, dict):
+                raise ValueError("cities öğeleri JSON nesnesi olmalı")
+            plaka = validate_plaka(city.get('plaka'))
+            if plaka in city_environments:
+                raise ValueError(f"plaka {plaka} birden fazla kez gönderildi")
+            
+            environmental_data = city.get('environmentalData') or {}
+            missing_env_sections = [section for section in REQUIRED_ENV_SECTIONS if section not in environmental_data]
+            if missing_env_sections:
+                raise ValueError(f"plaka {plaka} environmentalData içinde eksik bölümler: {', '.join(missing_env_sections)}")
+            
+            city_environments[plaka] = self._convert_to_expert_environmental_data(environmental_data)
+        
+        started = time.perf_counter()
+        summary = self.risk_grid.ingest(hour, city_environments)
+        if self.metrics is not None:
+            self.metrics.observe_stage('risk_grid_ingest', time.perf_counter() - started)
+        
+        logger.info(f"🗺️ Risk grid güncellendi - saat {summary['hour']}, {summary['cities']} il, {summary['durationMs']:.1f} ms")
+        return summary
+    
+    def register_profile_session(self, user_classification: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Parse a userClassification once and keep it under its userPreferenceId
+        
+        Returns:
+            Registration summary (id, group, expiry)
+        """
+        if self.profile_sessions is None:
+            raise ValueError("Profil oturumları devre dışı (PROFILE_SESSIONS_ENABLED=false)")
+        
+        started = time.perf_counter()
+        session = self.profile_sessions.register(user_classification)
+        if self.metrics is not None:
+            self.metrics.observe_stage('profile_session_register', time.perf_counter() - started)
+        
+        logger.info(f"🪪 Profil oturumu kaydedildi - {session.user_preference_id}, grup {user_classification.get('groupId')}")
+        return {
+            'userPreferenceId': session.user_preference_id,
+            'groupId': user_classification.get('groupId'),
+            'registeredAt': datetime.fromtimestamp(session.registered_at).isoformat(),
+            'expiresAt': datetime.fromtimestamp(session.expires_at).isoformat(),
+            'ttlSeconds': self.profile_sessions.ttl_seconds
+        }
+    
+    def get_profile_session(self, user_preference_id: Any):
+        """Registered profile session; raises ProfileSessionNotFound (unknown/expired) or ValueError"""
+        if self.profile_sessions is None:
+            raise ValueError("Profil oturumları devre dışı (PROFILE_SESSIONS_ENABLED=false) - userClassification gönderin")
+        if not isinstance(user_preference_id, str):
+            raise ValueError("userPreferenceId metin olmalı")
+        return self.profile_sessions.get(user_preference_id)
+    
+    def ingest_env_snapshots(self, snapshots: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Convert and feature-engineer environmental snapshots once for later snapshotId predictions
+        
+        Args:
+            snapshots: [{"environmentalData": {...}, "plaka": 34, "hour": "..."}, ...] (plaka/hour optional)
+            
+        Returns:
+            Per-snapshot summaries (snapshotId, expiry) in request order
+        """
+        if self.env_snapshots is None:
+            raise ValueError("Çevresel snapshot'lar devre dışı (ENV_SNAPSHOTS_ENABLED=false)")
+        
+        for index, item in enumerate(snapshots):
+            if not isinstance(item, dict):
+                raise ValueError(f"snapshots[{index}] bir JSON nesnesi olmalı")
+            environmental_data = item.get('environmentalData')
+            if not isinstance(environmental_data, dict):
+                raise ValueError(f"snapshots[{index}].environmentalData gerekli")
+            missing_env_sections = [section for section in REQUIRED_ENV_SECTIONS if section not in environmental_data]
+            if missing_env_sections:
+                raise ValueError(f"snapshots[{index}].environmentalData içinde eksik bölümler: {', '.join(missing_env_sections)}")
+        
+        started = time.perf_counter()
+        ingested = [
+            self.env_snapshots.ingest(item['environmentalData'], item.get('plaka'), item.get('hour')).to_summary()
+            for item in snapshots
+        ]
+        if self.metrics is not None:
+            self.metrics.observe_stage('env_snapshot_ingest', time.perf_counter() - started)
+        
+        logger.info(f"🌡️ {len(ingested)} çevresel snapshot kaydedildi")
+        return ingested
+    
+    def get_env_snapshot(self, snapshot_id: Any) -> EnvironmentSnapshot:
+        """Ingested snapshot; raises SnapshotNotFound (unknown/expired/evicted) or ValueError"""
+        if self.env_snapshots is None:
+            raise ValueError("Çevresel snapshot'lar devre dışı (ENV_SNAPSHOTS_ENABLED=false) - environmentalData gönderin")
+        return self.env_snapshots.get(validate_snapshot_id(snapshot_id))
+    
+    def _resolve_group_id(self, user_classification: Dict[str, Any]) -> int:
+        """Kullanıcı grubunu al, model yüklü değilse varsayılan gruba düş"""
+        group_id = user_classification.get('groupId')
+        
+        if group_id not in self.predictor.ensure_groups_loaded():
+            logger.warning(f"⚠️ Grup {group_id} için model bulunamadı, fallback kullanılıyor")
+            group_id = 4  # Varsayılan grup
+        
+        return group_id
+    
+    def _build_prediction_result(self, group_id: int, fused_result: Dict[str, Any],
+                                 expert_environmental_data: Dict[str, Any],
+                                 user_classification: Dict[str, Any],
+                                 fields: Optional[FrozenSet[str]] = None) -> ExpertPredictionResult:
+        """Fused tahmin sonucundan ExpertPredictionResult oluştur (fields verilirse seçilmeyen bölümler None kalır)"""
+        group_result = fused_result['group_prediction']
+        
+        if not group_result:
+            raise Exception(f"Grup {group_id} için tahmin yapılamadı")
+        
+        # Ensemble güveni aynı geçişten (güvenilir model yoksa 0)
+        ensemble_result = fused_result['ensemble']
+        ensemble_confidence = ensemble_result['ensemble_prediction']['confidence'] if ensemble_result else 0.0
+        
+        # Risk faktörlerini çıkar (yalnızca response'ta istenenler)
+        contributing_factors = environmental_risks = recommendations = None
+        if fields is None or 'contributingFactors' in fields:
+            contributing_factors = self._extract_contributing_factors(expert_environmental_data, user_classification)
+        if fields is None or 'environmentalRisks' in fields:
+            environmental_risks = self._extract_environmental_risks(expert_environmental_data)
+        if fields is None or 'recommendations' in fields:
+            recommendations = self._generate_recommendations(group_result, user_classification)
+        
+        # Expert sonucunu ExpertPredictionResult formatına dönüştür
+        return ExpertPredictionResult(
+            risk_score=float(group_result['risk_score']),
+            confidence=float(ensemble_confidence),
+            risk_level=group_result['risk_level'],
+            group_id=group_id,
+            group_name=group_result['group_name'],
+            contributing_factors=contributing_factors,
+            recommendations=recommendations,
+            environmental_risks=environmental_risks,
+            personal_modifiers_applied={
+                'personal_multiplier': group_result['personal_multiplier'],
+                'base_safe_hours': group_result['base_safe_hours'],
+                'personal_safe_hours': group_result['personal_safe_hours']
+            },
+            prediction_timestamp=datetime.now(),
+            data_quality_score=1.0,
+            model_version="Expert-v2.0"
+        )
+    
     def _convert_to_expert_environmental_data(self, environmental_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         REST API'den gelen environmental data'yı Expert Predictor formatına çevir
@@ -602,7 +1215,18 @@ class AllerMindRiskPredictor:
                 'components': {
                     'expertPredictor': True,
                     'modelGroups': len(self.model_groups)
-                }
+                },
+                'microBatching': self.micro_batcher.get_stats() if self.micro_batcher else {'enabled': False},
+                'predictionCache': self.prediction_cache.get_stats() if self.prediction_cache else {'enabled': False},
+                'multiplierCache': self.multiplier_cache.get_stats() if self.multiplier_cache else {'enabled': False},
+                'riskGrid': self.risk_grid.get_stats() if self.risk_grid else {'enabled': False},
+                'modelRegistry': self.model_registry.get_status() if self.model_registry else {'enabled': False},
+                'threadPolicy': self.thread_policy.get_status(self.predictor) if self.thread_policy else {'enabled': False},
+                'requestLogging': request_log.get_stats() if request_log else {'enabled': False},
+                'singleflight': prediction_singleflight.get_stats() if prediction_singleflight else {'enabled': False},
+                'profileSessions': self.profile_sessions.get_stats() if self.profile_sessions else {'enabled': False},
+                'envSnapshots': self.env_snapshots.get_stats() if self.env_snapshots else {'enabled': False},
+                'responseCompression': response_compressor.get_stats() if response_compressor else {'enabled': False}
             }
         except Exception as e:
             logger.error(f"❌ Sistem bilgisi alınırken hata: {e}")
@@ -626,8 +1250,246 @@ def initialize_predictor():
         logger.error(f"❌ Predictor başlatma hatası: {e}")
         return False
 
+REQUIRED_ENV_SECTIONS = ['airQuality', 'pollen', 'weather']
+
+# Request fields a /api/v1/predict response depends on (singleflight key; the selected response fields are added)
+DEDUP_REQUEST_FIELDS = ('userClassification', 'environmentalData', 'snapshotId', 'plaka', 'hour')
+
+# Top-level prediction response parts that fields= can select ("success" and "timestamp" are always sent)
+RESPONSE_FIELDS = (
+    'riskScore', 'riskLevel', 'confidence', 'userGroup', 'contributingFactors', 'recommendations',
+    'environmentalRisks', 'personalModifiers', 'immunologicProfile', 'environmentalSensitivityFactors',
+    'pollenSpecificRisks', 'dataQualityScore', 'modelVersion', 'predictionTimestamp'
+)
+
+# Named field sets usable in fields= (e.g. fields=compact or fields=compact,recommendations)
+RESPONSE_FIELD_PROFILES = {
+    'compact': ('riskScore', 'riskLevel', 'confidence', 'personalModifiers'),
+    'full': RESPONSE_FIELDS
+}
+
+def parse_response_fields(value: Any) -> Optional[FrozenSet[str]]:
+    """
+    fields= selector → response parts to build; None when not given (full response)
+    
+    Accepts a comma-separated string (query string) or a list of names (JSON body);
+    names are RESPONSE_FIELDS entries or RESPONSE_FIELD_PROFILES keys.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        names = [name.strip() for name in value.split(',') if name.strip()]
+    elif isinstance(value, list) and all(isinstance(name, str) for name in value):
+        names = value
+    else:
+        raise ValueError("fields virgülle ayrılmış bir metin veya metin listesi olmalı")
+    
+    fields = set()
+    for name in names:
+        if name in RESPONSE_FIELD_PROFILES:
+            fields.update(RESPONSE_FIELD_PROFILES[name])
+        elif name in RESPONSE_FIELDS:
+            fields.add(name)
+        else:
+            raise ValueError(
+                f"Bilinmeyen response alanı: {name} "
+                f"(geçerli: {', '.join(RESPONSE_FIELDS)}; profiller: {', '.join(RESPONSE_FIELD_PROFILES)})"
+            )
+    if not fields:
+        raise ValueError("fields en az bir alan içermeli")
+    return None if fields.issuperset(RESPONSE_FIELDS) else frozenset(fields)
+
+def request_response_fields(request_data: Any) -> Optional[FrozenSet[str]]:
+    """Response fields of the current request: ?fields=... wins over a "fields" body entry"""
+    if 'fields' in request.args:
+        return parse_response_fields(request.args['fields'])
+    if isinstance(request_data, dict):
+        return parse_response_fields(request_data.get('fields'))
+    return None
+
+def validate_user_classification(user_classification: Any) -> Optional[Dict[str, Any]]:
+    """Validate one userClassification; None if valid, otherwise error fields"""
+    if not isinstance(user_classification, dict):
+        return {'error': 'userClassification bir JSON nesnesi olmalı'}
+    
+    required_classification_fields = ['groupId', 'groupName']
+    missing_classification_fields = [field for field in required_classification_fields if field not in user_classification]
+    
+    if missing_classification_fields:
+        return {
+            'error': f'userClassification içinde eksik alanlar: {", ".join(missing_classification_fields)}',
+            'requiredFields': required_classification_fields
+        }
+    
+    # Validate group ID
+    group_id = user_classification.get('groupId')
+    if not isinstance(group_id, int) or group_id < 1 or group_id > 5:
+        return {
+            'error': 'userClassification.groupId 1-5 arasında bir sayı olmalı'
+        }
+    
+    return None
+
+def validate_prediction_request(request_data: Dict[str, Any], allow_risk_grid: bool = True,
+                                allow_snapshot: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Validate a single prediction request body
+    
+    With allow_risk_grid, a body carrying "plaka" may omit environmentalData; it is
+    then only needed if the risk grid has no fresh entry for that province/hour.
+    With allow_snapshot, "snapshotId" replaces environmentalData.
+    
+    Returns:
+        None if valid, otherwise error fields for the 400 response
+    """
+    # Validate required fields for REST API - userClassification from microservice
+    uses_risk_grid = allow_risk_grid and 'plaka' in request_data
+    uses_snapshot = allow_snapshot and 'snapshotId' in request_data and 'environmentalData' not in request_data
+    required_fields = ['userClassification'] if uses_risk_grid or uses_snapshot else ['userClassification', 'environmentalData']
+    missing_fields = [field for field in required_fields if field not in request_data]
+    
+    if missing_fields:
+        return {
+            'error': f'Eksik alanlar: {", ".join(missing_fields)}',
+            'requiredFields': required_fields
+        }
+    
+    # Validate user classification structure
+    classification_error = validate_user_classification(request_data.get('userClassification', {}))
+    if classification_error:
+        return classification_error
+    
+    if uses_risk_grid:
+        try:
+            validate_plaka(request_data['plaka'])
+        except ValueError as e:
+            return {'error': str(e)}
+        
+        if 'environmentalData' not in request_data and not uses_snapshot:
+            return None
+    
+    if uses_snapshot:
+        try:
+            validate_snapshot_id(request_data['snapshotId'])
+        except ValueError as e:
+            return {'error': str(e)}
+        return None
+    
+    # Validate environmental data structure
+    env_data = request_data.get('environmentalData', {})
+    missing_env_sections = [section for section in REQUIRED_ENV_SECTIONS if section not in env_data]
+    
+    if missing_env_sections:
+        return {
+            'error': f'environmentalData içinde eksik bölümler: {", ".join(missing_env_sections)}',
+            'requiredSections': REQUIRED_ENV_SECTIONS,
+            'providedSections': list(env_data.keys())
+        }
+    
+    return None
+
+def parse_forecast_time(value: Any, index: int) -> datetime:
+    """ISO 8601 forecast time; the wall-clock hour of the given offset is used as-is"""
+    if not isinstance(value, str):
+        raise ValueError(f"forecast[{index}].time gerekli (ISO 8601)")
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"forecast[{index}].time geçersiz: {value}")
+
+def find_best_windows(times: List[datetime], risk_scores: np.ndarray, window_hours: int, max_windows: int) -> List[Dict[str, Any]]:
+    """
+    Lowest mean-risk windows of window_hours consecutive hours, non-overlapping
+    
+    Windows never span a gap in the forecast. Greedy: best window first, then the
+    best one that does not overlap any already chosen.
+    """
+    one_hour = timedelta(hours=1)
+    # Per-window means (not a running sum) so equal windows compare equal
+    window_means = np.lib.stride_tricks.sliding_window_view(risk_scores, window_hours).mean(axis=1)
+    starts = [
+        start for start in range(len(times) - window_hours + 1)
+        if times[start + window_hours - 1] - times[start] == (window_hours - 1) * one_hour
+    ]
+    mean_risks = {start: float(window_means[start]) for start in starts}
+    
+    windows = []
+    taken = np.zeros(len(times), dtype=bool)
+    for start in sorted(starts, key=lambda start: (mean_risks[start], start)):
+        if len(windows) == max_windows:
+            break
+        if taken[start:start + window_hours].any():
+            continue
+        taken[start:start + window_hours] = True
+        
+        window_risks = risk_scores[start:start + window_hours]
+        windows.append({
+            'start': times[start].isoformat(),
+            'end': (times[start + window_hours - 1] + one_hour).isoformat(),
+            'hours': window_hours,
+            'meanRiskScore': float(mean_risks[start]),
+            'maxRiskScore': float(window_risks.max()),
+            'riskLevel': risk_level_label(float(window_risks.max()))
+        })
+    
+    return windows
+
+def request_outcome(status_code: int) -> str:
+    """Map an HTTP status code to the outcome label of allermind_requests_total"""
+    if status_code < 400:
+        return 'success'
+    if status_code == 503:
+        return 'unavailable'
+    if status_code < 500:
+        return 'client_error'
+    return 'error'
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if request_log is not None:
+        request_log.begin_request(request.url_rule.rule if request.url_rule is not None else 'unmatched')
+
+@app.after_request
+def record_request_metrics(response):
+    started = getattr(g, 'request_started', None)
+    duration = time.perf_counter() - started if started is not None else None
+    if service_metrics is not None and duration is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        service_metrics.observe_request(route, request_outcome(response.status_code), duration)
+    if request_log is not None:
+        request_log.end_request(request.method, response.status_code, duration)
+    return response
+
+@app.after_request
+def compress_response(response):
+    # Registered after record_request_metrics, so it runs first and the request duration includes compression
+    if response_compressor is not None:
+        started = time.perf_counter()
+        response = response_compressor.compress(response, request.accept_encodings['gzip'] > 0)
+        if service_metrics is not None and response.headers.get('Content-Encoding') == 'gzip':
+            service_metrics.observe_stage('gzip', time.perf_counter() - started)
+    return response
+
+@app.teardown_request
+def clear_request_log_state(error=None):
+    if request_log is not None:
+        request_log.finish_request()
+
 # API Endpoints
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text format metrics"""
+    if service_metrics is None:
+        return jsonify({
+            'success': False,
+            'error': 'Metrics devre dışı (METRICS_ENABLED=false)',
+            'timestamp': datetime.now().isoformat()
+        }), 404
+    
+    return Response(service_metrics.render_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -652,6 +1514,31 @@ def health_check():
             "timestamp": datetime.now().isoformat()
         }), 500
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint - per-group model load state and duration (503 until servable)"""
+    try:
+        if risk_predictor is None:
+            return jsonify({
+                "ready": False,
+                "error": "Predictor not initialized",
+                "service": "AllerMind Risk Prediction API",
+                "timestamp": datetime.now().isoformat()
+            }), 503
+        
+        load_status = risk_predictor.predictor.get_load_status()
+        load_status['timestamp'] = datetime.now().isoformat()
+        return jsonify(load_status), 200 if load_status['ready'] else 503
+        
+    except Exception as e:
+        logger.error(f"❌ Readiness check hatası: {e}")
+        return jsonify({
+            "ready": False,
+            "error": str(e),
+            "service": "AllerMind Risk Prediction API",
+            "timestamp": datetime.now().isoformat()
+        }), 500
+
 @app.route('/api/v1/allergy-groups', methods=['GET'])
 def get_allergy_groups():
     """Get available expert model groups"""
@@ -823,6 +1710,23 @@ def predict_allergy_risk():
             }
         }
     }
+    
+    After registering the profile with POST /api/v1/profiles, "userClassification" can be
+    replaced by "userPreferenceId": "8eb0d4c6-..."; the parsed profile is reused. An unknown or
+    expired id returns 404 with "reason" so the client can register again.
+    
+    Likewise, after POST /api/v1/snapshots "environmentalData" can be replaced by
+    "snapshotId": "34-2026101714"; the converted, feature-engineered snapshot is reused.
+    An unknown, expired or evicted snapshotId returns 404 with "reason".
+    
+    ?fields=riskScore,recommendations (or "fields": [...] in the body) returns only those
+    parts plus "success"/"timestamp"; unselected parts are not computed, and without
+    "confidence" the ensemble and the other groups' models are skipped. fields=compact
+    selects riskScore, riskLevel, confidence and personalModifiers.
+    
+    When PROFILE_TOKEN is configured, a request with the header "X-Profile-Token: <token>"
+    runs under cProfile and the response carries a "profile" report. The token is only
+    read from the header, never from the query string (which reaches the access log).
     """
     try:
         if risk_predictor is None:
@@ -832,7 +1736,10 @@ def predict_allergy_risk():
                 'timestamp': datetime.now().isoformat()
             }), 503
         
+        started = time.perf_counter()
         request_data = request.get_json()
+        if service_metrics is not None:
+            service_metrics.observe_stage('parse_json', time.perf_counter() - started)
         
         if not request_data:
             return jsonify({
@@ -841,58 +1748,60 @@ def predict_allergy_risk():
                 'timestamp': datetime.now().isoformat()
             }), 400
         
-        # Validate required fields for REST API - userClassification from microservice
-        required_fields = ['userClassification', 'environmentalData']
-        missing_fields = [field for field in required_fields if field not in request_data]
+        # A registered profile can be referenced by "userPreferenceId" instead of sending userClassification
+        personal_params = None
+        if 'userClassification' not in request_data and 'userPreferenceId' in request_data:
+            session = risk_predictor.get_profile_session(request_data['userPreferenceId'])
+            request_data = {**request_data, 'userClassification': session.user_classification}
+            personal_params = session.personal_params
         
-        if missing_fields:
+        validation_error = validate_prediction_request(request_data)
+        if validation_error:
             return jsonify({
                 'success': False,
-                'error': f'Eksik alanlar: {", ".join(missing_fields)}',
-                'requiredFields': required_fields,
+                **validation_error,
                 'timestamp': datetime.now().isoformat()
             }), 400
         
-        # Validate user classification structure
-        user_classification = request_data.get('userClassification', {})
-        required_classification_fields = ['groupId', 'groupName']
-        missing_classification_fields = [field for field in required_classification_fields if field not in user_classification]
+        # Only the selected response parts are computed (?fields=... or "fields")
+        fields = request_response_fields(request_data)
         
-        if missing_classification_fields:
-            return jsonify({
-                'success': False,
-                'error': f'userClassification içinde eksik alanlar: {", ".join(missing_classification_fields)}',
-                'requiredFields': required_classification_fields,
-                'timestamp': datetime.now().isoformat()
-            }), 400
+        # An ingested snapshot can be referenced by "snapshotId" instead of sending environmentalData
+        snapshot = None
+        if 'environmentalData' not in request_data and 'snapshotId' in request_data:
+            snapshot = risk_predictor.get_env_snapshot(request_data['snapshotId'])
         
-        # Validate group ID
-        group_id = user_classification.get('groupId')
-        if not isinstance(group_id, int) or group_id < 1 or group_id > 5:
-            return jsonify({
-                'success': False,
-                'error': 'userClassification.groupId 1-5 arasında bir sayı olmalı',
-                'timestamp': datetime.now().isoformat()
-            }), 400
+        # Perform prediction (profiled only when the caller sends the PROFILE_TOKEN in X-Profile-Token)
+        if request_profiler is not None and request_profiler.is_requested(request.headers):
+            prediction_response, profile_report = request_profiler.run(
+                risk_predictor.predict_allergy_risk, request_data, personal_params, snapshot, fields
+            )
+            prediction_response['profile'] = profile_report
+        elif prediction_singleflight is not None:
+            dedup_key = SingleFlight.make_key({
+                **{field: request_data.get(field) for field in DEDUP_REQUEST_FIELDS},
+                'fields': sorted(fields) if fields is not None else None
+            })
+            prediction_response, shared = prediction_singleflight.do(
+                dedup_key, lambda: risk_predictor.predict_allergy_risk(request_data, personal_params, snapshot, fields)
+            )
+            if shared:
+                annotate_request(dedup='coalesced')
+        else:
+            prediction_response = risk_predictor.predict_allergy_risk(request_data, personal_params, snapshot, fields)
         
-        # Validate environmental data structure
-        env_data = request_data.get('environmentalData', {})
-        required_env_sections = ['airQuality', 'pollen', 'weather']
-        missing_env_sections = [section for section in required_env_sections if section not in env_data]
+        started = time.perf_counter()
+        response = jsonify(prediction_response)
+        if service_metrics is not None:
+            service_metrics.observe_stage('jsonify', time.perf_counter() - started)
         
-        if missing_env_sections:
-            return jsonify({
-                'success': False,
-                'error': f'environmentalData içinde eksik bölümler: {", ".join(missing_env_sections)}',
-                'requiredSections': required_env_sections,
-                'providedSections': list(env_data.keys()),
-                'timestamp': datetime.now().isoformat()
-            }), 400
+        return response, 200
         
-        # Perform prediction
-        prediction_response = risk_predictor.predict_allergy_risk(request_data)
+    except ProfileSessionNotFound as not_found:
+        return profile_session_not_found_response(not_found)
         
-        return jsonify(prediction_response), 200
+    except SnapshotNotFound as not_found:
+        return env_snapshot_not_found_response(not_found)
         
     except ValueError as ve:
         logger.error(f"❌ Validation hatası: {ve}")
@@ -910,6 +1819,677 @@ def predict_allergy_risk():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@app.route('/api/v1/predict/batch', methods=['POST'])
+def predict_allergy_risk_batch():
+    """
+    Batch prediction endpoint - one vectorized model call per group for all items
+    
+    Expected JSON format:
+    {
+        "requests": [
+            {"userClassification": {...}, "environmentalData": {...}},
+            ...
+        ]
+    }
+    
+    Each item has the same shape as the /api/v1/predict body. Results are returned
+    in request order with an "index" field; invalid items carry their own error.
+    ?fields=... (or a top-level "fields") shapes every item as in /api/v1/predict.
+    """
+    try:
+        if risk_predictor is None:
+            return jsonify({
+                'success': False,
+                'error': 'Sistem henüz hazır değil',
+                'timestamp': datetime.now().isoformat()
+            }), 503
+        
+        request_data = request.get_json()
+        batch_items = request_data.get('requests') if isinstance(request_data, dict) else None
+        
+        if not isinstance(batch_items, list) or not batch_items:
+            return jsonify({
+                'success': False,
+                'error': '"requests" dizisi gerekli ve boş olamaz',
+                'timestamp': datetime.now().isoformat()
+            }), 400
+        
+        max_items = int(os.environ.get('BATCH_MAX_ITEMS', 500))
+        if len(batch_items) > max_items:
+            return jsonify({
+                'success': False,
+                'error': f'Batch başına en fazla {max_items} öğe, alınan: {len(batch_items)}',
+                'timestamp': datetime.now().isoformat()
+            }), 400
+        
+        try:
+            fields = request_response_fields(request_data)
+        except ValueError as ve:
+            return jsonify({
+                'success': False,
+                'error': str(ve),
+                'timestamp': datetime.now().isoformat()
+            }), 400
+        
+        results = risk_predictor.predict_allergy_risk_batch(batch_items, fields)
+        successful = sum(1 for result in results if result.get('success'))
+        
+        return jsonify({
+            'success': True,
+            'summary': {
+                'total': len(results),
+                'successful': successful,
+                'failed': len(results) - successful
+            },
+            'results': results,
+            'timestamp': datetime.now().isoformat()
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"❌ Batch tahmin hatası: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'İç hata: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+@app.route('/api/v1/predict/fanout', methods=['POST'])
+def predict_allergy_risk_fanout():
+    """
+    Fan-out prediction endpoint - one environment, many users
+    
+    Expected JSON format:
+    {
+        "environmentalData": {...},
+        "plaka": 34,
+        "hour": "2026-05-14T08:00:00",
+        "users": [
+            {"groupId": 2, "groupName": "...", "userPreferenceId": "...", ...},
+            ...
+        ]
+    }
+    
+    "users" holds userClassification objects as in /api/v1/predict. environmentalData
+    may be omitted when "plaka" (and "hour") has a fresh risk grid entry. Every group
+    model runs at most once; each result carries riskScore, riskLevel and safeHours.
+    """
+    try:
+        if risk_predictor is None:
+            return jsonify({
+                'success': False,
+                'error': 'Sistem henüz hazır değil',
+                'timestamp': datetime.now().isoformat()
+            }), 503
+        
+        request_data = request.get_json()
+        users = request_data.get('users') if isinstance(request_data, dict) else None
+        
+        if not isinstance(users, list) or not users:
+            return jsonify({
+                'success': False,
+                'error': '"users" dizisi gerekli ve boş olamaz',
+                'timestamp': datetime.now().isoformat()
+            }), 400
+        
+        max_users = int(os.environ.get('FANOUT_MAX_USERS', 10000))
+        if len(users) > max_users:
+            return jsonify({
+                'success': False,
+                'error': f'İstek başına en fazla {max_users} kullanıcı, alınan: {len(users)}',
+                'timestamp': datetime.now().isoformat()
+            }), 400
+        
+        fanout = risk_predictor.predict_allergy_risk_fanout(
+            request_data.get('environmentalData'),
+            users,
+            plaka=request_data.get('plaka'),
+            hour=request_data.get('hour')
+        )
+        
+        return jsonify({
+            'success': True,
+            **fanout,
+            'timestamp': datetime.now().isoformat()
+        }), 200
+        
+    except ValueError as ve:
+        logger.error(f"❌ Fan-out validation hatası: {ve}")
+        return jsonify({
+            'success': False,
+            'error': str(ve),
+            'timestamp': datetime.now().isoformat()
+        }), 400
+        
+    except Exception as e:
+        logger.error(f"❌ Fan-out tahmin hatası: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'İç hata: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+@app.route('/api/v1/predict/forecast', methods=['POST'])
+def predict_allergy_risk_forecast():
+    """
+    Hourly forecast endpoint - risk curve and best outdoor windows for one user
+    
+    Expected JSON format:
+    {
+        "userClassification": {...},
+        "forecast": [
+            {"time": "2026-05-14T06:00:00+03:00", "environmentalData": {...}},
+            {"time": "2026-05-14T07:00:00+03:00", "environmentalData": {...}},
+            ...
+        ],
+        "windowHours": 2,
+        "maxWindows": 3
+    }
+    
+    userClassification and environmentalData have the same shape as in /api/v1/predict.
+    Times must be ascending; the hour and weekday are taken from each timestamp as
+    written. windowHours (default 2) and maxWindows (default 3) control bestWindows.
+    """
+    try:
+        if risk_predictor is None:
+            return jsonify({
+                'success': False,
+                'error': 'Sistem henüz hazır değil',
+                'timestamp': datetime.now().isoformat()
+            }), 503
+        
+        request_data = request.get_json()
+        forecast = request_data.get('forecast') if isinstance(request_data, dict) else None
+        
+        if not isinstance(forecast, list) or not forecast:
+            return jsonify({
+                'success': False,
+                'error': '"forecast" dizisi gerekli ve boş olamaz',
+                'timestamp': datetime.now().isoformat()
+            }), 400
+        
+        max_hours = int(os.environ.get('FORECAST_MAX_HOURS', 168))
+        if len(forecast) > max_hours:
+            return jsonify({
+                'success': False,
+                'error': f'İstek başına en fazla {max_hours} saat, alınan: {len(forecast)}',
+                'timestamp': datetime.now().isoformat()
+            }), 400
+        
+        forecast_response = risk_predictor.predict_allergy_risk_forecast(
+            request_data.get('userClassification'),
+            forecast,
+            window_hours=request_data.get('windowHours', min(2, len(forecast))),
+            max_windows=request_data.get('maxWindows', 3)
+        )
+        
+        return jsonify({
+            'success': True,
+            **forecast_response,
+            'timestamp': datetime.now().isoformat()
+        }), 200
+        
+    except ValueError as ve:
+        logger.error(f"❌ Forecast validation hatası: {ve}")
+        return jsonify({
+            'success': False,
+            'error': str(ve),
+            'timestamp': datetime.now().isoformat()
+        }), 400
+        
+    except Exception as e:
+        logger.error(f"❌ Forecast tahmin hatası: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'İç hata: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+@app.route('/api/v1/risk-grid', methods=['POST'])
+def ingest_risk_grid():
+    """
+    Risk grid ingest endpoint - hourly environmental snapshot for many provinces
+    
+    Expected JSON format:
+    {
+        "hour": "2026-05-14T13:00:00",
+        "cities": [
+            {"plaka": 34, "environmentalData": {...}},
+            ...
+        ]
+    }
+    
+    "hour" is optional (default: current hour). environmentalData has the same shape as
+    in /api/v1/predict. Every group model runs once over all provinces; /api/v1/predict
+    requests with a matching "plaka" (and "hour") then only apply the personal multiplier.
+    """
+    try:
+        if risk_predictor is None:
+            return jsonify({
+                'success': False,
+                'error': 'Sistem henüz hazır değil',
+                'timestamp': datetime.now().isoformat()
+            }), 503
+        
+        request_data = request.get_json()
+        cities = request_data.get('cities') if isinstance(request_data, dict) else None
+        
+        if not isinstance(cities, list) or not cities:
+            return jsonify({
+                'success': False,
+                'error': '"cities" dizisi gerekli ve boş olamaz',
+                'timestamp': datetime.now().isoformat()
+            }), 400
+        
+        summary = risk_predictor.ingest_risk_grid(request_data.get('hour'), cities)
+        
+        return jsonify({
+            'success': True,
+            **summary,
+            'timestamp': datetime.now().isoformat()
+        }), 200
+        
+    except ValueError as ve:
+        logger.error(f"❌ Risk grid validation hatası: {ve}")
+        return jsonify({
+            'success': False,
+            'error': str(ve),
+            'timestamp': datetime.now().isoformat()
+        }), 400
+        
+    except Exception as e:
+        logger.error(f"❌ Risk grid ingest hatası: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'İç hata: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+@app.route('/api/v1/risk-grid', methods=['GET'])
+def get_risk_grid_status():
+    """Risk grid hours, ages and hit/miss/stale counters"""
+    if risk_predictor is None:
+        return jsonify({
+            'success': False,
+            'error': 'Sistem henüz hazır değil',
+            'timestamp': datetime.now().isoformat()
+        }), 503
+    
+    if risk_predictor.risk_grid is None:
+        return jsonify({
+            'success': False,
+            'error': 'Risk grid devre dışı (RISK_GRID_ENABLED=false)',
+            'timestamp': datetime.now().isoformat()
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        **risk_predictor.risk_grid.get_stats(),
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+def profile_session_not_found_response(not_found: ProfileSessionNotFound):
+    """404 for an unknown or expired userPreferenceId; the client should register the profile again"""
+    reason_text = 'süresi dolmuş' if not_found.reason == 'expired' else 'kayıtlı değil'
+    return jsonify({
+        'success': False,
+        'error': f'Profil oturumu {reason_text}: {not_found.user_preference_id}',
+        'reason': not_found.reason,
+        'hint': 'POST /api/v1/profiles ile userClassification\'ı yeniden kaydedin veya userClassification gönderin',
+        'timestamp': datetime.now().isoformat()
+    }), 404
+
+@app.route('/api/v1/profiles', methods=['POST'])
+def register_profile_session():
+    """
+    Register a user profile once; predictions can then send only "userPreferenceId"
+    
+    Expected JSON format:
+    {
+        "userClassification": {"userPreferenceId": "8eb0d4c6-...", "groupId": 2, "groupName": "...", ...}
+    }
+    
+    Registering the same id again replaces the profile. Sessions expire after
+    PROFILE_SESSION_TTL seconds (default 24 h).
+    """
+    try:
+        if risk_predictor is None:
+            return jsonify({
+                'success': False,
+                'error': 'Sistem henüz hazır değil',
+                'timestamp': datetime.now().isoformat()
+            }), 503
+        
+        request_data = request.get_json(silent=True)
+        user_classification = request_data.get('userClassification') if isinstance(request_data, dict) else None
+        
+        validation_error = validate_user_classification(user_classification)
+        if validation_error:
+            return jsonify({
+                'success': False,
+                **validation_error,
+                'timestamp': datetime.now().isoformat()
+            }), 400
+        
+        summary = risk_predictor.register_profile_session(user_classification)
+        
+        return jsonify({
+            'success': True,
+            **summary,
+            'timestamp': datetime.now().isoformat()
+        }), 201
+        
+    except ValueError as ve:
+        return jsonify({
+            'success': False,
+            'error': str(ve),
+            'timestamp': datetime.now().isoformat()
+        }), 400
+        
+    except Exception as e:
+        logger.error(f"❌ Profil oturumu kayıt hatası: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'İç hata: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+@app.route('/api/v1/profiles/<path:user_preference_id>', methods=['DELETE'])
+def invalidate_profile_session(user_preference_id):
+    """Forget a registered profile (e.g. after the user edits it); 404 if it was not registered"""
+    if risk_predictor is None:
+        return jsonify({
+            'success': False,
+            'error': 'Sistem henüz hazır değil',
+            'timestamp': datetime.now().isoformat()
+        }), 503
+    
+    if risk_predictor.profile_sessions is None:
+        return jsonify({
+            'success': False,
+            'error': 'Profil oturumları devre dışı (PROFILE_SESSIONS_ENABLED=false)',
+            'timestamp': datetime.now().isoformat()
+        }), 404
+    
+    if not risk_predictor.profile_sessions.invalidate(user_preference_id):
+        return profile_session_not_found_response(ProfileSessionNotFound(user_preference_id, 'unknown'))
+    
+    return jsonify({
+        'success': True,
+        'userPreferenceId': user_preference_id,
+        'invalidated': True,
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+@app.route('/api/v1/profiles', methods=['GET'])
+def get_profile_session_stats():
+    """Profile session counts, hit rate and expiry settings (this worker)"""
+    if risk_predictor is None:
+        return jsonify({
+            'success': False,
+            'error': 'Sistem henüz hazır değil',
+            'timestamp': datetime.now().isoformat()
+        }), 503
+    
+    if risk_predictor.profile_sessions is None:
+        return jsonify({
+            'success': False,
+            'error': 'Profil oturumları devre dışı (PROFILE_SESSIONS_ENABLED=false)',
+            'timestamp': datetime.now().isoformat()
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        **risk_predictor.profile_sessions.get_stats(),
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+def env_snapshot_not_found_response(not_found: SnapshotNotFound):
+    """404 for an unknown, expired or evicted snapshotId; the client should send environmentalData"""
+    reason_text = {'expired': 'süresi dolmuş', 'evicted': 'kapasite nedeniyle silinmiş'}.get(not_found.reason, 'kayıtlı değil')
+    return jsonify({
+        'success': False,
+        'error': f'Çevresel snapshot {reason_text}: {not_found.snapshot_id}',
+        'reason': not_found.reason,
+        'hint': 'POST /api/v1/snapshots ile snapshot\'ı yeniden yükleyin veya environmentalData gönderin',
+        'timestamp': datetime.now().isoformat()
+    }), 404
+
+@app.route('/api/v1/snapshots', methods=['POST'])
+def ingest_env_snapshots():
+    """
+    Ingest environmental snapshots once; predictions can then send only "snapshotId"
+    
+    Expected JSON format:
+    {
+        "snapshots": [
+            {"plaka": 34, "hour": "2026-05-14T13:00:00", "environmentalData": {...}},
+            {"environmentalData": {...}},
+            ...
+        ]
+    }
+    
+    With "plaka" the id is "<plaka>-<YYYYMMDDHH>" ("hour" defaults to the current hour) and
+    re-ingesting the same province/hour replaces the snapshot; without it the id is derived
+    from the content. Snapshots expire after ENV_SNAPSHOT_TTL seconds (default 2 h) and at
+    most ENV_SNAPSHOT_MAX (default 5000) are kept per worker.
+    """
+    try:
+        if risk_predictor is None:
+            return jsonify({
+                'success': False,
+                'error': 'Sistem henüz hazır değil',
+                'timestamp': datetime.now().isoformat()
+            }), 503
+        
+        request_data = request.get_json(silent=True)
+        snapshots = request_data.get('snapshots') if isinstance(request_data, dict) else None
+        
+        if not isinstance(snapshots, list) or not snapshots:
+            return jsonify({
+                'success': False,
+                'error': '"snapshots" dizisi gerekli ve boş olamaz',
+                'timestamp': datetime.now().isoformat()
+            }), 400
+        
+        # More than the registry keeps would evict the request's own snapshots
+        if risk_predictor.env_snapshots is not None and len(snapshots) > risk_predictor.env_snapshots.max_size:
+            return jsonify({
+                'success': False,
+                'error': f'İstek başına en fazla {risk_predictor.env_snapshots.max_size} snapshot, alınan: {len(snapshots)}',
+                'timestamp': datetime.now().isoformat()
+            }), 400
+        
+        ingested = risk_predictor.ingest_env_snapshots(snapshots)
+        
+        return jsonify({
+            'success': True,
+            'snapshots': ingested,
+            'ttlSeconds': risk_predictor.env_snapshots.ttl_seconds,
+            'timestamp': datetime.now().isoformat()
+        }), 201
+        
+    except ValueError as ve:
+        logger.error(f"❌ Snapshot validation hatası: {ve}")
+        return jsonify({
+            'success': False,
+            'error': str(ve),
+            'timestamp': datetime.now().isoformat()
+        }), 400
+        
+    except Exception as e:
+        logger.error(f"❌ Snapshot kayıt hatası: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'İç hata: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+@app.route('/api/v1/snapshots', methods=['GET'])
+def get_env_snapshot_stats():
+    """Environmental snapshot counts, hit rate and retention settings (this worker)"""
+    if risk_predictor is None:
+        return jsonify({
+            'success': False,
+            'error': 'Sistem henüz hazır değil',
+            'timestamp': datetime.now().isoformat()
+        }), 503
+    
+    if risk_predictor.env_snapshots is None:
+        return jsonify({
+            'success': False,
+            'error': 'Çevresel snapshot\'lar devre dışı (ENV_SNAPSHOTS_ENABLED=false)',
+            'timestamp': datetime.now().isoformat()
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        **risk_predictor.env_snapshots.get_stats(),
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+def _model_registry_unavailable():
+    """Error response when the model admin API cannot be used, else None"""
+    if risk_predictor is None:
+        return jsonify({
+            'success': False,
+            'error': 'Sistem henüz hazır değil',
+            'timestamp': datetime.now().isoformat()
+        }), 503
+    
+    if risk_predictor.model_registry is None:
+        return jsonify({
+            'success': False,
+            'error': 'Model registry devre dışı (MODEL_REGISTRY_ENABLED=true ile açılır)',
+            'timestamp': datetime.now().isoformat()
+        }), 404
+    
+    if not risk_predictor.model_registry.is_authorized(request.headers):
+        return jsonify({
+            'success': False,
+            'error': 'Geçersiz veya eksik X-Admin-Token',
+            'timestamp': datetime.now().isoformat()
+        }), 403
+    
+    return None
+
+def _parse_model_groups(request_data: Any) -> List[int]:
+    """"groups" from an admin request body (default: all groups)"""
+    groups = request_data.get('groups') if isinstance(request_data, dict) else None
+    if groups is None:
+        return [1, 2, 3, 4, 5]
+    if not isinstance(groups, list) or not groups or any(
+            isinstance(group_id, bool) or not isinstance(group_id, int) or group_id < 1 or group_id > 5 for group_id in groups):
+        raise ValueError('"groups" 1-5 arası groupId listesi olmalı')
+    return sorted(set(groups))
+
+@app.route('/api/v1/models', methods=['GET'])
+def get_model_versions():
+    """Active and previous model version per group and recent reloads (this worker)"""
+    unavailable = _model_registry_unavailable()
+    if unavailable is not None:
+        return unavailable
+    
+    return jsonify({
+        'success': True,
+        **risk_predictor.model_registry.get_status(),
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+@app.route('/api/v1/models/reload', methods=['POST'])
+def reload_models():
+    """
+    Load, validate and swap in the current model files of the given groups
+    
+    Expected JSON format (all fields optional):
+    {
+        "groups": [3, 5],
+        "force": false,
+        "wait": true
+    }
+    
+    Files are read from the configured model directory. Predictions keep running on the
+    active version while the candidate loads and is validated; a candidate that fails
+    validation is rejected and the active version stays. With "wait": false the reload
+    runs in the background and 202 is returned (poll GET /api/v1/models).
+    """
+    unavailable = _model_registry_unavailable()
+    if unavailable is not None:
+        return unavailable
+    
+    try:
+        request_data = request.get_json(silent=True) or {}
+        group_ids = _parse_model_groups(request_data)
+        reload_future = risk_predictor.model_registry.request_reload(group_ids, force=bool(request_data.get('force', False)))
+        
+        if not request_data.get('wait', True):
+            return jsonify({
+                'success': True,
+                'status': 'queued',
+                'groups': group_ids,
+                'timestamp': datetime.now().isoformat()
+            }), 202
+        
+        result = reload_future.result()
+        rejected = [group_id for group_id, outcome in result['groups'].items() if outcome['status'] in ('load_failed', 'rejected')]
+        
+        return jsonify({
+            'success': not rejected,
+            **result,
+            'timestamp': datetime.now().isoformat()
+        }), 422 if rejected else 200
+        
+    except ValueError as ve:
+        return jsonify({
+            'success': False,
+            'error': str(ve),
+            'timestamp': datetime.now().isoformat()
+        }), 400
+        
+    except Exception as e:
+        logger.error(f"❌ Model reload hatası: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'İç hata: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+@app.route('/api/v1/models/rollback', methods=['POST'])
+def rollback_models():
+    """
+    Swap the previous version of the given groups back in ({"groups": [3]}, default all)
+    
+    The previous version is kept in memory, so rollback needs no disk access. Rolling
+    back again restores the newer version.
+    """
+    unavailable = _model_registry_unavailable()
+    if unavailable is not None:
+        return unavailable
+    
+    try:
+        group_ids = _parse_model_groups(request.get_json(silent=True) or {})
+        result = risk_predictor.model_registry.rollback(group_ids)
+        
+        return jsonify({
+            'success': True,
+            **result,
+            'timestamp': datetime.now().isoformat()
+        }), 200
+        
+    except ValueError as ve:
+        return jsonify({
+            'success': False,
+            'error': str(ve),
+            'timestamp': datetime.now().isoformat()
+        }), 400
+        
+    except Exception as e:
+        logger.error(f"❌ Model rollback hatası: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'İç hata: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
 @app.route('/api/v1/system-info', methods=['GET'])
 def get_system_info():
     """Get detailed system information"""
@@ -979,9 +2559,24 @@ if __name__ == "__main__":
             print("✅ Sistem başarıyla başlatıldı")
             print("🌐 API Endpoints:")
             print("   GET  /health                     - Health check")
+            print("   GET  /ready                      - Readiness (per-group model load state)")
+            print("   GET  /metrics                    - Prometheus metrics")
             print("   GET  /api/v1/allergy-groups      - Available allergy groups")
             print("   POST /api/v1/classify-user       - Classify user into group")
             print("   POST /api/v1/predict             - Main prediction endpoint")
+            print("   POST /api/v1/predict/batch       - Batch prediction endpoint")
+            print("   POST /api/v1/predict/fanout      - One environment, many users")
+            print("   POST /api/v1/predict/forecast    - Hourly risk curve and best windows")
+            print("   POST /api/v1/risk-grid           - Ingest hourly province snapshot")
+            print("   GET  /api/v1/risk-grid           - Risk grid status")
+            print("   POST /api/v1/profiles            - Register profile session")
+            print("   DELETE /api/v1/profiles/<id>     - Invalidate profile session")
+            print("   GET  /api/v1/profiles            - Profile session stats")
+            print("   POST /api/v1/snapshots           - Ingest environmental snapshots")
+            print("   GET  /api/v1/snapshots           - Environmental snapshot stats")
+            print("   GET  /api/v1/models              - Active/previous model versions")
+            print("   POST /api/v1/models/reload       - Hot reload group models")
+            print("   POST /api/v1/models/rollback     - Roll back to previous models")
             print("   GET  /api/v1/system-info         - System information")
             print("   POST /predict                    - Legacy prediction endpoint")
             print("   GET  /test                       - Simple test endpoint")
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AllerMind Request Logging
+Queue-backed, sampled logging that keeps stdout writes off the request thread
+
+Request threads only append log records to a bounded queue; one background
+writer formats them and writes them in batches (one write and one flush per
+drained batch instead of per line). When the queue is full, records are
+dropped and counted rather than blocking a request.
+
+Within a request, INFO/DEBUG records are kept only if the request was
+sampled; warnings and errors are always kept. Records outside a request
+(startup, background threads) are never sampled away.
+
+    LOG_ASYNC           - false keeps the plain synchronous logging setup
+    LOG_MODE            - 'detail' (default): the sampled requests' own log lines
+                          'summary': one key=value line per sampled request only
+    LOG_SAMPLE_RATE     - default sampling rate for all routes (default 1.0)
+    LOG_SAMPLE_RATES    - per-route overrides, e.g. "/api/v1/predict=0.01,/health=0"
+    LOG_QUEUE_SIZE      - queue capacity in records (default 10000)
+    LOG_LEVEL           - root log level (default INFO)
+"""
+
+import atexit
+import contextvars
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from typing import Any, Dict, List, Optional, TextIO
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+SUMMARY_LOGGER = 'allermind.access'
+LOG_MODES = ('detail', 'summary')
+
+# Records written per batch before the writer flushes
+MAX_BATCH = 512
+
+_STOP = object()
+
+# Sampling decision and summary fields of the request running in this context
+_request_state: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar('request_log_state', default=None)
+
+
+def annotate_request(**fields: Any) -> None:
+    """Add key=value fields to the current request's summary line (no-op outside a request)"""
+    state = _request_state.get()
+    if state is not None:
+        state['fields'].update(fields)
+
+
+def parse_sample_rates(value: Optional[str]) -> Dict[str, float]:
+    """"/api/v1/predict=0.01,/health=0" -> {route: rate}"""
+    rates = {}
+    for item in (value or '').split(','):
+        if not item.strip():
+            continue
+        route, separator, rate = item.rpartition('=')
+        if not separator or not route.strip():
+            raise ValueError(f"LOG_SAMPLE_RATES öğesi 'route=oran' biçiminde olmalı: {item!r}")
+        rates[route.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class _QueueHandler(logging.Handler):
+    """Appends records to the writer queue without formatting them"""
+
+    def __init__(self, pipeline: 'RequestLogPipeline'):
+        super().__init__()
+        self.pipeline = pipeline
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Merge args now: they may be mutated after the call returns. Exception
+        # tracebacks are formatted later by the writer.
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        self.pipeline.enqueue(record)
+
+
+class _SamplingFilter(logging.Filter):
+    def __init__(self, pipeline: 'RequestLogPipeline'):
+        super().__init__()
+        self.pipeline = pipeline
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        state = _request_state.get()
+        if state is None:
+            return True
+        if self.pipeline.mode == 'summary':
+            return record.name == SUMMARY_LOGGER
+        return state['sampled']
+
+
+class RequestLogPipeline:
+    """Root log handler with a background writer, per-route sampling and summary mode"""
+
+    def __init__(self, stream: Optional[TextIO] = None, mode: str = 'detail', default_rate: float = 1.0,
+                 route_rates: Optional[Dict[str, float]] = None, queue_size: int = 10000, level: int = logging.INFO):
+        if mode not in LOG_MODES:
+            raise ValueError(f"LOG_MODE {', '.join(LOG_MODES)} olmalı: {mode!r}")
+        self.stream = stream
+        self.mode = mode
+        self.default_rate = min(1.0, max(0.0, float(default_rate)))
+        self.route_rates = dict(route_rates or {})
+        self.queue_size = max(1, int(queue_size))
+        self.level = level
+        self.formatter = logging.Formatter(LOG_FORMAT)
+        self.summary_logger = logging.getLogger(SUMMARY_LOGGER)
+
+        self.handler = _QueueHandler(self)
+        self.handler.addFilter(_SamplingFilter(self))
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.requests = 0
+        self.sampled_requests = 0
+        self._counter_lock = threading.Lock()
+
+        self._queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self._writer: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> Optional['RequestLogPipeline']:
+        """Create the pipeline unless LOG_ASYNC=false (then the caller keeps synchronous logging)"""
+        if os.environ.get('LOG_ASYNC', 'true').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(
+            mode=os.environ.get('LOG_MODE', 'detail').lower(),
+            default_rate=float(os.environ.get('LOG_SAMPLE_RATE', 1.0)),
+            route_rates=parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES')),
+            queue_size=int(os.environ.get('LOG_QUEUE_SIZE', 10000)),
+            level=logging.getLevelName(os.environ.get('LOG_LEVEL', 'INFO').upper())
+        )
+
+    def install(self) -> None:
+        """Make this the only root handler and start the writer"""
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+        self._start_writer()
+        atexit.register(self.close)
+
+    def after_fork(self) -> None:
+        """Fresh queue and writer in a forked worker (threads and queue locks are not inherited safely)"""
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._start_writer()
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Write what is queued and stop the writer"""
+        writer = self._writer
+        if writer is None or not writer.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        writer.join(timeout)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._counter_lock:
+                self.dropped += 1
+            return
+        with self._counter_lock:
+            self.enqueued += 1
+
+    def begin_request(self, route: str) -> None:
+        """Decide whether this request is sampled; called before the view runs"""
+        rate = self.route_rates.get(route, self.default_rate)
+        sampled = rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+        _request_state.set({'route': route, 'sampled': sampled, 'fields': {}})
+        with self._counter_lock:
+            self.requests += 1
+            if sampled:
+                self.sampled_requests += 1
+
+    def end_request(self, method: str, status_code: int, duration_seconds: Optional[float]) -> None:
+        """In summary mode, log one line for the request (always for 5xx responses)"""
+        state = _request_state.get()
+        if state is None or self.mode != 'summary' or not (state['sampled'] or status_code >= 500):
+            return
+
+        parts = [f"route={state['route']}", f"method={method}", f"status={status_code}"]
+        if duration_seconds is not None:
+            parts.append(f"ms={duration_seconds * 1000:.2f}")
+        parts.extend(f"{key}={value}" for key, value in state['fields'].items())
+        self.summary_logger.log(logging.ERROR if status_code >= 500 else logging.INFO, ' '.join(parts))
+
+    def finish_request(self) -> None:
+        """Forget the request state (teardown, also after unhandled errors)"""
+        _request_state.set(None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._counter_lock:
+            return {
+                'enabled': True,
+                'mode': self.mode,
+                'defaultSampleRate': self.default_rate,
+                'routeSampleRates': self.route_rates,
+                'queueSize': self.queue_size,
+                'queueDepth': self._queue.qsize(),
+                'enqueued': self.enqueued,
+                'dropped': self.dropped,
+                'written': self.written,
+                'writeBatches': self.batches,
+                'requests': self.requests,
+                'sampledRequests': self.sampled_requests
+            }
+
+    def _start_writer(self) -> None:
+        self._writer = threading.Thread(target=self._write_loop, name='log-writer', daemon=True)
+        self._writer.start()
+
+    def _write_loop(self) -> None:
+        log_queue = self._queue
+        while True:
+            records: List[Any] = [log_queue.get()]
+            while len(records) < MAX_BATCH:
+                try:
+                    records.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(record is _STOP for record in records)
+            lines = []
+            for record in records:
+                if record is _STOP:
+                    continue
+                try:
+                    lines.append(self.formatter.format(record))
+                except Exception:
+                    lines.append(f"{record.levelname} - {record.name} - <log kaydı biçimlendirilemedi>")
+
+            if lines:
+                self._write(lines)
+            if stop:
+                return
+
+    def _write(self, lines: List[str]) -> None:
+        stream = self.stream or sys.stderr
+        try:
+            stream.write('\n'.join(lines) + '\n')
+            stream.flush()
+        except (OSError, ValueError):
+            return
+        with self._counter_lock:
+            self.written += len(lines)
+            self.batches += 1
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AllerMind Request Profiler
+Runs a single opted-in prediction request under cProfile and summarizes it
+"""
+
+import cProfile
+import hmac
+import os
+import pstats
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+# Header only: a token in the query string would be written to the access log with the request line
+PROFILE_HEADER = 'X-Profile-Token'
+
+# Pipeline stage -> functions whose cumulative time makes up that stage
+STAGE_FUNCTIONS = {
+    'convert_environment': ('_convert_to_expert_environmental_data',),
+    'convert_personal_params': ('_convert_to_personal_params',),
+    'features': ('prepare_features',),
+    'base_predictions': ('_predict_base_values',),
+    'model_predict': ('predict_base_batch',),
+    'personal_multipliers': ('calculate_personal_multipliers',),
+    'finalize_groups': ('_finalize_group_prediction',),
+    'ensemble': ('_combine_ensemble',),
+    'build_result': ('_build_prediction_result',),
+    'format_response': ('_format_prediction_response',),
+}
+
+
+class RequestProfiler:
+    """
+    Opt-in deterministic profiling of individual requests
+
+    A request is profiled only when it carries the configured token in the
+    X-Profile-Token header. Without a token
+    configured the profiler is not created at all, so the normal request path
+    pays nothing. Only one request is profiled at a time; concurrent profile
+    requests run unprofiled and say so in their report.
+
+    Model inference dispatched to the micro-batcher thread is not visible to
+    the profiler; it shows up as waiting time inside `base_predictions`.
+    """
+
+    def __init__(self, token: str, output_dir: Optional[str] = None, keep: int = 20, top_n: int = 25):
+        self._token = token.encode('utf-8')
+        self.output_dir = output_dir
+        self.keep = max(1, int(keep))
+        self.top_n = max(1, int(top_n))
+        self._lock = threading.Lock()
+
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional['RequestProfiler']:
+        """Create a profiler if PROFILE_TOKEN is set, otherwise return None"""
+        token = os.environ.get('PROFILE_TOKEN')
+        if not token:
+            return None
+        return cls(
+            token,
+            output_dir=os.environ.get('PROFILE_DIR') or None,
+            keep=int(os.environ.get('PROFILE_KEEP', 20)),
+            top_n=int(os.environ.get('PROFILE_TOP_N', 25))
+        )
+
+    def is_requested(self, headers: Mapping[str, str]) -> bool:
+        """True if the request carries the profiling token in the X-Profile-Token header"""
+        supplied = headers.get(PROFILE_HEADER)
+        return bool(supplied) and hmac.compare_digest(supplied.encode('utf-8'), self._token)
+
+    def run(self, fn: Callable[..., Any], *args: Any) -> Tuple[Any, Dict[str, Any]]:
+        """Call fn(*args) under cProfile and return (result, report)"""
+        if not self._lock.acquire(blocking=False):
+            return fn(*args), {'profiled': False, 'reason': 'Başka bir profil çalışıyor'}
+
+        try:
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                result = fn(*args)
+            finally:
+                profiler.disable()
+                elapsed = time.perf_counter() - started
+
+            report = self._build_report(profiler, elapsed)
+            if self.output_dir:
+                report['profileFile'] = self._write_profile(profiler)
+            return result, report
+        finally:
+            self._lock.release()
+
+    def _build_report(self, profiler: cProfile.Profile, elapsed: float) -> Dict[str, Any]:
+        stats = pstats.Stats(profiler).stats
+
+        cumulative_by_name: Dict[str, float] = {}
+        for (_, _, function_name), (_, _, _, cumulative, _) in stats.items():
+            cumulative_by_name[function_name] = cumulative_by_name.get(function_name, 0.0) + cumulative
+
+        stages = {
+            stage: round(sum(cumulative_by_name.get(name, 0.0) for name in function_names) * 1000, 3)
+            for stage, function_names in STAGE_FUNCTIONS.items()
+            if any(name in cumulative_by_name for name in function_names)
+        }
+
+        top_functions: List[Dict[str, Any]] = []
+        ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top_n]
+        for (filename, line_number, function_name), (_, call_count, total, cumulative, _) in ranked:
+            top_functions.append({
+                'function': f"{os.path.basename(filename)}:{line_number}({function_name})",
+                'calls': call_count,
+                'totalMs': round(total * 1000, 3),
+                'cumulativeMs': round(cumulative * 1000, 3)
+            })
+
+        return {
+            'profiled': True,
+            'wallTimeMs': round(elapsed * 1000, 3),
+            'stagesMs': stages,
+            'topFunctions': top_functions
+        }
+
+    def _write_profile(self, profiler: cProfile.Profile) -> str:
+        """Dump pstats output into output_dir and drop the oldest files beyond `keep`"""
+        filename = f"profile-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{os.getpid()}.prof"
+        profiler.dump_stats(os.path.join(self.output_dir, filename))
+
+        # Timestamped names sort chronologically
+        profiles = sorted(name for name in os.listdir(self.output_dir) if name.startswith('profile-') and name.endswith('.prof'))
+        for name in profiles[:-self.keep]:
+            try:
+                os.remove(os.path.join(self.output_dir, name))
+            except OSError:
+                pass
+
+        return filename
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AllerMind Response Compression
+Gzip for response bodies above a size threshold, for clients that accept it
+"""
+
+import gzip
+import os
+import threading
+from typing import Any, Dict, Optional
+
+# Statuses whose bodies are never compressed (no body or handled by the client cache)
+SKIP_STATUSES = (204, 206, 304)
+
+
+class GzipCompressor:
+    """
+    Compresses buffered responses of at least `min_bytes` with gzip
+
+    Small bodies are sent as they are: below roughly a kilobyte the gzip header
+    and CPU time cost more than the saved bytes. Every response large enough to
+    be compressed gets "Vary: Accept-Encoding", whether this client accepted
+    gzip or not, so shared caches keep the two representations apart.
+    """
+
+    def __init__(self, min_bytes: int = 1024, level: int = 5):
+        self.min_bytes = max(0, int(min_bytes))
+        self.level = min(9, max(1, int(level)))
+        self._lock = threading.Lock()
+
+        # Stats (guarded by _lock)
+        self.compressed = 0
+        self.uncompressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @classmethod
+    def from_env(cls) -> Optional['GzipCompressor']:
+        """Create the compressor unless RESPONSE_GZIP_ENABLED=false"""
+        if os.environ.get('RESPONSE_GZIP_ENABLED', 'true').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(
+            min_bytes=int(os.environ.get('RESPONSE_GZIP_MIN_BYTES', 1024)),
+            level=int(os.environ.get('RESPONSE_GZIP_LEVEL', 5))
+        )
+
+    def compress(self, response, accepts_gzip: bool):
+        """Gzip the (Flask/Werkzeug) response in place when it is eligible and the client accepts gzip"""
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in SKIP_STATUSES
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        body = response.get_data()
+        if len(body) < self.min_bytes:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if not accepts_gzip:
+            with self._lock:
+                self.uncompressed += 1
+            return response
+
+        compressed = gzip.compress(body, compresslevel=self.level)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = 'gzip'
+
+        with self._lock:
+            self.compressed += 1
+            self.bytes_in += len(body)
+            self.bytes_out += len(compressed)
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': True,
+                'minBytes': self.min_bytes,
+                'level': self.level,
+                'compressed': self.compressed,
+                'uncompressed': self.uncompressed,
+                'bytesIn': self.bytes_in,
+                'bytesOut': self.bytes_out,
+                'ratio': self.bytes_out / self.bytes_in if self.bytes_in else 0.0
+            }
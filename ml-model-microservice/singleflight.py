@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AllerMind Singleflight
+Runs identical in-flight prediction requests once and shares the result
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class _Call:
+    """One computation that duplicates can wait on"""
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Request deduplication keyed by a canonical hash of the request
+
+    The first request for a key (the leader) computes the result; requests with
+    the same key that arrive while it runs wait for it and get the same result
+    or the same error. Nothing is kept once the leader finishes - this is not a
+    cache, it only collapses retries and double taps that overlap in time.
+    A duplicate waits at most `max_wait_ms` and then computes on its own.
+    """
+
+    def __init__(self, max_wait_ms: float = 2000.0, metrics=None):
+        self.max_wait_seconds = max(0.0, max_wait_ms) / 1000.0
+        self.metrics = metrics
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+        # Stats (guarded by _lock)
+        self._leaders = 0
+        self._coalesced = 0
+        self._timeouts = 0
+        self._shared_errors = 0
+        self._max_waiters = 0
+
+    @classmethod
+    def from_env(cls, metrics=None) -> Optional['SingleFlight']:
+        """Create the deduplicator unless SINGLEFLIGHT_ENABLED=false"""
+        if os.environ.get('SINGLEFLIGHT_ENABLED', 'true').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(max_wait_ms=float(os.environ.get('SINGLEFLIGHT_MAX_WAIT_MS', 2000)), metrics=metrics)
+
+    @staticmethod
+    def make_key(payload: Dict[str, Any]) -> str:
+        """SHA-256 of the payload as JSON with sorted keys and no whitespace"""
+        canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn() once per key among concurrent callers
+
+        Returns:
+            (result, shared) - shared is True when the result came from another
+            request's computation. The result object is the same for all
+            callers; do not mutate it.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self._leaders += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self._max_waiters = max(self._max_waiters, call.waiters)
+                leader = False
+
+        if leader:
+            self._observe('leader')
+            try:
+                call.result = fn()
+                return call.result, False
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+                call.done.set()
+
+        started = time.perf_counter()
+        if not call.done.wait(self.max_wait_seconds):
+            with self._lock:
+                self._timeouts += 1
+            self._observe('timeout', time.perf_counter() - started)
+            return fn(), False
+
+        with self._lock:
+            self._coalesced += 1
+            if call.error is not None:
+                self._shared_errors += 1
+        self._observe('coalesced', time.perf_counter() - started)
+
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self._leaders + self._coalesced + self._timeouts
+            return {
+                'enabled': True,
+                'maxWaitMs': self.max_wait_seconds * 1000,
+                'inFlight': len(self._calls),
+                'leaders': self._leaders,
+                'coalesced': self._coalesced,
+                'timeouts': self._timeouts,
+                'sharedErrors': self._shared_errors,
+                'maxWaiters': self._max_waiters,
+                'coalescedRate': self._coalesced / requests if requests else 0.0
+            }
+
+    def _observe(self, role: str, wait_seconds: Optional[float] = None) -> None:
+        if self.metrics is not None:
+            self.metrics.observe_singleflight(role, wait_seconds)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AllerMind Environmental Snapshots
+Environmental data ingested once, converted and feature-engineered, and referenced by snapshotId
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from risk_grid import hour_slot, validate_plaka
+
+SNAPSHOT_FILE_SUFFIX = '.json'
+
+# Ingested snapshots between sweeps of expired snapshot files
+PRUNE_EVERY = 1000
+
+MAX_ID_LENGTH = 128
+
+
+class SnapshotNotFound(LookupError):
+    """No usable snapshot for the id; reason is 'unknown', 'expired' or 'evicted'"""
+
+    def __init__(self, snapshot_id: str, reason: str):
+        super().__init__(snapshot_id, reason)
+        self.snapshot_id = snapshot_id
+        self.reason = reason
+
+
+class EnvironmentSnapshot:
+    """One ingested environmentalData with its expert-format data and prepared features"""
+    __slots__ = ('snapshot_id', 'plaka', 'hour', 'environmental_data', 'prepared_features',
+                 'ingested_at', 'expires_at', 'file_mtime')
+
+    def __init__(self, snapshot_id: str, plaka: Optional[int], hour: Optional[datetime],
+                 environmental_data: Dict[str, Any], prepared_features: Tuple[Any, List[str]],
+                 ingested_at: float, expires_at: float, file_mtime: Optional[int] = None):
+        self.snapshot_id = snapshot_id
+        self.plaka = plaka
+        self.hour = hour
+        self.environmental_data = environmental_data
+        self.prepared_features = prepared_features
+        self.ingested_at = ingested_at
+        self.expires_at = expires_at
+        self.file_mtime = file_mtime
+
+    def to_summary(self) -> Dict[str, Any]:
+        return {
+            'snapshotId': self.snapshot_id,
+            'plaka': self.plaka,
+            'hour': self.hour.isoformat() if self.hour else None,
+            'ingestedAt': datetime.fromtimestamp(self.ingested_at).isoformat(),
+            'expiresAt': datetime.fromtimestamp(self.expires_at).isoformat()
+        }
+
+
+def make_snapshot_id(raw_environmental_data: Dict[str, Any], plaka: Optional[int], hour: Optional[datetime]) -> str:
+    """
+    "34-2026101714" for a province/hour snapshot, otherwise "env-<content hash>"
+
+    Province/hour ids are predictable for clients; re-ingesting the same
+    province and hour replaces the snapshot under the same id.
+    """
+    if plaka is not None:
+        return f"{plaka}-{hour:%Y%m%d%H}"
+    canonical = json.dumps(raw_environmental_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return f"env-{hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:20]}"
+
+
+def validate_snapshot_id(snapshot_id: Any) -> str:
+    if not isinstance(snapshot_id, str) or not snapshot_id.strip() or len(snapshot_id) > MAX_ID_LENGTH:
+        raise ValueError(f"snapshotId boş olmayan bir metin olmalı (en fazla {MAX_ID_LENGTH} karakter)")
+    return snapshot_id
+
+
+class SnapshotRegistry:
+    """
+    TTL + size bounded store of prepared environmental snapshots keyed by snapshotId
+
+    ingest() converts the API environmentalData once with `convert_fn` (the
+    service's expert-format conversion) and runs `feature_fn` (the predictor's
+    prepare_features) on the result. Predictions that send only the id skip
+    both steps. The common feature vector does not depend on the loaded model
+    versions, so snapshots stay valid across model swaps.
+
+    Snapshots expire `ttl_seconds` after ingest; at most `max_size` are kept
+    per process, oldest ingest first out. Recently expired or evicted ids are
+    remembered so lookups can say why an id is no longer usable.
+
+    With `snapshot_dir`, ingested snapshots are also written there (raw
+    environmentalData). Processes sharing the directory (gunicorn workers)
+    load a snapshot on their first miss and re-prepare it when it is
+    re-ingested, so an ingest only has to reach one worker.
+    """
+
+    def __init__(self, convert_fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 feature_fn: Callable[[Dict[str, Any]], Tuple[Any, List[str]]],
+                 max_size: int = 5000, ttl_seconds: float = 7200.0, snapshot_dir: Optional[str] = None):
+        self._convert_fn = convert_fn
+        self._feature_fn = feature_fn
+        self.max_size = max(1, int(max_size))
+        self.ttl_seconds = max(1.0, float(ttl_seconds))
+        self.snapshot_dir = snapshot_dir
+        self._snapshots: 'OrderedDict[str, EnvironmentSnapshot]' = OrderedDict()
+        # id -> 'expired' / 'evicted' for ids dropped recently (bounded like the snapshots)
+        self._dropped: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Stats (guarded by _lock)
+        self.ingested = 0
+        self.hits = 0
+        self.unknown = 0
+        self.expired = 0
+        self.evictions = 0
+        self.file_loads = 0
+
+        if self.snapshot_dir:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, convert_fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 feature_fn: Callable[[Dict[str, Any]], Tuple[Any, List[str]]]) -> Optional['SnapshotRegistry']:
+        """Create the registry unless ENV_SNAPSHOTS_ENABLED=false"""
+        if os.environ.get('ENV_SNAPSHOTS_ENABLED', 'true').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(
+            convert_fn,
+            feature_fn,
+            max_size=int(os.environ.get('ENV_SNAPSHOT_MAX', 5000)),
+            ttl_seconds=float(os.environ.get('ENV_SNAPSHOT_TTL', 7200)),
+            snapshot_dir=os.environ.get('ENV_SNAPSHOT_DIR') or None
+        )
+
+    def ingest(self, raw_environmental_data: Dict[str, Any], plaka: Optional[int] = None,
+               hour: Any = None) -> EnvironmentSnapshot:
+        """
+        Convert, prepare and store one snapshot (replaces an earlier one with the same id)
+
+        The hour only names the snapshot; predictions use the same default time
+        features as a request that sends the environmentalData itself.
+        """
+        slot = None
+        if plaka is not None:
+            validate_plaka(plaka)
+            slot = hour_slot(hour)
+        elif hour is not None:
+            raise ValueError("hour yalnızca plaka ile birlikte gönderilebilir")
+
+        snapshot_id = make_snapshot_id(raw_environmental_data, plaka, slot)
+        ingested_at = time.time()
+
+        file_mtime = None
+        if self.snapshot_dir:
+            file_mtime = self._write_file(snapshot_id, raw_environmental_data, plaka, slot, ingested_at)
+
+        snapshot = self._build_snapshot(snapshot_id, raw_environmental_data, plaka, slot, ingested_at, file_mtime)
+        with self._lock:
+            self._store(snapshot)
+            self.ingested += 1
+            prune = self.snapshot_dir and self.ingested % PRUNE_EVERY == 0
+
+        if prune:
+            self._prune_files()
+        return snapshot
+
+    def get(self, snapshot_id: str) -> EnvironmentSnapshot:
+        """Stored snapshot for the id; raises SnapshotNotFound if unknown, expired or evicted"""
+        now = time.time()
+        with self._lock:
+            snapshot = self._snapshots.get(snapshot_id)
+
+        if self.snapshot_dir:
+            snapshot = self._sync_file(snapshot_id, snapshot)
+
+        with self._lock:
+            if snapshot is None:
+                self.unknown += 1
+                raise SnapshotNotFound(snapshot_id, self._dropped.get(snapshot_id, 'unknown'))
+            if snapshot.expires_at <= now:
+                if self._snapshots.pop(snapshot_id, None) is not None:
+                    self._remember_dropped(snapshot_id, 'expired')
+                self.expired += 1
+                expired = True
+            else:
+                self.hits += 1
+                expired = False
+
+        if expired:
+            if self.snapshot_dir:
+                self._remove_file(snapshot_id)
+            raise SnapshotNotFound(snapshot_id, 'expired')
+        return snapshot
+
+    def clear(self) -> None:
+        """Drop the in-process snapshots (shared files stay)"""
+        with self._lock:
+            self._snapshots.clear()
+            self._dropped.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.unknown + self.expired
+            return {
+                'enabled': True,
+                'snapshots': len(self._snapshots),
+                'maxSize': self.max_size,
+                'ttlSeconds': self.ttl_seconds,
+                'snapshotDir': self.snapshot_dir,
+                'ingested': self.ingested,
+                'hits': self.hits,
+                'unknown': self.unknown,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'fileLoads': self.file_loads,
+                'hitRate': self.hits / lookups if lookups else 0.0
+            }
+
+    def _build_snapshot(self, snapshot_id: str, raw_environmental_data: Dict[str, Any], plaka: Optional[int],
+                        slot: Optional[datetime], ingested_at: float, file_mtime: Optional[int]) -> EnvironmentSnapshot:
+        environmental_data = self._convert_fn(raw_environmental_data)
+        feature_vector, missing_features = self._feature_fn(environmental_data)
+        # Shared by every request that references the snapshot
+        feature_vector.setflags(write=False)
+        return EnvironmentSnapshot(snapshot_id, plaka, slot, environmental_data, (feature_vector, missing_features),
+                                   ingested_at, ingested_at + self.ttl_seconds, file_mtime)
+
+    def _store(self, snapshot: EnvironmentSnapshot) -> None:
+        self._snapshots.pop(snapshot.snapshot_id, None)
+        self._snapshots[snapshot.snapshot_id] = snapshot
+        self._dropped.pop(snapshot.snapshot_id, None)
+        while len(self._snapshots) > self.max_size:
+            evicted_id, _ = self._snapshots.popitem(last=False)
+            self._remember_dropped(evicted_id, 'evicted')
+            self.evictions += 1
+
+    def _remember_dropped(self, snapshot_id: str, reason: str) -> None:
+        self._dropped[snapshot_id] = reason
+        self._dropped.move_to_end(snapshot_id)
+        while len(self._dropped) > self.max_size:
+            self._dropped.popitem(last=False)
+
+    def _file_path(self, snapshot_id: str) -> str:
+        digest = hashlib.sha256(snapshot_id.encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.snapshot_dir, f"{digest}{SNAPSHOT_FILE_SUFFIX}")
+
+    def _write_file(self, snapshot_id: str, raw_environmental_data: Dict[str, Any], plaka: Optional[int],
+                    slot: Optional[datetime], ingested_at: float) -> int:
+        path = self._file_path(snapshot_id)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'snapshotId': snapshot_id,
+                'plaka': plaka,
+                'hour': slot.isoformat() if slot else None,
+                'ingestedAt': ingested_at,
+                'environmentalData': raw_environmental_data
+            }, f)
+        os.replace(temp_path, path)
+        return os.stat(path).st_mtime_ns
+
+    def _remove_file(self, snapshot_id: str) -> bool:
+        try:
+            os.remove(self._file_path(snapshot_id))
+            return True
+        except OSError:
+            return False
+
+    def _sync_file(self, snapshot_id: str, snapshot: Optional[EnvironmentSnapshot]) -> Optional[EnvironmentSnapshot]:
+        """Match the local snapshot with the shared file: re-ingested or not loaded yet"""
+        path = self._file_path(snapshot_id)
+        try:
+            file_mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            # Expired and removed elsewhere: the local copy still carries its own expiry
+            return snapshot
+
+        if snapshot is not None and snapshot.file_mtime == file_mtime:
+            return snapshot
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return snapshot
+        if stored.get('snapshotId') != snapshot_id:
+            return snapshot
+
+        slot = datetime.fromisoformat(stored['hour']) if stored.get('hour') else None
+        snapshot = self._build_snapshot(snapshot_id, stored['environmentalData'], stored.get('plaka'), slot,
+                                        stored['ingestedAt'], file_mtime)
+        with self._lock:
+            self._store(snapshot)
+            self.file_loads += 1
+        return snapshot
+
+    def _prune_files(self) -> None:
+        """Remove snapshot files whose TTL has passed"""
+        cutoff = time.time() - self.ttl_seconds
+        for name in os.listdir(self.snapshot_dir):
+            if not name.endswith(SNAPSHOT_FILE_SUFFIX):
+                continue
+            path = os.path.join(self.snapshot_dir, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
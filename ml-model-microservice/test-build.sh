@@ -82,6 +82,15 @@ fi
 docker rm $CONTAINER_ID > /dev/null
 rm -rf /tmp/model_check
 
+echo ""
+echo -e "${YELLOW}🧮 Step 2b: NumPy Inference Parity Kontrolü${NC}"
+echo ""
+
+docker run --rm allermind-ml-model:test python DATA/MODEL/version2_pkl_models/native_inference.py || {
+    echo -e "${RED}❌ MLP/SVR NumPy değerlendiricileri pickle modellerle uyuşmuyor!${NC}"
+    exit 1
+}
+
 echo ""
 echo -e "${YELLOW}🚀 Step 3: Container Çalıştır ve Test Et${NC}"
 echo ""
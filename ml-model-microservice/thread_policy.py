@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AllerMind Inference Thread Policy
+One place that decides how many threads inference may use per process
+
+Three pools stack up in a worker: request threads (gunicorn gthread),
+joblib workers of estimators pickled with n_jobs=-1, and BLAS/OpenMP threads
+inside numpy and sklearn. Left alone, each sizes itself to the machine's CPU
+count - not the container's CPU quota - and a 4-core container runs dozens of
+runnable threads. The policy derives all three from the detected cores:
+
+    cores           - min(os.cpu_count, CPU affinity, cgroup CPU quota)
+    workers         - GUNICORN_WORKERS (default: cores under gunicorn, else 1)
+    threads/worker  - GUNICORN_THREADS (default: 2 * cores / workers, at least 1)
+    n_jobs          - INFERENCE_N_JOBS (default 1), set on every loaded estimator
+    BLAS threads    - BLAS_THREADS (default 1), applied with threadpoolctl
+
+Single-row predictions gain nothing from parallel trees or BLAS, so both
+default to one thread and concurrency comes from requests instead.
+THREAD_POLICY_ENABLED=false leaves every library at its own default.
+"""
+
+import math
+import os
+from typing import Any, Dict, Optional
+
+# Read by OpenBLAS / MKL / OpenMP when the library is loaded
+BLAS_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+CGROUP_V2_CPU_MAX = '/sys/fs/cgroup/cpu.max'
+CGROUP_V1_QUOTA = '/sys/fs/cgroup/cpu/cpu.cfs_quota_us'
+CGROUP_V1_PERIOD = '/sys/fs/cgroup/cpu/cpu.cfs_period_us'
+
+
+def cgroup_cpu_quota() -> Optional[float]:
+    """CPU limit of the container in cores (e.g. 2.5), or None when unlimited"""
+    try:
+        with open(CGROUP_V2_CPU_MAX, 'r') as f:
+            quota, period = f.read().split()[:2]
+        if quota == 'max':
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open(CGROUP_V1_QUOTA, 'r') as f:
+            quota = int(f.read())
+        with open(CGROUP_V1_PERIOD, 'r') as f:
+            period = int(f.read())
+    except (OSError, ValueError):
+        return None
+    return quota / period if quota > 0 and period > 0 else None
+
+
+def detect_cpus() -> Dict[str, Any]:
+    """Usable cores: the smallest of the OS count, the CPU affinity mask and the cgroup quota"""
+    os_count = os.cpu_count() or 1
+    affinity = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else None
+    quota = cgroup_cpu_quota()
+
+    candidates = [os_count]
+    if affinity:
+        candidates.append(affinity)
+    if quota:
+        candidates.append(max(1, math.ceil(quota)))
+
+    return {'osCount': os_count, 'affinity': affinity, 'cgroupQuota': quota, 'effective': min(candidates)}
+
+
+class ThreadPolicy:
+    """Per-process thread limits for the prediction service"""
+
+    def __init__(self, cpus: Dict[str, Any], workers: int, threads_per_worker: int,
+                 n_jobs: int = 1, blas_threads: int = 1):
+        self.cpus = cpus
+        self.workers = max(1, int(workers))
+        self.threads_per_worker = max(1, int(threads_per_worker))
+        self.n_jobs = int(n_jobs)
+        self.blas_threads = max(1, int(blas_threads))
+        self._limiter = None
+
+    @classmethod
+    def from_env(cls, server: str = 'flask') -> Optional['ThreadPolicy']:
+        """
+        Policy from the environment, or None when THREAD_POLICY_ENABLED=false
+
+        server='gunicorn' defaults to one worker per core; the Flask development
+        server runs a single process.
+        """
+        if os.environ.get('THREAD_POLICY_ENABLED', 'true').lower() not in ('1', 'true', 'yes'):
+            return None
+
+        cpus = detect_cpus()
+        default_workers = cpus['effective'] if server == 'gunicorn' else 1
+        workers = max(1, int(os.environ.get('GUNICORN_WORKERS') or default_workers))
+        threads_per_worker = int(os.environ.get('GUNICORN_THREADS') or max(1, 2 * cpus['effective'] // workers))
+
+        return cls(
+            cpus,
+            workers=workers,
+            threads_per_worker=threads_per_worker,
+            n_jobs=int(os.environ.get('INFERENCE_N_JOBS', 1)),
+            blas_threads=int(os.environ.get('BLAS_THREADS', 1))
+        )
+
+    def export_env(self) -> None:
+        """
+        Publish the decisions as environment variables (explicit settings win)
+
+        Libraries loaded afterwards - and processes forked afterwards - start
+        with the capped BLAS/OpenMP pools, and the app sees the same worker count.
+        """
+        for name in BLAS_ENV_VARS:
+            os.environ.setdefault(name, str(self.blas_threads))
+        os.environ.setdefault('GUNICORN_WORKERS', str(self.workers))
+        os.environ.setdefault('GUNICORN_THREADS', str(self.threads_per_worker))
+
+    def apply(self) -> None:
+        """Cap BLAS/OpenMP pools of the libraries already loaded in this process"""
+        self.export_env()
+        try:
+            from threadpoolctl import threadpool_limits
+        except ImportError:
+            # Environment variables still cover libraries loaded from now on
+            return
+        self._limiter = threadpool_limits(limits=self.blas_threads)
+
+    def after_fork(self) -> None:
+        """Re-apply the caps in a forked worker"""
+        self.apply()
+
+    def get_status(self, predictor=None) -> Dict[str, Any]:
+        """Effective settings: cores, pool sizes, live BLAS/OpenMP pools and estimator n_jobs"""
+        status: Dict[str, Any] = {
+            'enabled': True,
+            'cpus': self.cpus,
+            'workers': self.workers,
+            'threadsPerWorker': self.threads_per_worker,
+            'nJobs': self.n_jobs,
+            'blasThreads': self.blas_threads,
+            'env': {name: os.environ.get(name) for name in BLAS_ENV_VARS}
+        }
+
+        try:
+            from threadpoolctl import threadpool_info
+            status['threadpools'] = [
+                {'api': pool['internal_api'], 'library': pool['prefix'], 'numThreads': pool['num_threads']}
+                for pool in threadpool_info()
+            ]
+        except ImportError:
+            status['threadpools'] = None
+
+        if predictor is not None:
+            status['estimatorNJobs'] = {
+                str(group_id): getattr(predictor.models[group_id].get('model'), 'n_jobs', None)
+                for group_id in predictor.loaded_groups()
+            }
+
+        return status
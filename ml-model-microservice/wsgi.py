@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AllerMind Production WSGI Entry Point
+Loads the Expert Predictor once in the gunicorn master (preload_app) and
+freezes the GC so forked workers share model pages copy-on-write
+
+Run with:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import gc
+
+# Keep the collector from touching (and un-sharing) model objects while they load
+gc.disable()
+
+from real_model_test import app, initialize_predictor, logger
+
+if not initialize_predictor():
+    raise RuntimeError("AllerMind predictor başlatılamadı")
+
+# Move everything allocated so far into the permanent generation: later
+# collections in the workers skip these objects and leave their pages shared
+gc.freeze()
+gc.enable()
+
+logger.info(f"🧊 Modeller master süreçte yüklendi, GC donduruldu ({gc.get_freeze_count()} nesne)")
+
+__all__ = ['app']